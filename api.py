@@ -0,0 +1,245 @@
+"""HTTP API beside the Streamlit UI (ASGI / FastAPI).
+
+    uvicorn api:app --host 127.0.0.1 --port 8001
+
+POST /jobs      queue a generation (a core.batch job record); 202 with the job id
+GET  /jobs/{id} status, result and events since ?events_from=N (polling)
+GET  /jobs/{id}/events   the same events as server-sent events
+POST /generate  queue a generation and wait up to ?wait= seconds for the result
+POST /keywords  JD keywords, and which of them a letter covers
+POST /fetch     visible text of a job posting URL
+POST /history/similar    the caller's earlier letters for near-identical job ads
+GET  /history/search?q=  full-text search over the caller's stored letters
+GET  /health, GET /metrics
+
+Set API_TOKEN to require "Authorization: Bearer <token>" on every call. The
+server refuses to start without it unless API_ALLOW_ANONYMOUS=1 (a trusted
+local setup), and the /history endpoints answer 403 without it. URLs given
+to /fetch or as a job's jd_url must resolve to public addresses. History (HISTORY=1) is kept
+per X-Session-Id.
+"""
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from core.jobs import DONE, ERROR, Job, QueueFull, generate_job, job_queue
+from services.history import HISTORY_ENABLED, history
+from services.warmup import start_warmup
+from utils.jd import fetch_url_text
+from utils.keywords import extract_keywords, jd_match_table
+from utils.trace import prometheus_text, register_collector
+
+API_TOKEN = os.getenv("API_TOKEN", "")
+API_ALLOW_ANONYMOUS = os.getenv("API_ALLOW_ANONYMOUS", "0") == "1"
+SSE_KEEPALIVE = 15.0  # seconds between comment lines on an idle event stream
+
+register_collector("api_jobs", job_queue.stats)
+
+
+def _authorize(authorization: Optional[str] = Header(None)) -> None:
+    if API_TOKEN and authorization != f"Bearer {API_TOKEN}":
+        raise HTTPException(401, "missing or wrong bearer token")
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # whatever the bind (uvicorn, gunicorn, a socket, uvicorn.run): no token means an explicit opt-in
+    if not API_TOKEN and not API_ALLOW_ANONYMOUS:
+        raise RuntimeError("refusing to start without API_TOKEN; set API_ALLOW_ANONYMOUS=1 for a trusted local setup")
+    start_warmup()  # LLM client and caches load while the server starts taking requests
+    yield
+
+
+app = FastAPI(title="Cover letter API", dependencies=[Depends(_authorize)], lifespan=_lifespan)
+
+
+class KeywordsRequest(BaseModel):
+    jd_text: str
+    letter: Optional[str] = None
+    top_k: int = 20
+
+
+class FetchRequest(BaseModel):
+    url: str
+
+
+class SimilarRequest(BaseModel):
+    jd_text: str
+    limit: int = 3
+    threshold: Optional[float] = None
+
+
+def _session(request: Request, session_id: Optional[str]) -> str:
+    """Fair-queueing session (services.ratelimit) for this caller."""
+    if session_id:
+        # the UI sends its history owner (ui:<hash>), so jobs it submits land in the history it reads
+        return session_id if session_id.startswith("ui:") else f"api:{session_id}"
+    return f"api:{request.client.host if request.client else 'unknown'}"
+
+
+def _submit(record: Dict[str, object], session: str) -> Job:
+    if not (str(record.get("jd_text") or "").strip() or record.get("jd_url")):
+        raise HTTPException(422, "job needs jd_text or jd_url")
+    try:
+        return job_queue.submit("generate", generate_job, record, session=session)
+    except QueueFull as exc:
+        raise HTTPException(503, str(exc), headers={"Retry-After": "5"})
+
+
+def _job(job_id: str) -> Job:
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, "unknown or expired job")
+    return job
+
+
+def _wake_on_change(job: Job, wake: asyncio.Event):
+    """Subscribe `wake` to the job's worker-thread events; returns the unsubscribe."""
+    loop = asyncio.get_running_loop()
+
+    def notify() -> None:
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # loop already closed (shutdown)
+    return job.listen(notify)
+
+
+async def _wait_done(job: Job, timeout: float) -> None:
+    wake = asyncio.Event()
+    stop = _wake_on_change(job, wake)
+    deadline = asyncio.get_running_loop().time() + timeout
+    try:
+        while not job.terminal:
+            left = deadline - asyncio.get_running_loop().time()
+            if left <= 0:
+                return
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), left)
+            except asyncio.TimeoutError:
+                return
+    finally:
+        stop()
+
+
+def _sse(event_id: int, event: str, data: Dict[str, object]) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _event_stream(job: Job, start: int, request: Request) -> AsyncIterator[str]:
+    wake = asyncio.Event()
+    stop = _wake_on_change(job, wake)
+    sent = start
+    try:
+        while True:
+            wake.clear()
+            state = job.to_dict(events_from=sent)
+            for event in state["events"]:
+                yield _sse(sent, str(event["type"]), event)
+                sent += 1
+            if state["status"] in (DONE, ERROR):
+                yield _sse(sent, str(state["status"]), {"result": state["result"], "error": state["error"]})
+                return
+            try:
+                await asyncio.wait_for(wake.wait(), SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+    finally:
+        stop()
+
+
+@app.get("/health")
+def health() -> Dict[str, object]:
+    return {"status": "ok", "jobs": job_queue.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    return prometheus_text()
+
+
+@app.post("/jobs", status_code=202)
+def create_job(record: Dict[str, object], request: Request,
+               x_session_id: Optional[str] = Header(None)) -> Dict[str, object]:
+    job = _submit(record, _session(request, x_session_id))
+    return {**job.to_dict(), "links": {"self": f"/jobs/{job.id}", "events": f"/jobs/{job.id}/events"}}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, events_from: Optional[int] = Query(None, ge=0)) -> Dict[str, object]:
+    return _job(job_id).to_dict(events_from)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, events_from: int = Query(0, ge=0),
+                     last_event_id: Optional[str] = Header(None)) -> StreamingResponse:
+    job = _job(job_id)
+    if last_event_id and last_event_id.isdigit():  # reconnecting EventSource
+        events_from = int(last_event_id) + 1
+    return StreamingResponse(_event_stream(job, events_from, request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/generate")
+async def generate(record: Dict[str, object], request: Request, wait: float = Query(120, ge=0),
+                   x_session_id: Optional[str] = Header(None)):
+    job = _submit(record, _session(request, x_session_id))
+    await _wait_done(job, wait)
+    state = job.to_dict()
+    if state["status"] == DONE:
+        return state["result"]
+    if state["status"] == ERROR:
+        raise HTTPException(502, state["error"])
+    return JSONResponse(state, status_code=202)  # still running: poll /jobs/{id}
+
+
+@app.post("/keywords")
+def keywords(body: KeywordsRequest) -> Dict[str, object]:
+    found: List[str] = extract_keywords(body.jd_text, top_k=body.top_k)
+    out: Dict[str, object] = {"keywords": found}
+    if body.letter is not None:
+        out["matches"] = jd_match_table(found, body.letter)
+    return out
+
+
+@app.post("/fetch")
+def fetch(body: FetchRequest) -> Dict[str, object]:
+    if not body.url.startswith(("http://", "https://")):
+        raise HTTPException(422, "url must be http(s)")
+    stats: Dict[str, object] = {}
+    text = fetch_url_text(body.url, stats=stats, public_only=True)
+    if stats.get("blocked"):
+        raise HTTPException(422, f"url not allowed: {stats['blocked']}")
+    if not text:
+        raise HTTPException(502, "could not fetch any text from the url")
+    return {"text": text, "stats": stats}
+
+
+def _history_owner(request: Request, x_session_id: Optional[str] = Header(None)) -> str:
+    """The caller's history owner, the session its jobs are recorded under; only with API_TOKEN set."""
+    if not API_TOKEN:
+        raise HTTPException(403, "history endpoints need API_TOKEN to be set")
+    if not HISTORY_ENABLED:
+        raise HTTPException(404, "history is off (HISTORY=1 enables it)")
+    return _session(request, x_session_id)
+
+
+@app.post("/history/similar")
+def history_similar(body: SimilarRequest, owner: str = Depends(_history_owner)) -> List[Dict[str, object]]:
+    return history.similar(owner, body.jd_text, limit=body.limit, threshold=body.threshold)
+
+
+@app.get("/history/search")
+def history_search(q: str, limit: int = Query(20, ge=1, le=200),
+                   owner: str = Depends(_history_owner)) -> List[Dict[str, object]]:
+    return history.search(owner, q, limit)
@@ -1,6 +1,10 @@
 # app.py
+from contextlib import nullcontext
+
 import streamlit as st
-from ui.layout import sidebar_inputs, main_tabs
+from ui.layout import debug_panel, sidebar_inputs, main_tabs, timings_panel
+from services.warmup import start_warmup
+from utils.trace import collect_spans, start_metrics_server
 
 APP_TITLE = "AI Cover Letter Builder — Modular"
 APP_INTRO = (
@@ -13,10 +17,20 @@ def main():
     st.title(APP_TITLE)
     st.write(APP_INTRO)
 
-    with st.sidebar:
-        state = sidebar_inputs()
+    start_metrics_server()  # no-op unless METRICS_PORT is set
+
+    # spans are only collected while the sidebar's "Show timings" box is ticked
+    with (collect_spans() if st.session_state.get("show_timings") else nullcontext([])) as spans:
+        with st.sidebar:
+            state = sidebar_inputs()
 
-    main_tabs(state)
+        main_tabs(state)
+    if state.get("show_timings"):
+        timings_panel(spans)
+    # rendered last so the cache counters include this run
+    debug_panel()
+    # the page is up: load the LLM client, caches and deferred imports in the background
+    start_warmup()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""Keyword engine benchmark: current utils.keywords vs. the original implementation.
+
+    python -m benchmarks.bench_keywords --jds 5000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from utils.keywords import STOPWORDS, TECH_HINTS, extract_keywords, extract_keywords_batch
+
+WORDS = (
+    "experience team build design deliver customer platform service data cloud product engineering "
+    "support develop maintain scalable secure testing deployment agile stakeholder requirement "
+    "digital storage legitimate fragrant pipeline automation integration api frontend backend"
+).split()
+
+
+def reference_extract_keywords(jd_text, top_k=20):
+    """The original implementation, kept for comparison."""
+    txt = jd_text.lower()
+    tokens = re.findall(r"[a-zA-Z\.\#\+\-]+", txt)
+    freq = {}
+    for tok in tokens:
+        if tok in STOPWORDS or len(tok) < 2:
+            continue
+        freq[tok] = freq.get(tok, 0) + 1
+    included = []
+    for hint in TECH_HINTS:
+        if hint in txt:
+            included.append(hint)
+    top = sorted(freq.items(), key=lambda x: x[1], reverse=True)
+    for w, _ in top:
+        if w not in included:
+            included.append(w)
+        if len(included) >= top_k:
+            break
+    return included[:top_k]
+
+
+def make_corpus(n, words_per_jd=400, seed=7):
+    """Synthetic JDs with a Zipf-like word distribution, like real prose."""
+    rng = random.Random(seed)
+    vocab = sorted(STOPWORDS) + WORDS + sorted(TECH_HINTS) + [f"term{i}" for i in range(2000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    jds = []
+    for _ in range(n):
+        words = rng.choices(vocab, weights, k=words_per_jd)
+        jds.append(" ".join(w.capitalize() if rng.random() < 0.1 else w for w in words) + ".")
+    return jds
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jds", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--reposts", type=float, default=0.0,
+                        help="also time a corpus padded with this share of exact reposts (deduplication)")
+    args = parser.parse_args(argv)
+
+    corpus = make_corpus(args.jds, args.words)
+    ref = timed(lambda: [reference_extract_keywords(t) for t in corpus])
+    new = timed(lambda: [extract_keywords(t) for t in corpus])
+    batch = timed(lambda: extract_keywords_batch(corpus))  # distinct texts: the engine's own throughput
+
+    print(f"{args.jds} distinct JDs x {args.words} words")
+    print(f"reference              {ref:8.3f}s  {args.jds / ref:9.0f} JDs/s")
+    print(f"extract_keywords       {new:8.3f}s  {args.jds / new:9.0f} JDs/s  ({ref / new:.1f}x)")
+    print(f"extract_keywords_batch {batch:8.3f}s  {args.jds / batch:9.0f} JDs/s  ({ref / batch:.1f}x)")
+    if args.reposts:
+        # Not engine speed: the batch call only skips texts it has already seen.
+        reposted = corpus + corpus[: int(len(corpus) * args.reposts)]
+        ref_reposted = timed(lambda: [reference_extract_keywords(t) for t in reposted])
+        dedup = timed(lambda: extract_keywords_batch(reposted))
+        print(f"with {args.reposts:.0%} exact reposts, batch skips duplicates: {dedup:.3f}s vs "
+              f"{ref_reposted:.3f}s reference ({ref_reposted / dedup:.1f}x, from deduplication)")
+
+if __name__ == "__main__":
+    main()
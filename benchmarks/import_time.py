@@ -0,0 +1,88 @@
+"""Import-time profile of the app's entry points, as a CI gate.
+
+    python -m benchmarks.import_time               # profile; exit 1 on an eager heavy import or over budget
+    python -m benchmarks.import_time --top 20 --json import_time.json
+
+Each entry point is imported in a fresh interpreter under `python -X importtime`,
+after the framework that loads it (Streamlit for ui.layout, FastAPI for api.py),
+so the numbers are what a cold start adds on top of `streamlit run` / uvicorn.
+The check fails when one of the DEFERRED packages is imported (they must load on
+first use, see services.warmup) or when the median import time exceeds --budget-ms.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# entry point -> module already imported before it (its cost is not ours)
+TARGETS = {"ui.layout": "streamlit", "api": "fastapi"}
+# must not be imported by any target: each costs 25-500 ms and is loaded on first use instead
+DEFERRED = ("openai", "httpx", "requests", "numpy", "bs4")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def profile(target: str, preload: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self µs, cumulative µs, depth) for everything `target` imports beyond `preload`."""
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {preload}; import {target}"],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    rows, started = [], False
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        name, depth = m.group(4), len(m.group(3)) // 2
+        if started:
+            rows.append((name, int(m.group(1)), int(m.group(2)), depth))
+        elif name == preload and depth == 0:
+            started = True  # lines are printed as imports finish: the preload's tree ends here
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per target; the median is reported")
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="max median import time per target")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list per target")
+    parser.add_argument("--json", help="also write the profile to this file")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, Dict[str, object]] = {}
+    failures = []
+    for target, preload in TARGETS.items():
+        profile(target, preload)  # writes any missing .pyc files, so timed runs are warm
+        runs = [profile(target, preload) for _ in range(args.runs)]
+        total_ms = statistics.median(next((r[2] for r in rows if r[0] == target), 0) for rows in runs) / 1000
+        eager = sorted({name.split(".")[0] for name, *_ in runs[-1]} & set(DEFERRED))
+        slowest = sorted(runs[-1], key=lambda r: -r[1])[:args.top]
+        report[target] = {"ms": round(total_ms, 1), "modules": len(runs[-1]), "eager_heavy_imports": eager,
+                          "slowest_self_ms": {name: round(us / 1000, 2) for name, us, _, _ in slowest}}
+
+        print(f"{target} (after {preload}): {total_ms:.1f} ms median of {args.runs}, {len(runs[-1])} modules")
+        for name, self_us, cumulative_us, _ in slowest:
+            print(f"    {self_us / 1000:8.2f} ms self {cumulative_us / 1000:9.2f} ms total  {name}")
+        if eager:
+            failures.append(f"{target} imports {', '.join(eager)} eagerly; import them on first use")
+        if total_ms > args.budget_ms:
+            failures.append(f"{target} takes {total_ms:.0f} ms to import (budget {args.budget_ms:.0f} ms)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
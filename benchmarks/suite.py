@@ -0,0 +1,343 @@
+"""Benchmark suite: the hot paths, plus generate_variants end to end against the local LLM stub.
+
+    python -m benchmarks.suite                      # run, compare with benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline    # record a new baseline
+    python -m benchmarks.suite --only fetch --latency lognormal:0.2,0.4
+
+Every case reports throughput and p50/p95/p99 latency per call. Inputs are
+synthetic and seeded (typical and 100k-character JDs, 1,000-project
+portfolios, deeply nested and oversized HTML served from a local HTTP
+server), so runs are reproducible. The exit status is 1 when a case's p50
+is more than --threshold slower than the baseline. Timings depend on the
+machine: record the baseline where the comparison runs.
+"""
+
+import os
+import tempfile
+
+# Read at import time by services.*: no response cache, no rate limit, LLM calls go to the stub.
+_WORKDIR = tempfile.mkdtemp(prefix="coverletter-bench-")
+os.environ.update({
+    "LLM_BACKEND": "http",
+    "OPENAI_API_KEY": "bench",
+    "LLM_CACHE": "0",
+    "LLM_RPM": "1000000000",
+    "LLM_TPM": "1000000000000",
+    "JD_HTTP_CACHE_PATH": os.path.join(_WORKDIR, "jd_http.sqlite3"),
+})
+
+import argparse  # noqa: E402
+import itertools  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+from http.server import BaseHTTPRequestHandler  # noqa: E402
+from typing import Callable, Dict, List, Optional, Tuple  # noqa: E402
+
+from benchmarks.bench_keywords import WORDS  # noqa: E402
+from services.backends import MOCK_LETTER  # noqa: E402
+from services.stub_server import StubServer, start_stub  # noqa: E402
+from utils.keywords import TECH_HINTS  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+FIXTURES = os.path.join(HERE, "fixtures")
+
+# A sample is timed over enough calls to last this long, so timer resolution doesn't dominate.
+MIN_SAMPLE_S = 0.002
+
+Case = Tuple[str, Callable[[], object], float, str]  # name, fn, work per call, unit
+
+
+# --- synthetic inputs --------------------------------------------------------
+
+BOILERPLATE = [
+    "We are an equal opportunity employer and value diversity.",
+    "Apply now and join our growing team!",
+    "Benefits include flexible hours, a learning budget and 30 days of holiday.",
+]
+TEMPLATES = [
+    "You will {w} {w} {w} services using {t} and {t}.",
+    "Experience with {t}, {t} or {t} is required.",
+    "Nice to have: {t} and a background in {w} {w}.",
+    "Work with {w} teams to {w} the {w} platform.",
+    "{n}+ years of professional {w} experience with {t}.",
+]
+
+
+def make_jd(chars: int, seed: int = 1) -> str:
+    """Job ad of about `chars` characters: requirement sentences with repeated boilerplate."""
+    rng = random.Random(seed)
+    hints = sorted(TECH_HINTS)
+    out, size = [], 0
+    while size < chars:
+        if rng.random() < 0.1:
+            sentence = rng.choice(BOILERPLATE)
+        else:
+            sentence = rng.choice(TEMPLATES)
+            while "{" in sentence:
+                sentence = (sentence.replace("{w}", rng.choice(WORDS), 1)
+                            .replace("{t}", rng.choice(hints), 1)
+                            .replace("{n}", str(rng.randint(2, 8)), 1))
+        out.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(out)[:chars]
+
+
+def make_projects(n: int, seed: int = 2) -> List[Dict[str, object]]:
+    rng = random.Random(seed)
+    hints = sorted(TECH_HINTS)
+    return [
+        {
+            "title": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+            "tech": rng.sample(hints, 3),
+            "desc": " ".join(rng.choice(WORDS) for _ in range(25)) + f", cut {rng.choice(WORDS)} time by {rng.randint(5, 80)}%.",
+        }
+        for i in range(n)
+    ]
+
+
+def projects_as_text(projects: List[Dict[str, object]]) -> Dict[str, str]:
+    """The same portfolio in each input format parse_projects_input accepts."""
+    return {
+        "json": json.dumps(projects),
+        "jsonl": "\n".join(json.dumps(p) for p in projects),
+        "numbered": "\n".join(f"{i + 1}. {p['title']} – {p['desc']}" for i, p in enumerate(projects)),
+    }
+
+
+def nested_html(depth: int) -> str:
+    """Posting text buried `depth` elements deep, with boilerplate at every level."""
+    opening = "".join(f'<div class="level{i}"><span>level {i} {WORDS[i % len(WORDS)]}</span>'
+                      + ('<nav class="menu"><a href="/">Home</a></nav>' if i % 10 == 0 else "")
+                      for i in range(depth))
+    return f"<html><body>{opening}<p>{make_jd(2000)}</p>{'</div>' * depth}</body></html>"
+
+
+def large_html(chars: int) -> str:
+    """A page far larger than MAX_CHARS of visible text, mostly scripts and markup."""
+    parts, size = ["<html><head><script>" + "var x = 1;" * 2000 + "</script></head><body>"], 0
+    i = 0
+    while size < chars:
+        part = f'<p class="para" data-i="{i}">{make_jd(400, seed=i)}</p>\n'
+        parts.append(part)
+        size += len(part)
+        i += 1
+    return "".join(parts) + "</body></html>"
+
+
+# --- local HTML server -------------------------------------------------------
+
+def serve_pages(pages: Dict[str, bytes]) -> Tuple[StubServer, str]:
+    """Serve `pages` (path -> body) without cache validators, so every fetch downloads and parses."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body go out as separate writes; avoid the delayed-ACK stall
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = StubServer(("127.0.0.1", 0), Handler)  # quiet when a truncating fetch hangs up
+    threading.Thread(target=server.serve_forever, name="bench-html", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- cases -------------------------------------------------------------------
+
+def build_cases(latency: str, variants: int) -> List[Case]:
+    from core.generator import generate_variants, make_email_versions
+    from utils.jd import fetch_url_text
+    from utils.keywords import extract_keywords, jd_match_table
+    from utils.project_index import select_projects
+    from utils.project_parser import convert_projects_for_prompt, parse_projects_input
+
+    jd_small, jd_large = make_jd(3000), make_jd(100_000)
+    letter_small, letter_large = MOCK_LETTER, make_jd(100_000, seed=3)
+    kw_small, kw_large = extract_keywords(jd_small), extract_keywords(jd_large)
+    portfolio = make_projects(1000)
+    portfolio_text = projects_as_text(portfolio)
+
+    with open(os.path.join(FIXTURES, "posting.html"), "rb") as f:
+        posting = f.read()
+    pages = {
+        "/posting.html": posting,
+        "/nested.html": nested_html(5000).encode(),
+        "/large.html": large_html(2_000_000).encode(),
+    }
+    _, site = serve_pages(pages)
+
+    _, stub_url = start_stub(latency=latency, seed=0)
+    os.environ["OPENAI_BASE_URL"] = stub_url
+    counter = itertools.count()
+
+    def generate(job_ad: str, projects: List[Dict[str, object]]):
+        # A distinct ad per call, as in real traffic, so JD-keyed memos miss; the portfolio index is reused.
+        job_ad = f"{job_ad}\nReference: {next(counter)}"
+        picks = select_projects(projects, job_ad)
+        letters, _, _ = generate_variants(
+            job_ad, "Senior Python Engineer", [], convert_projects_for_prompt([p["project"] for p in picks]),
+            "Professional", "300", False, "Alex Doe", "alex@example.com", "Berlin", "",
+            privacy=True, model_choice="gpt-4o-mini", variants=variants, fresh=True,
+        )
+        if len(letters) != variants:
+            raise RuntimeError(f"expected {variants} letters, got {len(letters)}")
+        return letters
+
+    cases: List[Case] = [
+        ("keywords.extract[jd_3k]", lambda: extract_keywords(jd_small), len(jd_small), "chars"),
+        ("keywords.extract[jd_100k]", lambda: extract_keywords(jd_large), len(jd_large), "chars"),
+        ("keywords.jd_match_table[letter_2k]", lambda: jd_match_table(kw_small, letter_small), len(letter_small), "chars"),
+        ("keywords.jd_match_table[text_100k]", lambda: jd_match_table(kw_large, letter_large), len(letter_large), "chars"),
+    ]
+    cases += [
+        ("email.make_email_versions[1]", lambda: make_email_versions([letter_small], kw_small), 1, "letters"),
+        (f"email.make_email_versions[{variants}]", lambda: make_email_versions([letter_small] * variants, kw_small),
+         variants, "letters"),
+    ]
+    cases += [(f"projects.parse[{fmt}_1000]", lambda text=text: parse_projects_input(text), len(portfolio), "projects")
+              for fmt, text in portfolio_text.items()]
+    cases += [(f"jd.fetch_url_text[{path[1:-5]}]", lambda url=site + path: fetch_url_text(url), len(body), "bytes")
+              for path, body in pages.items()]
+    cases += [
+        (f"generate_variants[{variants}x_jd_3k]", lambda: generate(jd_small, portfolio[:5]), variants, "letters"),
+        (f"generate_variants[{variants}x_jd_100k_1000_projects]", lambda: generate(jd_large, portfolio), variants, "letters"),
+    ]
+    return cases
+
+
+# --- measurement -------------------------------------------------------------
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+def measure(fn: Callable[[], object], budget_s: float, min_samples: int = 5,
+            max_samples: int = 2000) -> Dict[str, float]:
+    """Per-call latency percentiles (ms) and calls/s over about `budget_s` seconds."""
+    start = time.perf_counter()
+    fn()  # warm-up: imports, lazy compiles, connection setup
+    first = time.perf_counter() - start
+    inner = max(1, min(1000, int(MIN_SAMPLE_S / first))) if first > 0 else 1000
+    samples, calls, began = [], 0, time.perf_counter()
+    while len(samples) < max_samples and (len(samples) < min_samples or time.perf_counter() - began < budget_s):
+        t0 = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter() - t0) / inner)
+        calls += inner
+    elapsed = time.perf_counter() - began
+    samples.sort()
+    return {
+        "calls": calls,
+        "ops_per_s": round(calls / elapsed, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 4),
+        "p95_ms": round(percentile(samples, 95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 99) * 1000, 4),
+    }
+
+
+def _throughput(ops_per_s: float, work: float, unit: str) -> str:
+    rate = ops_per_s * work
+    for scale, prefix in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if rate >= scale:
+            return f"{rate / scale:.1f}{prefix} {unit}/s"
+    return f"{rate:.1f} {unit}/s"
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, metric: str = "p50_ms") -> Dict[str, float]:
+    """Cases whose `metric` grew by more than `threshold` (fraction), with the ratio to baseline."""
+    regressions = {}
+    for name, result in results.items():
+        before = baseline.get(name, {}).get(metric)
+        if before and result[metric] / before > 1 + threshold:
+            regressions[name] = result[metric] / before
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict[str, object]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", action="append", default=[], help="run cases whose name contains this (repeatable)")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds of sampling per case")
+    parser.add_argument("--quick", action="store_true", help="0.3s per case, for smoke runs")
+    parser.add_argument("--latency", default="fixed:0.05", help="stub latency spec (see services.stub_server)")
+    parser.add_argument("--variants", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.3, help="allowed p50 slowdown vs. baseline (0.3 = 30%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    budget = 0.3 if args.quick else args.budget
+
+    cases = [c for c in build_cases(args.latency, args.variants)
+             if not args.only or any(s in c[0] for s in args.only)]
+    baseline = load_baseline(args.baseline)
+    config = {"latency": args.latency, "variants": args.variants}
+    base_results = (baseline or {}).get("results", {})
+    if baseline and baseline.get("config") != config:
+        # End-to-end numbers are dominated by the stub latency; only compare like with like.
+        print(f"note: baseline was recorded with {baseline.get('config')}; skipping generate_variants comparison")
+        base_results = {k: v for k, v in base_results.items() if not k.startswith("generate_variants")}
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':50} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'throughput':>18}  vs baseline")
+    for name, fn, work, unit in cases:
+        result = measure(fn, budget)
+        results[name] = result
+        before = base_results.get(name, {}).get("p50_ms")
+        delta = f"{(result['p50_ms'] / before - 1) * 100:+.0f}%" if before else "–"
+        print(f"{name:50} {result['p50_ms']:10.3f} {result['p95_ms']:10.3f} {result['p99_ms']:10.3f} "
+              f"{_throughput(result['ops_per_s'], work, unit):>18}  {delta}", flush=True)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": f"{platform.platform()} / {platform.python_implementation()} {platform.python_version()}",
+        "config": config,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        if baseline and args.only:
+            report["results"] = {**baseline.get("results", {}), **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    regressions = compare(results, base_results, args.threshold)
+    for name, ratio in sorted(regressions.items()):
+        print(f"REGRESSION {name}: p50 {ratio:.2f}x baseline (threshold {1 + args.threshold:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Headless batch mode: generate letters for every job in a JSONL file.
+
+Each input line is one job::
+
+    {"id": "acme-1", "jd_text": "...", "jd_url": "https://...", "role": "Backend Intern",
+     "profile": {"name": "...", "email": "...", "phone": "...", "city": "...",
+                 "skills": ["Python"], "projects": [{"title": "...", "tech": [], "desc": "..."}]},
+     "options": {"tone": "Professional", "length_hint": 300, "variants": 1,
+                 "model": "gpt-4o-mini", "privacy": false, "redact": false, "include_header": true,
+                 "mode": "Standard", "extra_notes": "", "fresh": false, "email": false}}
+
+Only `jd_text` or `jd_url` is required. `options.privacy` means what it does in
+the UI: no model call; the record gets the `prompt` instead of letters, for use
+with a model of your own. `options.redact` only masks emails and phone numbers
+in the generated letters (the profile and ad are still sent to the model). `profile.projects` may also be a
+string in any format the UI accepts; lines that fail to parse are listed in
+the record's `project_errors`. With `options.email` the record also gets
+`emails`, a short email version of each letter (same order). Only the projects most relevant to
+each job (PROMPT_TOP_PROJECTS) go into its prompt; the index over a shared
+portfolio is built once for the whole run. Results are appended to the output
+JSONL as jobs finish; re-running with the same output file skips jobs that
+already succeeded.
+
+    python -m core.batch jobs.jsonl -o letters.jsonl --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Set, Tuple
+
+from core.generator import MAX_VARIANTS, generate_variants, make_email_versions, redact
+from core.prompt import build_prompt
+from services.backends import get_backend
+from services.history import HISTORY_ENABLED, history
+from services.ratelimit import BATCH, llm_scheduler, llm_session
+from utils.jd import clean_text, fetch_url_text
+from utils.keywords import extract_keywords
+from utils.project_index import select_projects
+from utils.project_parser import convert_projects_for_prompt, parse_projects
+
+log = logging.getLogger(__name__)
+
+
+def iter_jobs(path: str) -> Iterator[Tuple[str, Dict]]:
+    """Yield (job_id, record) lazily; the id defaults to the line number."""
+    with open(path, encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as exc:
+                log.warning("%s:%d: skipping invalid JSON (%s)", path, lineno, exc)
+                continue
+            if not isinstance(job, dict):
+                log.warning("%s:%d: skipping %s, expected a JSON object", path, lineno, type(job).__name__)
+                continue
+            yield str(job.get("id") or f"line-{lineno}"), job
+
+
+def completed_ids(out_path: str) -> Set[str]:
+    """Ids of jobs already written successfully to `out_path` (the checkpoint)."""
+    done: Set[str] = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            if rec.get("status") == "ok":
+                done.add(str(rec.get("id")))
+    return done
+
+
+def job_request(job: Dict, public_only: bool = False) -> Tuple[Dict, List[Dict], List[str]]:
+    """generate_variants keyword arguments for a job record, plus the project picks and parse errors.
+
+    `public_only` (API jobs) refuses a `jd_url` on a non-public address.
+    """
+    profile = job.get("profile") or {}
+    options = job.get("options") or {}
+    jd_text = job.get("jd_text") or ""
+    if not jd_text.strip() and job.get("jd_url"):
+        jd_text = fetch_url_text(job["jd_url"], public_only=public_only)
+    jd_text = clean_text(jd_text)
+    if not jd_text:
+        raise ValueError("job has no jd_text and its jd_url returned no text")
+
+    projects, project_errors = profile.get("projects") or [], []
+    if isinstance(projects, str):
+        projects, project_errors = parse_projects(projects)
+    picks = select_projects(projects, jd_text)
+    contact_line = " | ".join(v for v in [profile.get("email"), profile.get("phone")] if v)
+    extra = (options.get("extra_notes") or "").strip()
+    if options.get("mode"):
+        extra = (extra + f"\nMode preference: {options['mode']}").strip()
+
+    kwargs = dict(
+        job_ad=jd_text,
+        role_title=job.get("role", ""),
+        skills=profile.get("skills") or [],
+        projects=convert_projects_for_prompt([p["project"] for p in picks]),
+        tone=options.get("tone", "Professional"),
+        length_hint=str(options.get("length_hint", 300)),
+        include_header=bool(options.get("include_header", True)),
+        candidate_name=profile.get("name", ""),
+        contact_line=contact_line,
+        city=profile.get("city", ""),
+        extra_notes=extra,
+        privacy=bool(options.get("redact", False)),  # generate_variants' privacy= masks the output only
+        model_choice=options.get("model", "gpt-4o-mini"),
+        variants=max(1, min(MAX_VARIANTS, int(options.get("variants", 1)))),
+        fresh=bool(options.get("fresh", False)),
+    )
+    return kwargs, picks, project_errors
+
+
+def job_result(job: Dict, kwargs: Dict, letters: List[str], keywords: List[str], matches,
+               picks: List[Dict], project_errors: List[str]) -> Dict:
+    record = {"letters": letters, "keywords": keywords, "matches": matches,
+              "projects_used": [p["why"] for p in picks]}
+    if project_errors:
+        record["project_errors"] = project_errors
+    if (job.get("options") or {}).get("email"):
+        record["emails"] = make_email_versions(letters, keywords, kwargs["role_title"], kwargs["candidate_name"])
+    return record
+
+
+def is_private(job: Dict) -> bool:
+    return bool((job.get("options") or {}).get("privacy"))
+
+
+def private_result(job: Dict, kwargs: Dict, picks: List[Dict], project_errors: List[str]) -> Dict:
+    """The record for an `options.privacy` job: the prompt, built locally, and no model call (as in the UI)."""
+    keywords = extract_keywords(kwargs["job_ad"], top_k=20)
+    prompt = build_prompt(kwargs["job_ad"], kwargs["role_title"], kwargs["skills"], kwargs["projects"],
+                          kwargs["tone"], kwargs["length_hint"], kwargs["include_header"],
+                          kwargs["candidate_name"], kwargs["contact_line"], kwargs["city"],
+                          kwargs["extra_notes"], keywords=keywords)
+    record = {"letters": [], "prompt": prompt, "keywords": keywords, "matches": [],
+              "projects_used": [p["why"] for p in picks]}
+    if project_errors:
+        record["project_errors"] = project_errors
+    return record
+
+
+def remember(owner: str, kwargs: Dict, letters: List[str], keywords: List[str], matches) -> None:
+    """Store a finished generation in `owner`'s history (services.history), when HISTORY=1.
+
+    Emails and phone numbers are redacted from the letters first, and the
+    mock backend's placeholder letters are not stored.
+    """
+    if not HISTORY_ENABLED or get_backend().name == "mock":
+        return
+    history.record(owner, kwargs["job_ad"], [redact(letter, True) for letter in letters],
+                   role=kwargs["role_title"], model=kwargs["model_choice"], keywords=keywords, matches=matches)
+
+
+def run_job(job: Dict) -> Dict:
+    kwargs, picks, project_errors = job_request(job)
+    if is_private(job):
+        return private_result(job, kwargs, picks, project_errors)
+    letters, keywords, matches = generate_variants(**kwargs)
+    remember("batch", kwargs, letters, keywords, matches)
+    return job_result(job, kwargs, letters, keywords, matches, picks, project_errors)
+
+
+def _timed_job(job_id: str, job: Dict) -> Dict:
+    start = time.perf_counter()
+    try:
+        # batch calls queue behind interactive users of the same process
+        with llm_session(f"batch:{job_id}", BATCH):
+            rec = {"id": job_id, "status": "ok", **run_job(job)}
+    except Exception as exc:
+        rec = {"id": job_id, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    rec["latency_s"] = round(time.perf_counter() - start, 3)
+    return rec
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def run_batch(jobs_path: str, out_path: str, workers: int = 4, resume: bool = True) -> Dict[str, object]:
+    """Run every job on a bounded worker pool, appending results to `out_path`.
+
+    At most `2 * workers` jobs are in flight, so the jobs file is streamed
+    rather than loaded. Returns a throughput/latency report.
+    """
+    workers = max(1, workers)
+    done = completed_ids(out_path) if resume else set()
+    if not resume and os.path.exists(out_path):
+        os.remove(out_path)
+    latencies: List[float] = []
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    with open(out_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        def record(fut) -> None:
+            rec = fut.result()
+            with lock:
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                out.flush()
+                counts[rec["status"]] += 1
+                latencies.append(rec["latency_s"])
+            if rec["status"] == "error":
+                log.warning("job %s failed: %s", rec["id"], rec["error"])
+
+        in_flight = set()
+        for job_id, job in iter_jobs(jobs_path):
+            if job_id in done:
+                counts["skipped"] += 1
+                continue
+            if len(in_flight) >= 2 * workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    record(fut)
+            in_flight.add(pool.submit(_timed_job, job_id, job))
+        for fut in wait(in_flight).done:
+            record(fut)
+
+    elapsed = time.perf_counter() - start
+    processed = counts["ok"] + counts["error"]
+    return {
+        **counts,
+        "elapsed_s": round(elapsed, 2),
+        "jobs_per_min": round(processed / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "latency_p99_s": percentile(latencies, 99),
+        "llm_queue": llm_scheduler.stats(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate cover letters for a JSONL file of jobs.")
+    parser.add_argument("jobs", help="input JSONL, one job per line")
+    parser.add_argument("-o", "--output", default="letters.jsonl", help="output JSONL (also the checkpoint)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="jobs processed concurrently")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of skipping finished jobs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per request otherwise
+    report = run_batch(args.jobs, args.output, workers=args.workers, resume=not args.no_resume)
+    print(json.dumps(report, indent=2))
+    return 0 if report["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
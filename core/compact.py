@@ -0,0 +1,222 @@
+
+import math
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.keywords import match_matrix
+
+# Token budget for the job ad inside the prompt; 0 disables trimming (boilerplate
+# and duplicate removal still apply).
+JD_TOKEN_BUDGET = int(os.getenv("PROMPT_JD_TOKEN_BUDGET", "1200"))
+
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    """tiktoken's o200k_base encoder when installed and loadable, else None."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = None  # not installed, or the BPE file can't be downloaded
+    return _encoder
+
+
+_APPROX_TOKEN_RE = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def count_tokens(text: str) -> int:
+    """Model tokens in `text`; falls back to a local estimate (letter runs of <=6,
+    digit runs of <=3, punctuation) that tracks BPE counts closely for English."""
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return len(_APPROX_TOKEN_RE.findall(text))
+
+
+def tokenizer_name() -> str:
+    return "tiktoken/o200k_base" if _get_encoder() is not None else "approx"
+
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9•\-*\"'(])|\s*[•·▪●]\s*|\n+")
+
+# Sentences that carry no requirement signal: EEO/legal statements and how-to-apply mechanics.
+# Dropped only when the ad is over budget.
+_BOILERPLATE_RE = re.compile(
+    r"equal (employment )?opportunit|\beeo\b|affirmative action|without regard to|"
+    r"regardless of (race|gender|age|religion|sex)|protected (veteran|characteristic|status)|"
+    r"reasonable accommodation|e-verify|all qualified applicants|"
+    r"apply (now|today)|click (here )?(to )?apply|to apply,|how to apply|"
+    r"recruitment agenc|do not accept unsolicited",
+    re.I,
+)
+
+_REQUIREMENT_RE = re.compile(
+    r"\b(must|required|requirements?|experience|proficien\w*|knowledge|skills?|"
+    r"qualifications?|responsib\w*|you will|you'll|degree|familiar\w*|ability|years?)\b",
+    re.I,
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text or "") if s and s.strip()]
+
+
+_BULLET_RE = re.compile(r"[•·▪●]")
+
+
+def _segments(text: str) -> List[Tuple[str, str]]:
+    """split_sentences, with the separator before each sentence kept as its lead,
+    so line breaks and bullets can be put back around the sentences that stay."""
+    out, lead, pos = [], "", 0
+    for m in _SENTENCE_SPLIT_RE.finditer(text or ""):
+        sentence = text[pos:m.start()].strip()
+        if sentence:
+            out.append((lead, sentence))
+            lead = m.group()
+        else:
+            lead += m.group()
+        pos = m.end()
+    sentence = (text or "")[pos:].strip()
+    if sentence:
+        out.append((lead, sentence))
+    return out
+
+
+def _join(segments: Sequence[Tuple[str, str]]) -> str:
+    """Reassemble kept segments: a lead with a line break or bullet is kept as written,
+    any other lead becomes one space; the first segment keeps its bullet, not blank lines."""
+    parts = []
+    for lead, sentence in segments:
+        if not parts:
+            lead = lead.lstrip()
+        elif "\n" not in lead and not _BULLET_RE.search(lead):
+            lead = " "
+        parts.append(lead + sentence)
+    return "".join(parts)
+
+
+def _cost(lead: str, sentence: str) -> int:
+    return count_tokens(sentence) + max(1, count_tokens(lead))
+
+
+def _norm(sentence: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", sentence.lower()).strip()
+
+
+def _windows(segment: str, cost: int, max_tokens: int) -> List[str]:
+    """Split an over-long segment (a bullet list with no sentence punctuation) into word windows."""
+    words = segment.split()
+    parts = math.ceil(cost / max_tokens)
+    size = math.ceil(len(words) / parts)
+    return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+
+def _truncate(text: str, token_budget: int) -> str:
+    """The longest word prefix of `text` within `token_budget` (at least one word)."""
+    words = text.split()
+    lo, hi = 1, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid])) <= token_budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+def compact_job_ad(job_ad: str,
+                   keywords: Sequence[str] = (),
+                   token_budget: int = JD_TOKEN_BUDGET,
+                   report: Optional[Dict[str, object]] = None) -> str:
+    """Shrink the job ad before it goes into the prompt.
+
+    An ad within `token_budget` is returned unchanged. Otherwise repeated
+    sentences are dropped; if the rest is still over budget, EEO/legal and
+    how-to-apply sentences go next; segments longer than a quarter of the
+    budget (unpunctuated bullet lists) are cut into word windows, and the
+    windows and sentences that mention the most requirement keywords are
+    kept, in their original order, with their line breaks and bullets. A
+    non-empty ad never compacts to nothing: if no segment fits, the best one
+    is truncated to the budget. The text is returned unchanged whenever
+    nothing was removed, so callers can tell a verbatim ad by identity.
+    Fills `report` with before/after token counts when given.
+    """
+    tokens_before = count_tokens(job_ad or "")
+    segments = _segments(job_ad)
+    kept, seen = [], set()
+    duplicates = boilerplate = dropped = 0
+    if token_budget and tokens_before <= token_budget:
+        kept = segments
+    else:
+        for lead, s in segments:
+            key = _norm(s)
+            if not key:
+                continue
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            kept.append((lead, s))
+
+    costs = [_cost(lead, s) for lead, s in kept]
+    if token_budget and tokens_before > token_budget and sum(costs) > token_budget:
+        limit = max(token_budget // 4, 1)
+        pieces = []
+        for (lead, s), cost in zip(kept, costs):
+            if _BOILERPLATE_RE.search(s):
+                boilerplate += 1
+            elif cost > limit:
+                pieces.extend((lead if i == 0 else " ", w) for i, w in enumerate(_windows(s, cost, limit)))
+            else:
+                pieces.append((lead, s))
+        kept = pieces
+        costs = [_cost(lead, s) for lead, s in kept]
+
+    if token_budget and tokens_before > token_budget and sum(costs) > token_budget:
+        texts = [s for _, s in kept]
+        matrix = match_matrix(list(keywords), texts)  # keywords x sentences
+        # A keyword found in most sentences (repeated filler) says little about
+        # any one of them, so each keyword is weighted by its rarity (IDF).
+        n = len(kept)
+        weights = [math.log((n + 1) / (1 + sum(1 for c in row if c))) for row in matrix]
+        hits = [sum(w for w, row in zip(weights, matrix) if row[i]) for i in range(n)]
+
+        def score(i: int) -> float:
+            cue = 1 if _REQUIREMENT_RE.search(texts[i]) else 0
+            # slight preference for earlier sentences (titles, summaries) on ties
+            return hits[i] * 2 + cue - i / (n * 10)
+
+        ranked = sorted(range(n), key=score, reverse=True)
+        chosen, used = set(), 0
+        for i in ranked:
+            if used + costs[i] <= token_budget:
+                chosen.add(i)
+                used += costs[i]
+        if chosen:
+            dropped = n - len(chosen)
+            kept = [seg for i, seg in enumerate(kept) if i in chosen]
+        elif ranked:
+            dropped = n - 1
+            lead, s = kept[ranked[0]]
+            kept = [(lead, _truncate(s, token_budget))]
+
+    removed = kept != segments
+    compacted = _join(kept) if removed else (job_ad or "")
+    if report is not None:
+        report.update({
+            "tokenizer": tokenizer_name(),
+            "jd_tokens_before": tokens_before,
+            "jd_tokens_after": count_tokens(compacted) if removed else tokens_before,
+            "sentences_before": len(segments),
+            "sentences_after": len(kept),
+            "boilerplate_removed": boilerplate,
+            "duplicates_removed": duplicates,
+            "dropped_for_budget": dropped,
+        })
+    return compacted
@@ -1,35 +1,297 @@
 
+import contextvars
+import logging
+import math
+import os
 import re
 import time
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from queue import Queue
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple
 
+from core.compact import count_tokens
 from core.prompt import build_prompt
-from services.llm import generate_letter
-from utils.keywords import extract_keywords, jd_match_table
+from services.cache import CACHE_ENABLED, cache_key, response_cache
+from services.backends import NOT_INSTALLED
+from services.llm import (TEMPERATURE, api_key_configured, generate_letter, generate_letters, get_backend,
+                          stream_letter, stream_letters, supports_multi_choice)
+from services.ratelimit import llm_scheduler
+from utils.keywords import extract_keywords, match_matrix, rank_by_coverage
+from utils.memo import memoize
+from utils.trace import traced
 
+log = logging.getLogger(__name__)
 
+_extract_keywords = memoize("extract_keywords", maxsize=64)(extract_keywords)
+
+MAX_CONCURRENCY = 5
+MAX_VARIANTS = 5  # the UI slider's range; batch and API jobs are clamped to it
+CALL_TIMEOUT = 60.0
+# Completion tokens reserved per choice when a request is admitted against the tokens/min budget.
+COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", "700"))
+
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"\+?\d[\d\-\s]{7,}\d")
+_EMAIL_CHARS = re.compile(r"[A-Za-z0-9._%+@-]")
+_PHONE_CHARS = re.compile(r"[\d+\-\s]")
+
+
+@traced("redact", lambda out, text, *a, **k: {"chars": len(text)})
 def redact(text: str, enable: bool) -> str:
     if not enable:
         return text
-    text = re.sub(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}", "[email]", text)
-    text = re.sub(r"\+?\d[\d\-\s]{7,}\d", "[phone]", text)
+    text = EMAIL_RE.sub("[email]", text)
+    text = PHONE_RE.sub("[phone]", text)
     return text
 
 
-def make_email_version(letter: str) -> str:
-    lines = [ln.strip() for ln in letter.splitlines() if ln.strip()]
-    _ = " ".join(lines)
-    _ = re.sub(r"\s+", " ", _)
-    email = (
-        "Subject: Application for the role\n\n"
-        "Hi team,\n\n"
-        "I'm reaching out to apply for the role. "
-        "I bring relevant hands-on experience and a track record of delivering practical solutions. "
-        "I'd love to contribute this summer and learn your stack quickly. "
-        "Attached is my CV and cover letter.\n\n"
-        "Best regards,\nYour Name"
-    )
-    return email
+def _safe_cut(text: str) -> int:
+    """Last index where no email/phone match can span text[:i] and text[i:].
+
+    Both patterns only match runs of their own character class, so a boundary
+    between two characters that are not both in a class can never be crossed.
+    """
+    for i in range(len(text) - 1, 0, -1):
+        a, b = text[i - 1], text[i]
+        if _EMAIL_CHARS.match(a) and _EMAIL_CHARS.match(b):
+            continue
+        if _PHONE_CHARS.match(a) and _PHONE_CHARS.match(b):
+            continue
+        return i
+    return 0
+
+
+class StreamRedactor:
+    """Incremental `redact`: holds back any tail that could still grow into a match."""
+
+    def __init__(self, enable: bool):
+        self.enable = enable
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        if not self.enable:
+            return chunk
+        self._pending += chunk
+        cut = _safe_cut(self._pending)
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return redact(ready, True)
+
+    def flush(self) -> str:
+        ready, self._pending = self._pending, ""
+        return redact(ready, self.enable)
+
+
+def redact_stream(chunks: Iterable[str], enable: bool) -> Iterator[str]:
+    redactor = StreamRedactor(enable)
+    for chunk in chunks:
+        out = redactor.feed(chunk)
+        if out:
+            yield out
+    tail = redactor.flush()
+    if tail:
+        yield tail
+
+
+# "... for the Senior Data Engineer role/position ..." in a letter's opening
+_ROLE_RE = re.compile(r"\b(?:for|as)\s+(?:the|a|an|your)\s+((?:[A-Z][\w/&+#.-]*\s+){0,5}?[A-Z][\w/&+#.-]*)"
+                      r"\s+(?:role|position|opening|internship|vacancy)\b")
+
+
+@traced("make_email_versions", lambda out, letters, *a, **k: {"letters": len(letters)})
+def make_email_versions(letters: List[str], keywords: Iterable[str] = (), role: str = "",
+                        name: str = "") -> List[str]:
+    """A short application email per letter, from that letter's most salient sentences.
+
+    Extractive and local (core.summarize: TextRank weighted by the JD
+    keywords), so every variant is done in one pass of a few milliseconds
+    and no second model call. `role` and `name` default to what the letter
+    says (its opening, its sign-off).
+    """
+    from core.summarize import summarize  # NumPy loads on first use, not with the UI
+
+    keywords = list(keywords)
+    emails = []
+    for letter, (greeting, sentences, signer) in zip(letters, summarize(letters, keywords)):
+        found = _ROLE_RE.search(letter)
+        title = role or (found.group(1) if found else "")
+        sender = name or signer
+        if title:
+            subject = f"Application for {title}" + (f" – {sender}" if sender else "")
+        else:
+            covered = [kw for kw, row in zip(keywords, match_matrix(keywords, [" ".join(sentences)])) if row[0]]
+            subject = "Application" + (f": {', '.join(covered[:3])} experience" if covered else " for the role")
+        body = " ".join(sentences) or re.sub(r"\s+", " ", letter).strip()[:500]
+        emails.append(
+            f"Subject: {subject}\n\n{greeting or 'Hi team,'}\n\n{body}\n\n"
+            f"Attached are my CV and cover letter. Thank you for your time.\n\n"
+            f"Best regards,\n{sender or 'Your Name'}"
+        )
+    return emails
+
+
+def make_email_version(letter: str, keywords: Iterable[str] = (), role: str = "", name: str = "") -> str:
+    return make_email_versions([letter], keywords, role, name)[0]
+
+
+def _build_prompt(job_ad, role_title, skills, projects, tone, length_hint, include_header,
+                  candidate_name, contact_line, city, extra_notes,
+                  report: Optional[Dict[str, object]]) -> str:
+    """build_prompt with JD compaction guided by the JD keywords; logs the token savings."""
+    report = {} if report is None else report
+    prompt = build_prompt(job_ad, role_title, skills, projects, tone, length_hint,
+                          include_header, candidate_name, contact_line, city, extra_notes,
+                          keywords=_extract_keywords(job_ad, top_k=20), report=report)
+    log.info("prompt tokens %s -> %s (job ad %s -> %s, %s)",
+             report.get("prompt_tokens_before"), report.get("prompt_tokens_after"),
+             report.get("jd_tokens_before"), report.get("jd_tokens_after"), report.get("tokenizer"))
+    return prompt
+
+
+def _variant_keys(prompt: str, model_choice: str, variants: int) -> List[Optional[str]]:
+    """Cache key per variant slot, or None when responses must not be cached (mock output)."""
+    if not (CACHE_ENABLED and api_key_configured()):
+        return [None] * variants
+    params = {"temperature": TEMPERATURE}
+    endpoint = get_backend().key
+    return [cache_key(prompt, model_choice, params, i, endpoint) for i in range(variants)]
+
+
+def _store(key: Optional[str], letter: str) -> None:
+    """Cache one finished letter; empty output and the SDK-missing notice are never cached."""
+    letter = letter.strip()
+    if key and letter and letter != NOT_INSTALLED:
+        response_cache.put(key, letter)
+
+
+class Queued:
+    """Stream event payload: the variant is waiting in the shared LLM queue at `position`."""
+
+    __slots__ = ("position",)
+
+    def __init__(self, position: int):
+        self.position = position
+
+    def __repr__(self) -> str:
+        return f"Queued({self.position})"
+
+
+def _admit(prompt: str, choices: int, timeout: Optional[float],
+           on_wait: Optional[Callable[[int], None]] = None) -> None:
+    """Wait for the process-wide scheduler (services.ratelimit); TimeoutError if the wait exceeds `timeout`."""
+    tokens = count_tokens(prompt) + COMPLETION_TOKENS * choices
+    if not llm_scheduler.acquire(tokens, timeout=timeout, on_wait=on_wait):
+        raise TimeoutError(f"no LLM capacity within {timeout:.0f}s")
+
+
+def _submit(pool: ThreadPoolExecutor, fn, *args):
+    """pool.submit that carries the caller's llm_session (and other context) into the worker."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _limited_call(prompt: str, model_choice: str, timeout: Optional[float], key: Optional[str]) -> str:
+    _admit(prompt, 1, timeout)
+    letter = generate_letter(prompt, model_choice=model_choice, timeout=timeout)
+    _store(key, letter)
+    return letter
+
+
+def _multi_call(prompt: str, model_choice: str, slots: List[int], timeout: Optional[float],
+                keys: List[Optional[str]], usage: Dict[str, int]) -> Dict[int, str]:
+    """Fill `slots` from one `n`-choice request; slots the endpoint left empty are omitted."""
+    _admit(prompt, len(slots), timeout)
+    letters = generate_letters(prompt, len(slots), model_choice=model_choice, timeout=timeout, usage=usage)
+    filled = dict(zip(slots, letters))
+    for i, letter in filled.items():
+        _store(keys[i], letter)
+    return filled
+
+
+def _report_requests(report: Optional[Dict[str, object]], prompt: str, variants: int, cached: int,
+                     requests: int, shared: int, prompt_tokens: Optional[int], start: float) -> None:
+    """Record how the variants were obtained and what one `n`-choice request saved."""
+    saved = max(0, shared - 1)
+    if report is None:
+        report = {}
+    report.update({
+        "variants": variants,
+        "cached_variants": cached,
+        "requests": requests,
+        "choices_per_request": shared,
+        "round_trips_saved": saved,
+        "input_tokens_saved": saved * (prompt_tokens or count_tokens(prompt)),
+        "generation_s": round(time.perf_counter() - start, 3),
+    })
+    log.info("%d variants: %d cached, %d requests (%d from one multi-choice request), "
+             "%d input tokens saved, %.2fs", variants, cached, requests, shared,
+             report["input_tokens_saved"], report["generation_s"])
+
+
+@traced("run_variants", lambda out, prompt, model_choice, variants, *a, **k: {"variants": variants, "returned": len(out)})
+def run_variants(prompt: str,
+                 model_choice: str,
+                 variants: int,
+                 max_concurrency: int = MAX_CONCURRENCY,
+                 timeout: Optional[float] = CALL_TIMEOUT,
+                 fresh: bool = False,
+                 report: Optional[Dict[str, object]] = None) -> List[str]:
+    """Request `variants` letters; keep successes in request order.
+
+    Variant slots already in the response cache are reused and only the missing
+    ones are generated; `fresh=True` skips the lookup (results are still stored).
+    Missing slots are requested as `n` choices of a single request when the
+    endpoint supports it, otherwise (or for whatever that request did not
+    return) concurrently, one request each. Failed or timed-out variants are
+    logged and dropped. Raises only when every variant fails, so the caller
+    can fall back. `report` receives request counts and the savings.
+    """
+    if variants <= 0:
+        return []
+    start = time.perf_counter()
+    keys = _variant_keys(prompt, model_choice, variants)
+    results: Dict[int, str] = {}
+    if not fresh:
+        for i, key in enumerate(keys):
+            hit = response_cache.get(key) if key else None
+            if hit is not None:
+                results[i] = hit
+    cached = len(results)
+    missing = [i for i in range(variants) if i not in results]
+    requests, shared, usage = 0, 0, {}
+    if len(missing) > 1 and supports_multi_choice(model_choice):
+        requests += 1
+        try:
+            filled = _multi_call(prompt, model_choice, missing, timeout, keys, usage)
+            results.update(filled)
+            shared = len(filled)
+        except Exception as exc:
+            log.info("multi-choice request failed (%s); requesting variants one by one", exc)
+        missing = [i for i in missing if i not in results]
+    errors = []
+    if missing:
+        requests += len(missing)
+        workers = max(1, min(len(missing), max_concurrency))
+        # Calls run in waves of `workers`; give each wave its own timeout.
+        deadline = time.monotonic() + timeout * math.ceil(len(missing) / workers) if timeout else None
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="variant")
+        futures = {i: _submit(pool, _limited_call, prompt, model_choice, timeout, keys[i]) for i in missing}
+        try:
+            for i, fut in futures.items():
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    results[i] = fut.result(timeout=remaining)
+                except FutureTimeout as exc:
+                    log.warning("variant %d timed out after %.1fs", i + 1, timeout)
+                    errors.append(exc)
+                except Exception as exc:
+                    log.warning("variant %d failed: %s", i + 1, exc)
+                    errors.append(exc)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _report_requests(report, prompt, variants, cached, requests, shared, usage.get("prompt_tokens"), start)
+    if not results and errors:
+        raise errors[0]
+    return [results[i] for i in sorted(results)]
 
 
 def generate_variants(job_ad: str,
@@ -45,15 +307,170 @@ def generate_variants(job_ad: str,
                       extra_notes: str,
                       privacy: bool,
                       model_choice: str,
-                      variants: int = 1):
-    prompt = build_prompt(job_ad, role_title, skills, projects, tone, length_hint,
-                          include_header, candidate_name, contact_line, city, extra_notes)
-    letters = []
-    for i in range(variants):
-        letter = generate_letter(prompt, model_choice=model_choice)
-        letter = redact(letter, privacy)
-        letters.append(letter)
-        time.sleep(0.1)
-    keywords = extract_keywords(job_ad, top_k=20)
-    matches = jd_match_table(keywords, letters[0] if letters else "")
+                      variants: int = 1,
+                      max_concurrency: int = MAX_CONCURRENCY,
+                      timeout: Optional[float] = CALL_TIMEOUT,
+                      fresh: bool = False,
+                      prompt_report: Optional[Dict[str, object]] = None):
+    prompt = _build_prompt(job_ad, role_title, skills, projects, tone, length_hint,
+                           include_header, candidate_name, contact_line, city, extra_notes,
+                           prompt_report)
+    letters = run_variants(prompt, model_choice, variants, max_concurrency, timeout, fresh, prompt_report)
+    letters = [redact(letter, privacy) for letter in letters]
+    return score_letters(job_ad, letters)
+
+
+@traced("score_letters", lambda out, job_ad, letters: {"letters": len(letters)})
+def score_letters(job_ad: str, letters: List[str]):
+    """Score every variant against the JD keywords and put the best-covering one first.
+
+    Returns (letters ranked best first, keywords, matches for the best letter).
+    """
+    keywords = _extract_keywords(job_ad, top_k=20)
+    matrix = match_matrix(keywords, letters)
+    order = rank_by_coverage(matrix)
+    letters = [letters[i] for i in order]
+    best = order[0] if order else None
+    matches = [(kw, best is not None and row[best] > 0) for kw, row in zip(keywords, matrix)]
     return letters, keywords, matches
+
+
+_DONE = object()
+_RETRY = object()
+
+
+def _stream_worker(out: Queue, index: int, prompt: str, model_choice: str,
+                   privacy: bool, timeout: Optional[float], key: Optional[str]) -> None:
+    try:
+        _admit(prompt, 1, timeout, lambda position: out.put((index, Queued(position))))
+        redactor = StreamRedactor(privacy)
+        raw = []
+        for chunk in stream_letter(prompt, model_choice=model_choice, timeout=timeout):
+            raw.append(chunk)
+            ready = redactor.feed(chunk)
+            if ready:
+                out.put((index, ready))
+        tail = redactor.flush()
+        if tail:
+            out.put((index, tail))
+        _store(key, "".join(raw))
+    except Exception as exc:
+        log.warning("variant %d failed: %s", index + 1, exc)
+        out.put((index, None))
+    finally:
+        out.put((index, _DONE))
+
+
+def _stream_multi_worker(out: Queue, slots: List[int], prompt: str, model_choice: str,
+                         privacy: bool, timeout: Optional[float], keys: List[Optional[str]]) -> None:
+    """Stream one `n`-choice request; choice j feeds variant slots[j].
+
+    Slots that received no text (the endpoint rejected or ignored `n`) are
+    handed back with `_RETRY` so they can be requested on their own.
+    """
+    redactors = [StreamRedactor(privacy) for _ in slots]
+    raw: List[List[str]] = [[] for _ in slots]
+    failed = False
+    def queued(position: int) -> None:
+        for i in slots:
+            out.put((i, Queued(position)))
+
+    try:
+        _admit(prompt, len(slots), timeout, queued)
+        for j, chunk in stream_letters(prompt, len(slots), model_choice=model_choice, timeout=timeout):
+            if j >= len(slots):
+                continue
+            raw[j].append(chunk)
+            ready = redactors[j].feed(chunk)
+            if ready:
+                out.put((slots[j], ready))
+    except Exception as exc:
+        log.warning("multi-choice request failed: %s", exc)
+        failed = True
+    for j, i in enumerate(slots):
+        if not raw[j]:
+            out.put((i, _RETRY))
+            continue
+        if failed:
+            out.put((i, None))
+        else:
+            tail = redactors[j].flush()
+            if tail:
+                out.put((i, tail))
+            _store(keys[i], "".join(raw[j]))
+        out.put((i, _DONE))
+
+
+def stream_variants(job_ad: str,
+                    role_title: str,
+                    skills: List[str],
+                    projects: List[Dict[str,str]],
+                    tone: str,
+                    length_hint: str,
+                    include_header: bool,
+                    candidate_name: str,
+                    contact_line: str,
+                    city: str,
+                    extra_notes: str,
+                    privacy: bool,
+                    model_choice: str,
+                    variants: int = 1,
+                    max_concurrency: int = MAX_CONCURRENCY,
+                    timeout: Optional[float] = CALL_TIMEOUT,
+                    fresh: bool = False,
+                    prompt_report: Optional[Dict[str, object]] = None) -> Iterator[Tuple[int, Optional[str]]]:
+    """Streaming counterpart of generate_variants.
+
+    Yields `(variant_index, chunk)` as redacted text arrives from all variants
+    concurrently; cached variants arrive as a single chunk. Uncached variants
+    share one `n`-choice request when the endpoint supports it. A
+    `(variant_index, None)` event means that variant failed and its partial
+    text should be dropped; `(variant_index, Queued(position))` means it is
+    still waiting for capacity in the shared LLM queue. Use `score_letters` on the assembled
+    letters to rank them and get keywords and matches.
+    """
+    prompt = _build_prompt(job_ad, role_title, skills, projects, tone, length_hint,
+                           include_header, candidate_name, contact_line, city, extra_notes,
+                           prompt_report)
+    if variants <= 0:
+        return
+    start = time.perf_counter()
+    keys = _variant_keys(prompt, model_choice, variants)
+    missing = []
+    for i, key in enumerate(keys):
+        cached = response_cache.get(key) if key and not fresh else None
+        if cached is None:
+            missing.append(i)
+            continue
+        for piece in redact_stream([cached], privacy):
+            yield i, piece
+
+    out: Queue = Queue()
+    pool = ThreadPoolExecutor(max_workers=max(1, min(len(missing), max_concurrency)), thread_name_prefix="variant")
+    multi = len(missing) > 1 and supports_multi_choice(model_choice)
+    if multi:
+        _submit(pool, _stream_multi_worker, out, missing, prompt, model_choice, privacy, timeout, keys)
+    else:
+        for i in missing:
+            _submit(pool, _stream_worker, out, i, prompt, model_choice, privacy, timeout, keys[i])
+    pending, failed, retried = len(missing), 0, 0
+    try:
+        while pending:
+            index, piece = out.get()
+            if piece is _DONE:
+                pending -= 1
+                continue
+            if piece is _RETRY:
+                retried += 1
+                _submit(pool, _stream_worker, out, index, prompt, model_choice, privacy, timeout, keys[index])
+                continue
+            if piece is None:
+                failed += 1
+            yield index, piece
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    shared = len(missing) - retried if multi else 0
+    requests = (1 if multi else 0) + (retried if multi else len(missing))
+    _report_requests(prompt_report, prompt, variants, variants - len(missing), requests, shared, None, start)
+    if failed == variants:
+        raise RuntimeError("all variants failed")
@@ -0,0 +1,189 @@
+"""In-process job queue for the HTTP API (api.py).
+
+Jobs run on a fixed pool of worker threads, so slow generations never hold
+a request handler. Each job keeps the events it has produced (streamed
+chunks, queue positions, failed variants); clients poll them by offset or
+subscribe for server-sent events. Finished jobs are kept for API_JOB_TTL_S.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from core.batch import is_private, job_request, job_result, private_result, remember
+from core.generator import Queued, score_letters, stream_variants
+from services.ratelimit import INTERACTIVE, current_session, llm_session
+
+log = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("API_JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("API_JOB_QUEUE_MAX", "100"))  # queued + running before submit is refused
+JOB_TTL = float(os.getenv("API_JOB_TTL_S", "3600"))
+
+QUEUED, RUNNING, DONE, ERROR = "queued", "running", "done", "error"
+Emit = Callable[[Dict[str, object]], None]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, session: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.session = session
+        self.status = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict[str, object]] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, object]] = []
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def terminal(self) -> bool:
+        return self.status in (DONE, ERROR)
+
+    def emit(self, event: Dict[str, object]) -> None:
+        with self._lock:
+            self.events.append(event)
+            listeners = list(self._listeners)
+        for notify in listeners:
+            notify()
+
+    def _start(self) -> None:
+        with self._lock:
+            self.status, self.started = RUNNING, time.time()
+
+    def _finish(self, status: str, result: Optional[Dict[str, object]] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.status, self.result, self.error = status, result, error
+            self.finished = time.time()
+            listeners = list(self._listeners)
+        for notify in listeners:
+            notify()
+
+    def listen(self, notify: Callable[[], None]) -> Callable[[], None]:
+        """Call `notify` (from a worker thread) on every new event and on completion; returns the unsubscribe."""
+        with self._lock:
+            self._listeners.append(notify)
+
+        def remove() -> None:
+            with self._lock:
+                if notify in self._listeners:
+                    self._listeners.remove(notify)
+        return remove
+
+    def to_dict(self, events_from: Optional[int] = None) -> Dict[str, object]:
+        with self._lock:
+            out: Dict[str, object] = {
+                "id": self.id, "kind": self.kind, "status": self.status,
+                "created": self.created, "started": self.started, "finished": self.finished,
+                "result": self.result, "error": self.error, "next_event": len(self.events),
+            }
+            if events_from is not None:
+                out["events"] = self.events[max(0, events_from):]
+        return out
+
+
+class JobQueue:
+    """Bounded FIFO of jobs served by `workers` threads."""
+
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_QUEUE_MAX, ttl: float = JOB_TTL):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self._workers = max(1, workers)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"submitted": 0, "done": 0, "error": 0, "rejected": 0}
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.terminal and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, fn: Callable[..., Dict[str, object]], *args, session: str = "api") -> Job:
+        """Queue `fn(*args, emit)`; QueueFull when max_pending jobs are already waiting or running."""
+        job = Job(kind, session)
+        with self._lock:
+            self._purge()
+            if sum(1 for j in self._jobs.values() if not j.terminal) >= self.max_pending:
+                self._counts["rejected"] += 1
+                raise QueueFull(f"{self.max_pending} jobs already pending")
+            self._jobs[job.id] = job
+            self._counts["submitted"] += 1
+        self._pool.submit(contextvars.copy_context().run, self._run, job, fn, args)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Dict[str, object]], args) -> None:
+        job._start()
+        try:
+            with llm_session(job.session, INTERACTIVE):
+                result = fn(*args, job.emit)
+        except Exception as exc:
+            log.warning("job %s (%s) failed: %s", job.id, job.kind, exc)
+            job._finish(ERROR, error=f"{type(exc).__name__}: {exc}")
+            status = ERROR
+        else:
+            job._finish(DONE, result=result)
+            status = DONE
+        with self._lock:
+            self._counts[status] += 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            states = [j.status for j in self._jobs.values()]
+            counts = dict(self._counts)
+        return {
+            "workers": self._workers,
+            "queued": states.count(QUEUED),
+            "running": states.count(RUNNING),
+            "stored": len(states),
+            **counts,
+        }
+
+
+def generate_job(record: Dict[str, object], emit: Emit) -> Dict[str, object]:
+    """Run one batch-format job record, emitting its letters as they stream.
+
+    Events: {"type": "chunk", "variant", "text"}, {"type": "queued",
+    "variant", "position"} and {"type": "failed", "variant"} (drop that
+    variant's partial text). The result is the batch record (letters ranked
+    best first, keywords, matches, projects_used) plus the prompt report.
+    """
+    kwargs, picks, project_errors = job_request(record, public_only=True)  # jd_url comes from an API caller
+    if is_private(record):
+        return private_result(record, kwargs, picks, project_errors)
+    report: Dict[str, object] = {}
+    parts: Dict[int, str] = {}
+    for i, chunk in stream_variants(prompt_report=report, **kwargs):
+        if chunk is None:
+            parts.pop(i, None)
+            emit({"type": "failed", "variant": i})
+        elif isinstance(chunk, Queued):
+            emit({"type": "queued", "variant": i, "position": chunk.position})
+        else:
+            parts[i] = parts.get(i, "") + chunk
+            emit({"type": "chunk", "variant": i, "text": chunk})
+    letters, keywords, matches = score_letters(kwargs["job_ad"], [parts[i].strip() for i in sorted(parts)])
+    remember(current_session(), kwargs, letters, keywords, matches)  # the caller's api:<session>
+    return {**job_result(record, kwargs, letters, keywords, matches, picks, project_errors),
+            "prompt_report": report}
+
+
+# One queue per process, shared by every API client.
+job_queue = JobQueue()
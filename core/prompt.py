@@ -1,5 +1,10 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence
 
+from core.compact import JD_TOKEN_BUDGET, compact_job_ad, count_tokens
+from utils.trace import traced
+
+
+@traced("build_prompt", lambda prompt, *a, **k: {"prompt_chars": len(prompt), "prompt_tokens": count_tokens(prompt)})
 def build_prompt(job_ad: str,
                  role_title: str,
                  skills: List[str],
@@ -10,7 +15,18 @@ def build_prompt(job_ad: str,
                  candidate_name: str,
                  contact_line: str,
                  city: str,
-                 extra_notes: str) -> str:
+                 extra_notes: str,
+                 jd_token_budget: Optional[int] = JD_TOKEN_BUDGET,
+                 keywords: Sequence[str] = (),
+                 report: Optional[Dict[str, object]] = None) -> str:
+    """Assemble the LLM prompt.
+
+    Unless `jd_token_budget` is None, the job ad is compacted first (see
+    core.compact); `report` receives the JD and whole-prompt token counts.
+    """
+    verbatim_ad = job_ad
+    if jd_token_budget is not None:
+        job_ad = compact_job_ad(job_ad, keywords, jd_token_budget, report)
     proj_lines = []
     for p in projects:
         name = p.get("name","")
@@ -31,7 +47,7 @@ Rules:
 - Company name may be inferred if present in the job text; otherwise keep it generic.
 - Return only the letter body (no surrounding commentary).
 
-JOB AD (verbatim):
+JOB AD ({"verbatim" if job_ad == verbatim_ad else "condensed"}):
 \"\"\"
 {job_ad}
 \"\"\"
@@ -50,4 +66,10 @@ EXTRA NOTES (optional, constraints / focus): {extra_notes}
 
 Return the final cover letter text only. If some must-haves aren't matched, emphasize rapid learning and adjacent experience.
 """
-    return header + prompt.strip()
+    prompt = header + prompt.strip()
+    if report is not None:
+        report["prompt_tokens_after"] = count_tokens(prompt)
+        report["prompt_tokens_before"] = (report["prompt_tokens_after"]
+                                          - report.get("jd_tokens_after", 0)
+                                          + report.get("jd_tokens_before", 0))
+    return prompt
@@ -0,0 +1,139 @@
+"""Extractive summaries of cover letters: TextRank over TF-IDF sentence vectors.
+
+Local and NumPy-only, so the email version of a letter costs milliseconds
+instead of a second model call. Every letter of a batch (all variants of
+one generation) is ranked in a single pass.
+"""
+
+import re
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from core.compact import split_sentences
+from utils.keywords import match_matrix, token_counts
+
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+KEYWORD_WEIGHT = 1.0  # score multiplier per JD keyword a sentence mentions: 1 + weight * keywords
+LEAD_WEIGHT = 1.0  # extra teleport weight of the opening sentence, which usually names the role
+
+_GREETING_RE = re.compile(r"^(dear|hi|hello|greetings|to whom it may concern)\b[^.!?]{0,50}[,:]$", re.I)
+_SIGNOFF_RE = re.compile(
+    r"^(yours )?(sincerely|faithfully|truly|best( regards| wishes)?|kind regards|warm regards|regards|"
+    r"respectfully|many thanks|thanks|thank you|cheers)( again)?[,.!]?$", re.I)
+# closing courtesies: the email adds its own
+_COURTESY_RE = re.compile(
+    r"thank you for (your )?(time|consideration)|look(ing)? forward to (hearing|the opportunity|discussing)|"
+    r"(welcome|appreciate) the (chance|opportunity) to (discuss|talk|speak)", re.I)
+
+
+def letter_parts(letter: str) -> Tuple[str, str, str]:
+    """(greeting line, body, signer) of a letter; greeting and signer are "" when absent.
+
+    Header lines (name, contact, date) before the greeting and everything
+    after the sign-off are left out of the body.
+    """
+    lines = [ln.strip() for ln in (letter or "").splitlines() if ln.strip()]
+    greeting, start, end, signer = "", 0, len(lines), ""
+    for i, line in enumerate(lines[:10]):
+        if _GREETING_RE.match(line):
+            greeting, start = line, i + 1
+            break
+    for i in range(len(lines) - 1, start - 1, -1):
+        if _SIGNOFF_RE.match(lines[i]):
+            end = i
+            if i + 1 < len(lines) and len(lines[i + 1].split()) <= 5:
+                signer = lines[i + 1]
+            break
+    return greeting, "\n".join(lines[start:end]), signer
+
+
+def candidate_sentences(body: str) -> List[str]:
+    """Body sentences worth quoting: at least four words, no closing courtesies."""
+    return [s for s in split_sentences(body) if len(s.split()) >= 4 and not _COURTESY_RE.search(s)]
+
+
+def rank_sentences(groups: Sequence[Sequence[str]], keywords: Sequence[str] = ()) -> List[np.ndarray]:
+    """TextRank score of every sentence, one graph per group (letter), all groups at once.
+
+    Sentences are TF-IDF vectors (sublinear tf, idf within their own letter);
+    edges are cosine similarities. Each score is then multiplied by
+    1 + KEYWORD_WEIGHT x the JD keywords the sentence mentions, so a sentence
+    ranks high when it is both central to the letter and on-topic for the
+    job ad (letters are short and their graphs sparse; a keyword bias on the
+    random walk alone barely moves the ranking).
+    """
+    sizes = [len(g) for g in groups]
+    flat = [s for g in groups for s in g]
+    if not flat:
+        return [np.zeros(0) for _ in groups]
+    owner = np.repeat(np.arange(len(groups)), sizes)
+
+    vocab: dict = {}
+    rows, cols, counts = [], [], []
+    for i, sentence in enumerate(flat):
+        for word, n in token_counts(sentence).items():
+            rows.append(i)
+            cols.append(vocab.setdefault(word, len(vocab)))
+            counts.append(n)
+    tf = np.zeros((len(flat), max(len(vocab), 1)))
+    tf[rows, cols] = 1 + np.log(counts)
+
+    # document frequency per letter: a word in every sentence of a letter says nothing about any of them
+    df = np.zeros((len(groups), tf.shape[1]))
+    np.add.at(df, owner, tf > 0)
+    letter_size = np.asarray(sizes, dtype=float)[owner][:, None]
+    vectors = tf * (np.log((letter_size + 1) / (df[owner] + 1)) + 1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1)
+
+    similarity = vectors @ vectors.T
+    similarity *= owner[:, None] == owner[None, :]  # no edges between letters
+    np.fill_diagonal(similarity, 0)
+    out_weight = similarity.sum(axis=1)
+    transition = similarity / np.where(out_weight > 0, out_weight, 1)[:, None]
+
+    lead = np.zeros(len(flat))
+    lead[np.cumsum([0] + sizes[:-1])[np.asarray(sizes) > 0]] = LEAD_WEIGHT
+    teleport = 1 + lead
+    teleport /= np.bincount(owner, teleport)[owner]  # a distribution per letter
+
+    dangling = out_weight == 0
+    score = teleport.copy()
+    for _ in range(MAX_ITERATIONS):
+        # mass on a sentence with no similar neighbour goes back to its own letter's teleport
+        lost = np.bincount(owner, score * dangling, minlength=len(groups))[owner]
+        new = (1 - DAMPING) * teleport + DAMPING * (transition.T @ score + lost * teleport)
+        done = np.abs(new - score).sum() < TOLERANCE
+        score = new
+        if done:
+            break
+    if keywords:
+        score *= 1 + KEYWORD_WEIGHT * np.asarray(match_matrix(list(keywords), flat), dtype=bool).sum(axis=0)
+    return np.split(score, np.cumsum(sizes)[:-1])
+
+
+def summarize(letters: Sequence[str], keywords: Sequence[str] = (), max_sentences: int = 3,
+              max_words: int = 90) -> List[Tuple[str, List[str], str]]:
+    """(greeting, summary sentences in letter order, signer) for each letter.
+
+    Takes the highest-ranked sentences while they fit `max_words` (the first
+    one always), up to `max_sentences`.
+    """
+    parts = [letter_parts(letter) for letter in letters]
+    groups = [candidate_sentences(body) for _, body, _ in parts]
+    out = []
+    for (greeting, _, signer), sentences, scores in zip(parts, groups, rank_sentences(groups, keywords)):
+        chosen, words = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            if len(chosen) == max_sentences:
+                break
+            length = len(sentences[i].split())
+            if chosen and words + length > max_words:
+                continue
+            chosen.append(int(i))
+            words += length
+        out.append((greeting, [sentences[i] for i in sorted(chosen)], signer))
+    return out
@@ -0,0 +1,66 @@
+"""Client for the HTTP API (api.py); the UI submits generations here when API_URL is set."""
+
+import importlib.util
+import os
+import time
+from typing import Dict, Iterator, Optional
+
+API_URL = os.getenv("API_URL", "").rstrip("/")
+API_TOKEN = os.getenv("API_TOKEN", "")
+POLL_INTERVAL = float(os.getenv("API_POLL_S", "0.25"))
+REQUEST_TIMEOUT = 10
+
+_http = None
+
+
+def api_enabled() -> bool:
+    # find_spec, not an import: `requests` is only loaded once a job is submitted
+    return bool(API_URL) and importlib.util.find_spec("requests") is not None
+
+
+def _session():
+    global _http
+    if _http is None:
+        import requests
+
+        _http = requests.Session()
+        if API_TOKEN:
+            _http.headers["Authorization"] = f"Bearer {API_TOKEN}"
+    return _http
+
+
+def submit_job(record: Dict[str, object], session_id: Optional[str] = None) -> Dict[str, object]:
+    """Queue a generation (core.batch job record); returns the job as the API reports it."""
+    headers = {"X-Session-Id": session_id} if session_id else {}
+    resp = _session().post(f"{API_URL}/jobs", json=record, headers=headers, timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def get_job(job_id: str, events_from: Optional[int] = None) -> Dict[str, object]:
+    params = {"events_from": events_from} if events_from is not None else {}
+    resp = _session().get(f"{API_URL}/jobs/{job_id}", params=params, timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def follow_job(job_id: str, poll_interval: float = POLL_INTERVAL,
+               timeout: Optional[float] = None) -> Iterator[Dict[str, object]]:
+    """Poll a job, yielding its events as they appear; returns the finished job.
+
+    Raises RuntimeError if the job fails and TimeoutError after `timeout`
+    seconds. Each poll fetches only the events not seen yet.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    seen = 0
+    while True:
+        job = get_job(job_id, events_from=seen)
+        yield from job["events"]
+        seen = job["next_event"]
+        if job["status"] == "done":
+            return job
+        if job["status"] == "error":
+            raise RuntimeError(job["error"])
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"job {job_id} still {job['status']} after {timeout:.0f}s")
+        time.sleep(poll_interval)
@@ -0,0 +1,406 @@
+import hashlib
+import json
+import os
+import re
+import textwrap
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.trace import register_collector
+
+# The SDK (~0.5 s) and httpx are imported on first use (see _sdk), not at import
+# time: privacy mode, the mock backend and the first page render never need them.
+_openai_sdk: Optional[Tuple[object, object]] = None
+
+# Connection pool settings for the shared clients (see get_client).
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE", "60"))
+
+MOCK_LETTER = textwrap.dedent("""
+    Dear Hiring Team,
+
+    I'm excited to apply for this role. I bring hands-on experience in relevant technologies and a track record of building practical tools that improve workflows. Based on the position requirements, I can contribute across development, testing, and deployment while learning any new stack quickly.
+
+    In recent projects, I delivered automation and AI-assisted features, integrating APIs and refining user journeys end-to-end. I enjoy collaborating with cross-functional teams and translating requirements into maintainable, secure solutions.
+
+    I would welcome the chance to learn your stack and contribute this summer. Thank you for your time and consideration.
+
+    Sincerely,
+    Candidate
+    """).strip()
+
+NOT_INSTALLED = "OpenAI client not installed. Please `pip install openai` or set OPENAI_API_KEY."
+
+
+def _sdk() -> Tuple[object, object]:
+    """(OpenAI v1 client class, legacy `openai` module); at most one is set, neither if not installed."""
+    global _openai_sdk
+    if _openai_sdk is None:
+        try:
+            import openai
+        except Exception:
+            openai = None
+        client_class = getattr(openai, "OpenAI", None)
+        _openai_sdk = (client_class, None if client_class is not None else openai)
+    return _openai_sdk
+
+
+def __getattr__(name: str):
+    # HAS_NEW / HAS_LEGACY stay importable, resolved (and the SDK imported) on first access.
+    if name == "HAS_NEW":
+        return _sdk()[0] is not None
+    if name == "HAS_LEGACY":
+        return _sdk()[1] is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LLMError(Exception):
+    """A failed model call, normalised across backends.
+
+    `retryable` is set for rate limiting (429), server errors (5xx), timeouts
+    and connection failures; `retry_after` carries the server's hint, if any.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(LLMError):
+    def __init__(self, message: str = "deadline exceeded"):
+        super().__init__(message, retryable=False)
+
+
+class CircuitOpenError(LLMError):
+    def __init__(self, message: str = "circuit open"):
+        super().__init__(message, retryable=False)
+
+
+def _retry_after(headers) -> Optional[float]:
+    try:
+        value = headers.get("retry-after") if headers is not None else None
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None  # an HTTP date; fall back to our own backoff
+
+
+def classify(exc: Exception) -> LLMError:
+    """Map any client exception (openai new/legacy, httpx) onto LLMError."""
+    if isinstance(exc, LLMError):
+        return exc
+    status = getattr(exc, "status_code", None) or getattr(exc, "http_status", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    name = type(exc).__name__
+    transient = "Timeout" in name or "Connection" in name or "ServiceUnavailable" in name
+    retryable = transient if status is None else (status in (408, 409, 429) or status >= 500)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+    return LLMError(f"{name}: {exc}", status, retryable, _retry_after(headers))
+
+
+class Backend:
+    """One way of producing chat completions.
+
+    `complete` returns (texts, usage) for `n` choices; `stream` yields
+    `(choice_index, chunk)`. `key` identifies the endpoint for circuit
+    breakers and latency stats.
+    """
+
+    name = "base"
+    key = "base"
+
+    def complete(self, messages: List[Dict[str, str]], model: str, n: int = 1,
+                 temperature: float = 0.5, timeout: Optional[float] = None) -> Tuple[List[str], Dict[str, int]]:
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict[str, str]], model: str, n: int = 1,
+               temperature: float = 0.5, timeout: Optional[float] = None) -> Iterator[Tuple[int, str]]:
+        raise NotImplementedError
+
+
+class MockBackend(Backend):
+    """Deterministic offline backend: every choice is MOCK_LETTER."""
+
+    name = key = "mock"
+
+    def complete(self, messages, model, n=1, temperature=0.5, timeout=None):
+        return [MOCK_LETTER] * n, {}
+
+    def stream(self, messages, model, n=1, temperature=0.5, timeout=None):
+        for word in re.findall(r"\S+\s*", MOCK_LETTER):
+            for i in range(n):
+                yield i, word
+
+
+class _PoolStats:
+    """Counts requests vs. new TCP connections for one pooled client."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.requests = 0
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+
+    def on_request(self, request) -> None:
+        with self._lock:
+            self.requests += 1
+        # httpcore reports connection lifecycle events through the "trace" extension.
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+
+_clients: Dict[Tuple[str, str], Tuple[object, _PoolStats]] = {}
+_clients_lock = threading.Lock()
+
+
+def _http_client(stats: _PoolStats, factory=None):
+    import httpx
+
+    factory = factory or httpx.Client
+    return factory(
+        limits=httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=POOL_SIZE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        event_hooks={"request": [stats.on_request]},
+    )
+
+
+def get_client(api_key: str, base_url: Optional[str] = None):
+    """Return the process-wide OpenAI client for (api_key, base_url).
+
+    Clients are created once and reused across variants, Streamlit reruns and
+    sessions, so their HTTP connections (and TLS sessions) are kept alive.
+    Retries are left to services.resilience, so the SDK's own are disabled.
+    """
+    base_url = base_url or os.getenv("OPENAI_BASE_URL", "").strip() or None
+    key = (api_key, base_url or "")
+    with _clients_lock:
+        entry = _clients.get(key)
+        if entry is None:
+            from openai import DefaultHttpxClient
+
+            stats = _PoolStats(base_url or "default")
+            client = _sdk()[0](api_key=api_key, base_url=base_url, max_retries=0,
+                            http_client=_http_client(stats, DefaultHttpxClient))
+            entry = _clients[key] = (client, stats)
+        return entry[0]
+
+
+def pool_stats() -> List[Dict[str, object]]:
+    """Per-client connection statistics; `reused` = requests served on an existing connection."""
+    out = []
+    with _clients_lock:
+        entries = list(_clients.items())
+    for (api_key, base_url), (client, stats) in entries:
+        http = getattr(client, "_client", client)
+        pool = getattr(getattr(http, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None) or []
+        out.append({
+            "client": hashlib.sha256(api_key.encode()).hexdigest()[:8],
+            "base_url": stats.base_url,
+            "requests": stats.requests,
+            "connections_opened": stats.connections_opened,
+            "reused": max(0, stats.requests - stats.connections_opened),
+            "open_connections": sum(1 for c in connections if not c.is_closed()),
+        })
+    return out
+
+
+def pool_totals() -> Dict[str, int]:
+    """pool_stats() summed over all clients, for the /metrics gauges."""
+    totals = {"clients": 0, "requests": 0, "connections_opened": 0, "reused": 0, "open_connections": 0}
+    for entry in pool_stats():
+        totals["clients"] += 1
+        for key in ("requests", "connections_opened", "reused", "open_connections"):
+            totals[key] += entry[key]
+    return totals
+
+
+register_collector("llm_pool", pool_totals)
+
+
+class OpenAIBackend(Backend):
+    """The OpenAI SDK (v1 client, or the legacy module-level API)."""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.key = f"openai:{base_url or 'default'}"
+
+    def complete(self, messages, model, n=1, temperature=0.5, timeout=None):
+        extra = {"n": n} if n > 1 else {}
+        client_class, openai_legacy = _sdk()
+        if client_class is not None:
+            resp = get_client(self.api_key, self.base_url).chat.completions.create(
+                model=model, messages=messages, temperature=temperature, timeout=timeout, **extra)
+            usage = {}
+            if resp.usage is not None:
+                usage = {"prompt_tokens": resp.usage.prompt_tokens,
+                         "completion_tokens": resp.usage.completion_tokens}
+            return [(c.message.content or "").strip() for c in resp.choices], usage
+        if openai_legacy is not None:
+            openai_legacy.api_key = self.api_key
+            resp = openai_legacy.ChatCompletion.create(
+                model=model, messages=messages, temperature=temperature, request_timeout=timeout, **extra)
+            usage = dict(resp.get("usage") or {})
+            return [(c["message"].get("content") or "").strip() for c in resp["choices"]], usage
+        return [NOT_INSTALLED], {}
+
+    def stream(self, messages, model, n=1, temperature=0.5, timeout=None):
+        extra = {"n": n} if n > 1 else {}
+        client_class, openai_legacy = _sdk()
+        if client_class is not None:
+            stream = get_client(self.api_key, self.base_url).chat.completions.create(
+                model=model, messages=messages, temperature=temperature, timeout=timeout,
+                stream=True, **extra)
+            for event in stream:
+                for choice in event.choices:
+                    if choice.delta.content:
+                        yield choice.index, choice.delta.content
+            return
+        if openai_legacy is not None:
+            openai_legacy.api_key = self.api_key
+            stream = openai_legacy.ChatCompletion.create(
+                model=model, messages=messages, temperature=temperature, request_timeout=timeout,
+                stream=True, **extra)
+            for event in stream:
+                for choice in event["choices"]:
+                    piece = choice.get("delta", {}).get("content")
+                    if piece:
+                        yield choice["index"], piece
+            return
+        yield 0, NOT_INSTALLED
+
+
+class HTTPBackend(Backend):
+    """Any OpenAI-compatible /chat/completions endpoint, spoken to directly over httpx.
+
+    For servers the SDK doesn't fit (local inference servers, gateways).
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str, api_key: str = ""):
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            raise RuntimeError("LLM_BACKEND=http needs httpx (installed with openai)")
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.api_key = api_key
+        self.key = f"http:{base_url}"
+        key = (api_key, self.url)
+        with _clients_lock:
+            if key not in _clients:
+                stats = _PoolStats(base_url)
+                _clients[key] = (_http_client(stats), stats)
+            self.client = _clients[key][0]
+
+    def _request(self, model, messages, n, temperature, stream):
+        body = {"model": model, "messages": messages, "temperature": temperature}
+        if n > 1:
+            body["n"] = n
+        if stream:
+            body["stream"] = True
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return body, headers
+
+    @staticmethod
+    def _raise_for_status(resp) -> None:
+        if resp.status_code < 400:
+            return
+        status = resp.status_code
+        detail = ""
+        try:
+            error = resp.json().get("error") or {}
+            detail = error.get("message", "") if isinstance(error, dict) else str(error)
+            if isinstance(error, dict) and error.get("param"):
+                detail += f" (param: {error['param']})"
+        except Exception:
+            detail = resp.text[:200]
+        raise LLMError(f"HTTP {status} from {resp.request.url}: {detail}".rstrip(": "), status,
+                       status in (408, 409, 429) or status >= 500, _retry_after(resp.headers))
+
+    def complete(self, messages, model, n=1, temperature=0.5, timeout=None):
+        from httpx import USE_CLIENT_DEFAULT
+
+        body, headers = self._request(model, messages, n, temperature, stream=False)
+        resp = self.client.post(self.url, json=body, headers=headers,
+                                timeout=timeout if timeout is not None else USE_CLIENT_DEFAULT)
+        if resp.status_code >= 400:
+            resp.read()
+        self._raise_for_status(resp)
+        data = resp.json()
+        texts = [((c.get("message") or {}).get("content") or "").strip()
+                 for c in sorted(data.get("choices", []), key=lambda c: c.get("index", 0))]
+        usage = data.get("usage") or {}
+        return texts, {k: usage[k] for k in ("prompt_tokens", "completion_tokens") if k in usage}
+
+    def stream(self, messages, model, n=1, temperature=0.5, timeout=None):
+        from httpx import USE_CLIENT_DEFAULT
+
+        body, headers = self._request(model, messages, n, temperature, stream=True)
+        with self.client.stream("POST", self.url, json=body, headers=headers,
+                                timeout=timeout if timeout is not None else USE_CLIENT_DEFAULT) as resp:
+            if resp.status_code >= 400:
+                resp.read()
+            self._raise_for_status(resp)
+            for line in resp.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                for choice in json.loads(data).get("choices", []):
+                    piece = (choice.get("delta") or {}).get("content")
+                    if piece:
+                        yield choice.get("index", 0), piece
+
+
+_backends: Dict[Tuple[str, str, str], Backend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend() -> Backend:
+    """The backend selected by LLM_BACKEND (auto | openai | http | mock).
+
+    `auto` uses OpenAI when OPENAI_API_KEY is set and the mock otherwise;
+    `http` talks to OPENAI_BASE_URL directly. Read on every call, so
+    environment changes take effect without a restart.
+    """
+    kind = os.getenv("LLM_BACKEND", "auto").strip().lower() or "auto"
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    base_url = os.getenv("OPENAI_BASE_URL", "").strip()
+    if kind == "auto":
+        kind = "openai" if api_key else "mock"
+    key = (kind, api_key, base_url)
+    with _backends_lock:
+        backend = _backends.get(key)
+    if backend is not None:
+        return backend
+    if kind == "mock":
+        backend = MockBackend()
+    elif kind == "openai":
+        backend = OpenAIBackend(api_key, base_url or None)
+    elif kind == "http":
+        if not base_url:
+            raise ValueError("LLM_BACKEND=http needs OPENAI_BASE_URL")
+        backend = HTTPBackend(base_url, api_key)
+    else:
+        raise ValueError(f"unknown LLM_BACKEND {kind!r} (expected auto, openai, http or mock)")
+    with _backends_lock:
+        return _backends.setdefault(key, backend)
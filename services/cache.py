@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from utils.trace import register_collector
+
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite3"))
+CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "256"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "50")) * 1024 * 1024
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600
+
+
+def cache_key(prompt: str, model: str, params: Dict[str, object], variant: int = 0, endpoint: str = "") -> str:
+    """Content address of one generation: endpoint, prompt, model, sampling params and variant slot.
+
+    `endpoint` is the backend key (services.backends.Backend.key): the same
+    model name behind another provider or base URL is a different model.
+    """
+    payload = json.dumps(
+        {"endpoint": endpoint, "prompt": prompt, "model": model, "params": params, "variant": variant},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of LLM responses: in-memory LRU in front of SQLite.
+
+    The disk tier expires entries after `ttl` seconds and evicts least recently
+    used rows once the stored text exceeds `max_bytes`.
+    """
+
+    def __init__(self, path: str, memory_items: int = 256, max_bytes: int = 50 * 1024 * 1024,
+                 ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            self._db = db
+        return self._db
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None and now - hit[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return hit[0]
+            self._memory.pop(key, None)
+            db = self._conn()
+            row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self._stats["misses"] += 1
+                return None
+            db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+            self._remember(key, row[0], row[1])
+            self._stats["disk_hits"] += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        if not value.strip():
+            return  # an empty completion is a failure, not an answer worth replaying
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._remember(key, value, now)
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._stats["writes"] += 1
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        expired = db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,)).rowcount
+        self._stats["evictions"] += max(0, expired)
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn().execute("DELETE FROM responses")
+            self._conn().commit()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            out = dict(self._stats)
+        hits = out["memory_hits"] + out["disk_hits"]
+        lookups = hits + out["misses"]
+        out["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        return out
+
+
+# Shared by every session in the process; the SQLite file is opened on first use.
+response_cache = ResponseCache(CACHE_PATH, CACHE_MEMORY_ITEMS, CACHE_MAX_BYTES, CACHE_TTL)
+register_collector("llm_cache", response_cache.stats)
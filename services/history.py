@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.jd import clean_text
+from utils.trace import register_collector, traced
+
+HISTORY_ENABLED = os.getenv("HISTORY", "0") == "1"  # opt-in: the store keeps job ads and letters on disk
+# The UI's history owner when set (a single-user install); otherwise the signed-in user or a key in the page URL.
+HISTORY_USER = os.getenv("HISTORY_USER", "").strip()
+HISTORY_PATH = os.getenv("HISTORY_PATH", os.path.join(".cache", "history.sqlite3"))
+SIMILARITY = float(os.getenv("HISTORY_SIMILARITY", "0.8"))  # estimated Jaccard to count as "the same ad"
+
+# Bumped when stored rows change meaning; older tables are dropped (version 1 scoped rows by owner
+# and stopped storing prompts, so version-0 rows could be read by anyone and held contact details).
+_SCHEMA_VERSION = 1
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jds ("
+    " id INTEGER PRIMARY KEY, owner TEXT NOT NULL, sha TEXT NOT NULL, text TEXT NOT NULL,"
+    " keywords TEXT, signature BLOB NOT NULL, created REAL NOT NULL, UNIQUE (owner, sha))",
+    "CREATE TABLE IF NOT EXISTS generations ("
+    " id INTEGER PRIMARY KEY, jd_id INTEGER NOT NULL REFERENCES jds(id), created REAL NOT NULL,"
+    " role TEXT, model TEXT, variant INTEGER NOT NULL, letter TEXT NOT NULL, matches TEXT)",
+    "CREATE INDEX IF NOT EXISTS generations_jd ON generations(jd_id)",
+    # one row per (LSH band bucket, JD); a lookup is BANDS index probes, whatever the table size
+    "CREATE TABLE IF NOT EXISTS jd_buckets ("
+    " bucket INTEGER NOT NULL, jd_id INTEGER NOT NULL, PRIMARY KEY (bucket, jd_id)) WITHOUT ROWID",
+)
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(role, jd, letter, content='')"
+
+
+def _fts_query(text: str) -> str:
+    """User text as an FTS5 query: every word must appear (no operators, no syntax errors)."""
+    return " ".join('"%s"' % w for w in re.findall(r"\w+", text))
+
+
+class History:
+    """Local store of job ads, letters and keyword tables, per owner.
+
+    Every row belongs to an owner (a UI session, an API session, the batch
+    operator) and every lookup is scoped to one. Letters are full-text
+    searchable (SQLite FTS5). Each ad also gets a MinHash signature whose LSH
+    band buckets are indexed, so prior letters for near-duplicate ads
+    (reposts, the same role in another city) are found with a few index
+    probes instead of a scan. Callers scrub contact details before `record`
+    (core.batch.remember).
+    """
+
+    def __init__(self, path: str, threshold: float = SIMILARITY):
+        self.path = path
+        self.threshold = threshold
+        self.fts = True
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+                for table in ("generations_fts", "jd_buckets", "generations", "jds"):
+                    db.execute(f"DROP TABLE IF EXISTS {table}")
+                db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            for statement in _SCHEMA:
+                db.execute(statement)
+            try:
+                db.execute(_FTS_SCHEMA)
+            except sqlite3.OperationalError:  # SQLite built without FTS5: search falls back to LIKE
+                self.fts = False
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _store_jd(self, db: sqlite3.Connection, owner: str, text: str, keywords: Sequence[str], now: float) -> int:
+        from utils import minhash  # NumPy is loaded on the first record/lookup, not at startup
+
+        sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        row = db.execute("SELECT id FROM jds WHERE owner = ? AND sha = ?", (owner, sha)).fetchone()
+        if row is not None:
+            return row[0]
+        sig = minhash.signature(text)
+        jd_id = db.execute(
+            "INSERT INTO jds (owner, sha, text, keywords, signature, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (owner, sha, text, json.dumps(list(keywords)), minhash.to_blob(sig), now),
+        ).lastrowid
+        db.executemany("INSERT OR IGNORE INTO jd_buckets (bucket, jd_id) VALUES (?, ?)",
+                       [(key, jd_id) for key in minhash.band_keys(sig)])
+        return jd_id
+
+    @traced("history_record", lambda jd_id, self, owner, jd_text, letters, *a, **k: {"letters": len(letters)})
+    def record(self, owner: str, jd_text: str, letters: Sequence[str], role: str = "", model: str = "",
+               keywords: Sequence[str] = (), matches: Optional[List[Tuple[str, bool]]] = None) -> Optional[int]:
+        """Store one generation (all its variants, best first) for `owner`; returns the JD's id."""
+        text = clean_text(jd_text)
+        if not owner or not text or not letters:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            jd_id = self._store_jd(db, owner, text, keywords, now)
+            for variant, letter in enumerate(letters):
+                gen_id = db.execute(
+                    "INSERT INTO generations (jd_id, created, role, model, variant, letter, matches)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (jd_id, now, role, model, variant, letter,
+                     json.dumps(matches) if matches is not None and variant == 0 else None),
+                ).lastrowid
+                if self.fts:
+                    db.execute("INSERT INTO generations_fts (rowid, role, jd, letter) VALUES (?, ?, ?, ?)",
+                               (gen_id, role, text, letter))
+            db.commit()
+        return jd_id
+
+    def _letters(self, db: sqlite3.Connection, jd_ids: Sequence[int]) -> Dict[int, List[Dict[str, object]]]:
+        out: Dict[int, List[Dict[str, object]]] = {i: [] for i in jd_ids}
+        marks = ",".join("?" * len(jd_ids))
+        rows = db.execute(
+            f"SELECT jd_id, created, role, model, variant, letter FROM generations WHERE jd_id IN ({marks})"
+            " ORDER BY created DESC, variant", list(jd_ids),
+        )
+        for jd_id, created, role, model, variant, letter in rows:
+            out[jd_id].append({"created": created, "role": role, "model": model, "variant": variant, "letter": letter})
+        return out
+
+    @traced("history_similar", lambda out, *a, **k: {"found": len(out)})
+    def similar(self, owner: str, jd_text: str, limit: int = 3,
+                threshold: Optional[float] = None) -> List[Dict[str, object]]:
+        """`owner`'s earlier ads at least `threshold` similar to this one, most similar first, with their letters."""
+        text = clean_text(jd_text)
+        if not owner or not text:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        from utils import minhash
+
+        sig = minhash.signature(text)
+        keys = minhash.band_keys(sig)
+        with self._lock:
+            db = self._conn()
+            rows = db.execute(
+                "SELECT id, text, keywords, signature, created FROM jds WHERE owner = ? AND id IN"
+                f" (SELECT DISTINCT jd_id FROM jd_buckets WHERE bucket IN ({','.join('?' * len(keys))}))",
+                [owner, *keys],
+            ).fetchall()
+            scored = [(minhash.similarity(sig, minhash.from_blob(row[3])), row) for row in rows]
+            scored = sorted((s for s in scored if s[0] >= threshold), key=lambda s: -s[0])[:limit]
+            letters = self._letters(db, [row[0] for _, row in scored]) if scored else {}
+        return [
+            {"jd_id": row[0], "similarity": round(score, 3), "jd_text": row[1],
+             "keywords": json.loads(row[2] or "[]"), "created": row[4], "letters": letters[row[0]]}
+            for score, row in scored
+        ]
+
+    def search(self, owner: str, query: str, limit: int = 20) -> List[Dict[str, object]]:
+        """`owner`'s letters matching every word of `query` (in the letter, role or JD), best match first."""
+        words = _fts_query(query)
+        if not owner or not words:
+            return []
+        with self._lock:
+            db = self._conn()
+            if self.fts:
+                rows = db.execute(
+                    "SELECT g.id, g.jd_id, g.created, g.role, g.model, g.variant, g.letter"
+                    " FROM generations_fts f JOIN generations g ON g.id = f.rowid JOIN jds j ON j.id = g.jd_id"
+                    " WHERE generations_fts MATCH ? AND j.owner = ? ORDER BY f.rank LIMIT ?", (words, owner, limit),
+                ).fetchall()
+            else:
+                like = f"%{query.strip()}%"
+                rows = db.execute(
+                    "SELECT g.id, g.jd_id, g.created, g.role, g.model, g.variant, g.letter"
+                    " FROM generations g JOIN jds j ON j.id = g.jd_id WHERE j.owner = ?"
+                    " AND (g.letter LIKE ? OR g.role LIKE ?) ORDER BY g.created DESC LIMIT ?",
+                    (owner, like, like, limit),
+                ).fetchall()
+        return [{"id": r[0], "jd_id": r[1], "created": r[2], "role": r[3], "model": r[4],
+                 "variant": r[5], "letter": r[6]} for r in rows]
+
+    def stats(self, owner: Optional[str] = None) -> Dict[str, object]:
+        """Stored job ads and letters: `owner`'s, or all of them (for metrics) when None."""
+        where, args = ("WHERE owner = ?", (owner,)) if owner is not None else ("", ())
+        with self._lock:
+            db = self._conn()
+            jds = db.execute(f"SELECT COUNT(*) FROM jds {where}", args).fetchone()[0]
+            letters = db.execute(
+                f"SELECT COUNT(*) FROM generations WHERE jd_id IN (SELECT id FROM jds {where})", args).fetchone()[0]
+        return {"job_ads": jds, "letters": letters}
+
+
+history = History(HISTORY_PATH)
+if HISTORY_ENABLED:
+    register_collector("history", history.stats)
@@ -1,58 +1,131 @@
 
 import os
-import textwrap
-
-try:
-    from openai import OpenAI
-    HAS_NEW = True
-except Exception:
-    HAS_NEW = False
-
-try:
-    import openai as openai_legacy
-    HAS_LEGACY = True
-except Exception:
-    HAS_LEGACY = False
-
-
-def generate_letter(prompt: str, model_choice: str = "gpt-4o-mini") -> str:
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        return textwrap.dedent("""
-        Dear Hiring Team,
-
-        I'm excited to apply for this role. I bring hands-on experience in relevant technologies and a track record of building practical tools that improve workflows. Based on the position requirements, I can contribute across development, testing, and deployment while learning any new stack quickly.
-
-        In recent projects, I delivered automation and AI-assisted features, integrating APIs and refining user journeys end-to-end. I enjoy collaborating with cross-functional teams and translating requirements into maintainable, secure solutions.
-
-        I would welcome the chance to learn your stack and contribute this summer. Thank you for your time and consideration.
-
-        Sincerely,
-        Candidate
-        """).strip()
-
-    if HAS_NEW:
-        client = OpenAI(api_key=api_key)
-        resp = client.chat.completions.create(
-            model=model_choice,
-            messages=[
-                {"role":"system","content":"You are a helpful, precise writing assistant."},
-                {"role":"user","content":prompt},
-            ],
-            temperature=0.5,
-        )
-        return resp.choices[0].message.content.strip()
-
-    if HAS_LEGACY:
-        openai_legacy.api_key = api_key
-        resp = openai_legacy.ChatCompletion.create(
-            model=model_choice,
-            messages=[
-                {"role":"system","content":"You are a helpful, precise writing assistant."},
-                {"role":"user","content":prompt},
-            ],
-            temperature=0.5,
+import re
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services import resilience
+from utils.trace import traced
+# get_client/pool_stats/MOCK_LETTER live with the backends; re-exported for callers of this module.
+from services import backends
+from services.backends import MOCK_LETTER, Backend, LLMError, get_backend, get_client, pool_stats
+
+TEMPERATURE = 0.5
+
+# Ask for several variants in one request (`n` choices) so the prompt is sent
+# and billed once; models/endpoints found not to support it fall back to one
+# request per variant (see supports_multi_choice).
+MULTI_CHOICE = os.getenv("LLM_MULTI_CHOICE", "1") != "0"
+
+
+def __getattr__(name: str):
+    # HAS_NEW / HAS_LEGACY moved to services.backends; re-exported lazily so importing this module doesn't load the SDK.
+    if name in ("HAS_NEW", "HAS_LEGACY"):
+        return getattr(backends, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role":"system","content":"You are a helpful, precise writing assistant."},
+        {"role":"user","content":prompt},
+    ]
+
+
+def api_key_configured() -> bool:
+    """True when calls go to a real model rather than returning MOCK_LETTER."""
+    return get_backend().name != "mock"
+
+
+_single_choice: set = set()
+_single_choice_lock = threading.Lock()
+
+
+def supports_multi_choice(model_choice: str) -> bool:
+    """False once the endpoint has rejected or ignored `n` for this model (or LLM_MULTI_CHOICE=0)."""
+    with _single_choice_lock:
+        return MULTI_CHOICE and (get_backend().key, model_choice) not in _single_choice
+
+
+# The error names the `n` parameter: OpenAI's {"param": "n"} / "'n'", or "n is not supported"-style text.
+_N_PARAM_RE = re.compile(r"""param(?:eter)?['"]?:\s*['"]?n\b|['"`]n['"`]|"""
+                         r"""(?:^|[\s(:])n (?:is|must|should|parameter|>|greater)|"""
+                         r"""number of (?:choices|completions)|multiple (?:choices|completions)""", re.I)
+
+
+def _rejects_n(exc: LLMError) -> bool:
+    """A 400 that is about `n` itself, not context length, temperature or any other parameter."""
+    return exc.status_code == 400 and bool(_N_PARAM_RE.search(str(exc)))
+
+
+def _mark_single_choice(backend: Backend, model_choice: str) -> None:
+    with _single_choice_lock:
+        _single_choice.add((backend.key, model_choice))
+
+
+def _measure_letters(letters, prompt, n=1, *args, usage=None, **kwargs):
+    return {"n": n, "letters": len(letters), "prompt_chars": len(prompt),
+            "output_chars": sum(len(x) for x in letters), **(usage or {})}
+
+
+@traced("generate_letters", _measure_letters)
+def generate_letters(prompt: str, n: int, model_choice: str = "gpt-4o-mini",
+                     timeout: Optional[float] = None,
+                     usage: Optional[Dict[str, int]] = None) -> List[str]:
+    """Up to `n` letters from a single request (`n` choices over one prompt).
+
+    `timeout` is a deadline for the whole call, retries included (see
+    services.resilience). May return fewer than `n` when the endpoint ignores
+    `n`; the caller generates the rest one by one. `usage` receives the token
+    counts when the endpoint reports them.
+    """
+    backend = get_backend()
+    try:
+        letters, used = resilience.call(
+            lambda t: backend.complete(_messages(prompt), model_choice, n, TEMPERATURE, t),
+            backend.key, timeout,
         )
-        return resp["choices"][0]["message"]["content"].strip()
+    except LLMError as exc:
+        # only a 400 that names `n` means the parameter isn't supported
+        if n > 1 and _rejects_n(exc):
+            _mark_single_choice(backend, model_choice)
+        raise
+    if usage is not None:
+        usage.update(used)
+    letters = [letter for letter in letters if letter]
+    if n > 1 and len(letters) < n:
+        _mark_single_choice(backend, model_choice)
+    return letters
+
+
+@traced("generate_letter", lambda letter, prompt, *a, **k: {"prompt_chars": len(prompt), "output_chars": len(letter)})
+def generate_letter(prompt: str, model_choice: str = "gpt-4o-mini", timeout: Optional[float] = None) -> str:
+    letters = generate_letters(prompt, 1, model_choice=model_choice, timeout=timeout)
+    return letters[0] if letters else ""
+
+
+@traced("stream_letters")
+def stream_letters(prompt: str, n: int, model_choice: str = "gpt-4o-mini",
+                   timeout: Optional[float] = None) -> Iterator[Tuple[int, str]]:
+    """Streaming generate_letters: yields `(choice_index, chunk)` for `n` choices of one request."""
+    backend = get_backend()
+    seen = set()
+    try:
+        for index, chunk in resilience.stream(
+            lambda t: backend.stream(_messages(prompt), model_choice, n, TEMPERATURE, t),
+            backend.key, timeout,
+        ):
+            seen.add(index)
+            yield index, chunk
+    except LLMError as exc:
+        if n > 1 and _rejects_n(exc):
+            _mark_single_choice(backend, model_choice)
+        raise
+    if n > 1 and len(seen) < n:
+        _mark_single_choice(backend, model_choice)
+
 
-    return "OpenAI client not installed. Please `pip install openai` or set OPENAI_API_KEY."
+def stream_letter(prompt: str, model_choice: str = "gpt-4o-mini", timeout: Optional[float] = None) -> Iterator[str]:
+    """Like generate_letter, but yields the letter in chunks as the model produces them."""
+    for _, chunk in stream_letters(prompt, 1, model_choice=model_choice, timeout=timeout):
+        yield chunk
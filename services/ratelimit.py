@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from utils.trace import register_collector
+
+
+class RateLimiter:
+    """Token bucket: `rate` calls per second, bursts up to `burst`. Not locked; FairScheduler holds its own."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst if burst is not None else max(1, rate)))
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def wait_time(self, amount: float = 1) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now). Call under your own lock."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (min(amount, self.burst) - self._tokens) / self.rate)
+
+    def take(self, amount: float = 1) -> None:
+        if self.rate > 0:
+            self._tokens -= min(amount, self.burst)
+
+
+INTERACTIVE, BATCH = 0, 1
+
+# Provider limits are per minute; LLM_MAX_RPS is still honoured as the default.
+REQUESTS_PER_MIN = float(os.getenv("LLM_RPM", str(float(os.getenv("LLM_MAX_RPS", "5")) * 60)))
+TOKENS_PER_MIN = float(os.getenv("LLM_TPM", "200000"))
+BURST_SECONDS = 10  # each bucket holds at most this many seconds' worth
+
+_session: ContextVar[Tuple[str, int]] = ContextVar("llm_session", default=("default", INTERACTIVE))
+
+
+@contextmanager
+def llm_session(session_id: str, priority: int = INTERACTIVE) -> Iterator[None]:
+    """Attribute LLM calls made in this context to `session_id` for fair queueing.
+
+    Worker threads must be started with a copy of the context
+    (contextvars.copy_context().run) to inherit it.
+    """
+    token = _session.set((session_id, priority))
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session() -> str:
+    """Session id of the current llm_session context ("default" outside one)."""
+    return _session.get()[0]
+
+
+class _Ticket:
+    __slots__ = ("session", "priority", "tokens", "enqueued")
+
+    def __init__(self, session: str, priority: int, tokens: float):
+        self.session = session
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+
+
+class FairScheduler:
+    """Process-wide admission control for LLM requests.
+
+    A request needs one slot from the requests/min bucket and its estimated
+    tokens from the tokens/min bucket. Waiting requests are served by
+    priority (interactive before batch), then round-robin across sessions,
+    then FIFO within a session, so one user's five variants or a large
+    batch can't starve everyone else.
+    """
+
+    def __init__(self, requests_per_min: float, tokens_per_min: float):
+        self.requests_per_min = requests_per_min
+        self.tokens_per_min = tokens_per_min
+        self.requests = RateLimiter(requests_per_min / 60, burst=max(1, int(requests_per_min / 60 * BURST_SECONDS)))
+        self.tokens = RateLimiter(tokens_per_min / 60, burst=max(1, int(tokens_per_min / 60 * BURST_SECONDS)))
+        self._cond = threading.Condition()
+        # priority -> session -> waiting tickets; dict order is the round-robin order
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Ticket]]"] = {INTERACTIVE: OrderedDict(), BATCH: OrderedDict()}
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self.granted = 0
+        self.timed_out = 0
+
+    def _head(self) -> Optional[_Ticket]:
+        for priority in sorted(self._queues):
+            ring = self._queues[priority]
+            if ring:
+                return next(iter(ring.values()))[0]
+        return None
+
+    def _position(self, ticket: _Ticket) -> int:
+        """1-based place in line, assuming round-robin service and no new arrivals."""
+        ahead = sum(len(q) for p, ring in self._queues.items() if p < ticket.priority for q in ring.values())
+        ring = self._queues[ticket.priority]
+        mine = ring[ticket.session]
+        k = next(i for i, t in enumerate(mine) if t is ticket)
+        before = True
+        for session, queue in ring.items():
+            if session == ticket.session:
+                before = False
+                continue
+            ahead += min(len(queue), k + 1 if before else k)
+        return ahead + k + 1
+
+    def _remove(self, ticket: _Ticket, served: bool) -> None:
+        ring = self._queues[ticket.priority]
+        queue = ring[ticket.session]
+        queue.remove(ticket)
+        if not queue:
+            del ring[ticket.session]
+        elif served:
+            ring.move_to_end(ticket.session)  # next turn goes to the next session
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None,
+                on_wait: Optional[Callable[[int], None]] = None) -> bool:
+        """Block until this request may be sent. Returns False if `timeout` expires first.
+
+        Session and priority come from the current llm_session context.
+        `on_wait(position)` is called whenever the place in line changes.
+        """
+        session, priority = _session.get()
+        ticket = _Ticket(session, priority, tokens)
+        deadline = None if timeout is None else ticket.enqueued + timeout
+        last_position = None
+        with self._cond:
+            self._queues.setdefault(priority, OrderedDict()).setdefault(session, deque()).append(ticket)
+            while True:
+                wait = None
+                if self._head() is ticket:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self._remove(ticket, served=True)
+                        self.granted += 1
+                        self._waits.append(time.monotonic() - ticket.enqueued)
+                        self._cond.notify_all()
+                        return True
+                if on_wait is not None:
+                    position = self._position(ticket)
+                    if position != last_position:
+                        last_position = position
+                        on_wait(position)
+                if deadline is not None:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        self._remove(ticket, served=False)
+                        self.timed_out += 1
+                        self._cond.notify_all()
+                        return False
+                    wait = left if wait is None else min(wait, left)
+                self._cond.wait(wait)
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return sum(len(q) for ring in self._queues.values() for q in ring.values())
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            waits = sorted(self._waits)
+            depth = {p: sum(len(q) for q in ring.values()) for p, ring in self._queues.items()}
+            sessions = sum(len(ring) for ring in self._queues.values())
+
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(len(waits) * p / 100))], 3) if waits else 0.0
+
+        return {
+            "queue_depth": sum(depth.values()),
+            "queue_depth_interactive": depth.get(INTERACTIVE, 0),
+            "queue_depth_batch": depth.get(BATCH, 0),
+            "sessions_waiting": sessions,
+            "granted": self.granted,
+            "timed_out": self.timed_out,
+            "wait_p50_s": pct(50),
+            "wait_p95_s": pct(95),
+            "wait_max_s": round(waits[-1], 3) if waits else 0.0,
+            "requests_per_min": self.requests_per_min,
+            "tokens_per_min": self.tokens_per_min,
+        }
+
+
+# Shared by every caller in the process (all variants, all Streamlit sessions, batch runs).
+llm_scheduler = FairScheduler(REQUESTS_PER_MIN, TOKENS_PER_MIN)
+register_collector("llm_queue", llm_scheduler.stats)
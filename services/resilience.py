@@ -0,0 +1,291 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from services.backends import CircuitOpenError, DeadlineExceeded, LLMError, classify
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+# Hedging sends a duplicate request when the first is slower than the
+# endpoint's recent p95; off by default because a hedge can double the cost.
+HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "5"))  # until there are enough samples for a p95
+HEDGE_MIN_SAMPLES = 20
+
+
+class Deadline:
+    """Absolute time budget shared by all attempts (and hedges) of one call."""
+
+    def __init__(self, timeout: Optional[float]):
+        self.at = None if timeout is None else time.monotonic() + timeout
+
+    def remaining(self) -> Optional[float]:
+        return None if self.at is None else max(0.0, self.at - time.monotonic())
+
+    def check(self) -> None:
+        if self.at is not None and time.monotonic() >= self.at:
+            raise DeadlineExceeded()
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff; a server Retry-After hint wins when given."""
+    if retry_after is not None:
+        return min(BACKOFF_MAX, retry_after)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive transient failures.
+
+    While open, calls fail immediately with CircuitOpenError; after
+    `reset_after` seconds one trial call is let through (half-open) and its
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, threshold: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_after else "open"
+
+    def enter(self) -> Optional[bool]:
+        """None if the call is refused, True if it is the half-open trial, False otherwise."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            return None
+
+    def allow(self) -> bool:
+        return self.enter() is not None
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                if self.opened_at is None or self.trial_running:
+                    self.times_opened += 1
+                    log.warning("circuit %s open after %d failures", self.name, self.failures)
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+
+    def release(self) -> None:
+        """End a half-open trial that neither succeeded nor failed transiently."""
+        with self._lock:
+            self.trial_running = False
+
+
+class LatencyTracker:
+    """Recent successful-call latencies of one endpoint (bounded window)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latency: Dict[str, LatencyTracker] = {}
+_registry_lock = threading.Lock()
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+def breaker_for(key: str) -> CircuitBreaker:
+    with _registry_lock:
+        return _breakers.setdefault(key, CircuitBreaker(key))
+
+
+def latency_for(key: str) -> LatencyTracker:
+    with _registry_lock:
+        return _latency.setdefault(key, LatencyTracker())
+
+
+def _hedged(fn: Callable[[Optional[float]], T], deadline: Deadline, tracker: LatencyTracker) -> T:
+    """Run `fn`; if it hasn't answered after the p95 delay, race a duplicate against it."""
+    delay = tracker.percentile(95) or HEDGE_DELAY
+    first = _hedge_pool.submit(fn, deadline.remaining())
+    remaining = deadline.remaining()
+    done, _ = wait([first], timeout=delay if remaining is None else min(delay, remaining))
+    if done:
+        return first.result()
+    deadline.check()
+    tracker.hedges_sent += 1
+    hedge = _hedge_pool.submit(fn, deadline.remaining())
+    pending, error = {first, hedge}, None
+    while pending:
+        done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded()
+        for fut in done:
+            if fut.exception() is None:
+                if fut is hedge:
+                    tracker.hedges_won += 1
+                return fut.result()  # the loser finishes in the background and is ignored
+            error = fut.exception()
+    raise error
+
+
+def _give_up(exc: Exception, breaker: CircuitBreaker, deadline: Deadline, attempt: int,
+             started: bool) -> Tuple[Optional[LLMError], float]:
+    """(error to raise, 0) for a failed attempt, or (None, pause before the retry).
+
+    The breaker counts failed calls, not attempts: only a transient failure
+    that exhausts the retries (or the deadline) counts towards opening it.
+    """
+    err = classify(exc)
+    if not err.retryable:
+        breaker.release()
+        return err, 0.0
+    remaining = deadline.remaining()
+    pause = backoff_delay(attempt, err.retry_after)
+    if remaining is not None and remaining <= 0:
+        err = DeadlineExceeded(f"deadline exceeded ({err})")
+    elif not started and attempt < MAX_RETRIES and (remaining is None or pause < remaining):
+        return None, pause
+    breaker.record_failure()
+    return err, 0.0
+
+
+def call(fn: Callable[[Optional[float]], T], key: str, timeout: Optional[float] = None,
+         hedge: Optional[bool] = None) -> T:
+    """Call `fn(attempt_timeout)` under a deadline, retries and the endpoint's circuit breaker.
+
+    Transient failures (429, 5xx, timeouts, connection errors) are retried
+    with jittered exponential backoff as long as the deadline allows.
+    Everything raised is an LLMError.
+    """
+    deadline = Deadline(timeout)
+    breaker, tracker = breaker_for(key), latency_for(key)
+    hedge = HEDGE if hedge is None else hedge
+    attempt = 0
+    while True:
+        deadline.check()
+        trial = breaker.enter()
+        if trial is None:
+            raise CircuitOpenError(f"circuit for {key} is open; retry in {breaker.reset_after:.0f}s")
+        start = time.monotonic()
+        try:
+            result = _hedged(fn, deadline, tracker) if hedge else fn(deadline.remaining())
+        except Exception as exc:
+            err, pause = _give_up(exc, breaker, deadline, attempt, started=False)
+            if err is not None:
+                raise err from exc
+            if trial:
+                breaker.release()  # the retry claims the trial again
+            log.info("%s: %s; retry %d in %.2fs", key, classify(exc), attempt + 1, pause)
+            time.sleep(pause)
+            attempt += 1
+            continue
+        except BaseException:
+            if trial:
+                breaker.release()  # interrupted: no outcome, but the trial must not stay claimed
+            raise
+        breaker.record_success()
+        tracker.record(time.monotonic() - start)
+        return result
+
+
+def stream(fn: Callable[[Optional[float]], Iterator[T]], key: str,
+           timeout: Optional[float] = None) -> Iterator[T]:
+    """Like `call` for a streaming request.
+
+    Retries only until the first item arrives (a retry after that would
+    duplicate text); the deadline covers the whole stream. Not hedged.
+    """
+    deadline = Deadline(timeout)
+    breaker, tracker = breaker_for(key), latency_for(key)
+    attempt = 0
+    while True:
+        deadline.check()
+        trial = breaker.enter()
+        if trial is None:
+            raise CircuitOpenError(f"circuit for {key} is open; retry in {breaker.reset_after:.0f}s")
+        start = time.monotonic()
+        started = False
+        try:
+            for item in fn(deadline.remaining()):
+                if not started:
+                    started = True
+                    tracker.record(time.monotonic() - start)  # time to first chunk
+                yield item
+                deadline.check()
+        except Exception as exc:
+            err, pause = _give_up(exc, breaker, deadline, attempt, started)
+            if err is not None:
+                raise err from exc
+            if trial:
+                breaker.release()
+            log.info("%s: %s; retry %d in %.2fs", key, classify(exc), attempt + 1, pause)
+            time.sleep(pause)
+            attempt += 1
+            continue
+        except BaseException:
+            # closed or garbage-collected mid-stream (GeneratorExit), or interrupted: no outcome to
+            # record, but a half-open trial left claimed would keep the circuit from ever closing
+            if trial:
+                breaker.release()
+            raise
+        breaker.record_success()
+        return
+
+
+def resilience_stats() -> Dict[str, Dict[str, object]]:
+    """Breaker state and latency percentiles per endpoint."""
+    with _registry_lock:
+        keys = sorted(set(_breakers) | set(_latency))
+    out = {}
+    for key in keys:
+        breaker, tracker = breaker_for(key), latency_for(key)
+        p50, p95 = tracker.percentile(50), tracker.percentile(95)
+        out[key] = {
+            "breaker": breaker.state,
+            "times_opened": breaker.times_opened,
+            "p50_s": round(p50, 3) if p50 is not None else None,
+            "p95_s": round(p95, 3) if p95 is not None else None,
+            "hedges_sent": tracker.hedges_sent,
+            "hedges_won": tracker.hedges_won,
+        }
+    return out
@@ -0,0 +1,198 @@
+"""Local OpenAI-compatible stub for testing the LLM layer offline.
+
+Serves POST /v1/chat/completions (including `n` and `stream`) with latency
+drawn from a configurable distribution, optional slow tail and injected
+errors; GET /stats returns request counters.
+
+    python -m services.stub_server --port 8765 --latency lognormal:0.4,0.5 \\
+        --tail 0.05:3 --error-rate 0.1 --error-status 429,503
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1 and any
+OPENAI_API_KEY (or LLM_BACKEND=http).
+
+Latency specs (seconds): fixed:S, uniform:LO,HI, exp:MEAN, normal:MU,SIGMA,
+lognormal:MEDIAN,SIGMA (SIGMA of the underlying normal).
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+from services.backends import MOCK_LETTER
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Sampler for a latency spec such as "lognormal:0.4,0.5"."""
+    kind, _, args = spec.partition(":")
+    vals = [float(v) for v in args.split(",") if v.strip()]
+    samplers = {
+        "fixed": (1, lambda r: vals[0]),
+        "uniform": (2, lambda r: r.uniform(vals[0], vals[1])),
+        "exp": (1, lambda r: r.expovariate(1 / vals[0]) if vals[0] > 0 else 0.0),
+        "normal": (2, lambda r: r.gauss(vals[0], vals[1])),
+        "lognormal": (2, lambda r: r.lognormvariate(math.log(vals[0]), vals[1]) if vals[0] > 0 else 0.0),
+    }
+    if kind not in samplers or len(vals) != samplers[kind][0]:
+        raise ValueError(f"bad latency spec {spec!r}")
+    sample = samplers[kind][1]
+    return lambda r: max(0.0, sample(r))
+
+
+class StubConfig:
+    def __init__(self, latency: str = "fixed:0", tail: Optional[str] = None, error_rate: float = 0.0,
+                 error_status: Tuple[int, ...] = (503,), retry_after: Optional[float] = None,
+                 token_delay: float = 0.0, reject_n: bool = False, seed: Optional[int] = None):
+        self.latency = parse_latency(latency)
+        self.tail_p, self.tail_s = (float(x) for x in tail.split(":")) if tail else (0.0, 0.0)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.token_delay = token_delay
+        self.reject_n = reject_n
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0, "slow": 0, "choices": 0}
+
+    def draw(self) -> Tuple[float, Optional[int]]:
+        """(delay, error status or None) for one request."""
+        with self.lock:
+            self.stats["requests"] += 1
+            delay = self.latency(self.rng)
+            if self.rng.random() < self.tail_p:
+                self.stats["slow"] += 1
+                delay += self.tail_s
+            status = None
+            if self.rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                status = self.rng.choice(self.error_status)
+            return delay, status
+
+
+def stub_letter(prompt: str, index: int) -> str:
+    """Deterministic letter per (prompt, choice index)."""
+    tag = hashlib.sha256(f"{prompt}\0{index}".encode()).hexdigest()[:8]
+    return f"{MOCK_LETTER}\n\n(stub variant {index + 1}, ref {tag})"
+
+
+def make_handler(config: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body go out as separate writes; avoid the delayed-ACK stall
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _chunk(self, data: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                with config.lock:
+                    return self._json(200, dict(config.stats))
+            self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json(404, {"error": {"message": "not found"}})
+            n = int(body.get("n", 1))
+            delay, status = config.draw()
+            time.sleep(delay)
+            if status is not None:
+                headers = {"Retry-After": str(config.retry_after)} if config.retry_after is not None else {}
+                return self._json(status, {"error": {"message": f"injected {status}", "type": "stub_error"}}, headers)
+            if n > 1 and config.reject_n:
+                return self._json(400, {"error": {"message": "n is not supported", "type": "invalid_request_error"}})
+            with config.lock:
+                config.stats["choices"] += n
+            prompt = (body.get("messages") or [{}])[-1].get("content", "")
+            letters = [stub_letter(prompt, i) for i in range(n)]
+            model = body.get("model", "stub")
+            if not body.get("stream"):
+                return self._json(200, {
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": i, "message": {"role": "assistant", "content": text},
+                                 "finish_reason": "stop"} for i, text in enumerate(letters)],
+                    "usage": {"prompt_tokens": len(prompt) // 4,
+                              "completion_tokens": sum(len(t) for t in letters) // 4,
+                              "total_tokens": (len(prompt) + sum(len(t) for t in letters)) // 4},
+                })
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            words = [re.findall(r"\S+\s*", text) for text in letters]
+            for step in range(max(len(w) for w in words)):
+                for i, ws in enumerate(words):
+                    if step < len(ws):
+                        event = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                                 "choices": [{"index": i, "delta": {"content": ws[step]}, "finish_reason": None}]}
+                        self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                if config.token_delay:
+                    time.sleep(config.token_delay)
+            self._chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up mid-response (timeouts, lost hedges) are expected
+
+
+def start_stub(port: int = 0, **config) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a daemon thread; returns (server, base_url). Port 0 picks a free one."""
+    server = StubServer(("127.0.0.1", port), make_handler(StubConfig(**config)))
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server with injected latency and errors.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.2", help="latency distribution (see module docstring)")
+    parser.add_argument("--tail", help="slow tail as P:SECONDS, e.g. 0.05:3 adds 3s to 5%% of requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", default="503", help="comma-separated statuses to inject")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected errors")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed words")
+    parser.add_argument("--reject-n", action="store_true", help="answer n > 1 with a 400")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(args.latency, args.tail, args.error_rate,
+                        tuple(int(s) for s in args.error_status.split(",")), args.retry_after,
+                        args.token_delay, args.reject_n, args.seed)
+    server = StubServer(("127.0.0.1", args.port), make_handler(config))
+    print(f"stub listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
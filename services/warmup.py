@@ -0,0 +1,87 @@
+"""Background warm-up: pay the deferred imports and connection setup off the request path.
+
+Heavy dependencies (the OpenAI SDK, httpx, requests, NumPy) are imported on
+first use so the first page renders quickly. `start_warmup()` then loads them
+in a daemon thread, right after that render, so the first "Generate" click
+does not pay for them either.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.trace import span
+
+log = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP", "1") != "0"
+
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+timings: Dict[str, float] = {}  # step -> ms, filled in as the warm-up runs
+
+
+def _llm_client() -> None:
+    from services.backends import OpenAIBackend, get_backend, get_client
+
+    backend = get_backend()  # the http backend builds its pooled client here
+    if isinstance(backend, OpenAIBackend):
+        get_client(backend.api_key, backend.base_url)
+
+
+def _response_cache() -> None:
+    from services.cache import CACHE_ENABLED, response_cache
+
+    if CACHE_ENABLED:
+        response_cache.stats()  # opens the SQLite tier
+
+
+def _history() -> None:
+    from services.history import HISTORY_ENABLED, history
+    from utils import minhash  # noqa: F401  (NumPy)
+
+    if HISTORY_ENABLED:
+        history.stats()
+
+
+def _api_client() -> None:
+    from services.api_client import api_enabled
+
+    if api_enabled():
+        import requests  # noqa: F401
+
+
+STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("llm_client", _llm_client),
+    ("response_cache", _response_cache),
+    ("history", _history),
+    ("api_client", _api_client),
+]
+
+
+def warm_up() -> Dict[str, float]:
+    """Run every step in order; a failing step is logged and skipped. Returns ms per step."""
+    with span("warmup"):
+        for name, step in STEPS:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                log.warning("warm-up step %s failed", name, exc_info=True)
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    log.info("warm-up done: %s", timings)
+    return timings
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Start warm_up() in a daemon thread once per process; no-op when WARMUP=0."""
+    global _thread
+    if not WARMUP_ENABLED:
+        return None
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+            _thread.start()
+        return _thread
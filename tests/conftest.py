@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# Module-level settings are read at import time: keep the tests offline and off the real caches.
+_TMP = tempfile.mkdtemp(prefix="coverletter-tests-")
+os.environ.update({
+    "LLM_BACKEND": "mock",
+    "LLM_CACHE": "0",
+    "HISTORY": "0",
+    "WARMUP": "0",
+    "LLM_CACHE_PATH": os.path.join(_TMP, "llm.sqlite3"),
+    "JD_HTTP_CACHE_PATH": os.path.join(_TMP, "jd_http.sqlite3"),
+    "HISTORY_PATH": os.path.join(_TMP, "history.sqlite3"),
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
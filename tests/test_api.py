@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+def test_refuses_to_start_without_a_token(monkeypatch):
+    monkeypatch.setattr(api, "API_TOKEN", "")
+    monkeypatch.setattr(api, "API_ALLOW_ANONYMOUS", False)
+    with pytest.raises(RuntimeError, match="API_TOKEN"):
+        with TestClient(api.app):
+            pass
+
+    monkeypatch.setattr(api, "API_ALLOW_ANONYMOUS", True)
+    with TestClient(api.app) as client:
+        assert client.get("/health").status_code == 200
+
+
+def test_fetch_refuses_internal_addresses(monkeypatch):
+    monkeypatch.setattr(api, "API_TOKEN", "secret")
+    client = TestClient(api.app)
+    headers = {"Authorization": "Bearer secret"}
+    for url in ("http://127.0.0.1:1/", "http://169.254.169.254/latest/meta-data/"):
+        resp = client.post("/fetch", json={"url": url}, headers=headers)
+        assert resp.status_code == 422 and "non-public" in resp.json()["detail"]
+    assert client.post("/fetch", json={"url": "http://127.0.0.1:1/"}).status_code == 401
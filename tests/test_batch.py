@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import core.batch
+from core.batch import completed_ids, iter_jobs, percentile, run_batch
+from services.backends import MOCK_LETTER
+
+JD = "Backend engineer: build REST APIs in Python with FastAPI and PostgreSQL, deploy on Docker."
+
+
+def _write(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def test_iter_jobs_skips_invalid_lines_and_non_objects(tmp_path):
+    path = _write(tmp_path / "jobs.jsonl", [
+        json.dumps({"id": "a", "jd_text": JD}),
+        "{not json",
+        "[1, 2]",
+        '"just a string"',
+        "",
+        json.dumps({"jd_text": JD}),
+    ])
+    assert [job_id for job_id, _ in iter_jobs(path)] == ["a", "line-6"]
+
+
+def test_completed_ids_counts_only_finished_ok_records(tmp_path):
+    path = _write(tmp_path / "out.jsonl", [
+        json.dumps({"id": "a", "status": "ok"}),
+        json.dumps({"id": "b", "status": "error"}),
+        '{"id": "c", "sta',  # cut short by an interrupted run
+    ])
+    assert completed_ids(path) == {"a"}
+    assert completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+@pytest.mark.parametrize("pct, expected", [(50, 3), (95, 5), (99, 5), (1, 1)])
+def test_percentile_is_nearest_rank(pct, expected):
+    assert percentile([5, 1, 4, 2, 3], pct) == expected
+    assert percentile([], pct) == 0.0
+
+
+def test_run_batch_on_the_mock_backend_resumes(tmp_path):
+    jobs = _write(tmp_path / "jobs.jsonl", [
+        json.dumps({"id": "a", "jd_text": JD, "options": {"variants": 2, "email": True}}),
+        json.dumps({"id": "b", "jd_text": ""}),  # no text and no url: an error record
+        "[1, 2]",
+    ])
+    out = str(tmp_path / "out.jsonl")
+    report = run_batch(jobs, out, workers=2)
+    assert (report["ok"], report["error"], report["skipped"]) == (1, 1, 0)
+    records = {r["id"]: r for r in map(json.loads, open(out, encoding="utf-8"))}
+    assert records["a"]["letters"] == [MOCK_LETTER, MOCK_LETTER]
+    assert len(records["a"]["emails"]) == 2
+    assert records["b"]["status"] == "error"
+
+    again = run_batch(jobs, out, workers=2)
+    assert (again["ok"], again["error"], again["skipped"]) == (0, 1, 1)  # only the failed job is retried
+
+
+def test_privacy_skips_the_model_call(tmp_path, monkeypatch):
+    def no_model(**kwargs):
+        raise AssertionError("privacy mode must not call the model")
+
+    monkeypatch.setattr(core.batch, "generate_variants", no_model)
+    record = core.batch.run_job({"jd_text": JD, "profile": {"name": "Alex Doe", "email": "alex@example.com"},
+                                 "options": {"privacy": True}})
+    assert record["letters"] == []
+    assert "FastAPI" in record["prompt"] and "alex@example.com" in record["prompt"]
+
+
+def test_redact_option_turns_on_output_redaction_only(monkeypatch):
+    seen = {}
+
+    def fake_generate(**kwargs):
+        seen.update(kwargs)
+        return ["letter"], [], []
+
+    monkeypatch.setattr(core.batch, "generate_variants", fake_generate)
+    core.batch.run_job({"jd_text": JD, "options": {"redact": True}})
+    assert seen["privacy"] is True
+    core.batch.run_job({"jd_text": JD, "options": {"privacy": False}})
+    assert seen["privacy"] is False
@@ -0,0 +1,22 @@
+from core import generator
+from services.backends import NOT_INSTALLED
+from services.cache import ResponseCache, cache_key
+
+
+def test_key_depends_on_endpoint():
+    params = {"temperature": 0.5}
+    a = cache_key("prompt", "gpt-4o-mini", params, 0, "openai:default")
+    b = cache_key("prompt", "gpt-4o-mini", params, 0, "http:http://127.0.0.1:8765/v1")
+    assert a != b
+    assert a == cache_key("prompt", "gpt-4o-mini", params, 0, "openai:default")
+
+
+def test_empty_and_error_text_not_cached(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(generator, "response_cache", cache)
+    generator._store("k1", "   ")
+    generator._store("k2", NOT_INSTALLED)
+    generator._store("k3", "Dear team, ...")
+    cache.put("k4", "")
+    assert cache.get("k1") is None and cache.get("k2") is None and cache.get("k4") is None
+    assert cache.get("k3") == "Dear team, ..."
@@ -0,0 +1,71 @@
+from core.compact import compact_job_ad, count_tokens
+from utils.jd import clean_text
+
+SKILLS = ["python", "kubernetes", "terraform", "postgres", "kafka"]
+
+
+def _bullet_ad(chars):
+    lines, i = [], 0
+    while sum(len(x) + 1 for x in lines) < chars:
+        lines.append(f"- maintain service {i} with {SKILLS[i % len(SKILLS)]} and on-call rotations")
+        i += 1
+    return clean_text("\n".join(lines))
+
+
+def test_unpunctuated_bullet_ad_fits_budget_and_is_not_empty():
+    ad = _bullet_ad(22_000)
+    report = {}
+    out = compact_job_ad(ad, keywords=SKILLS, token_budget=1200, report=report)
+    assert out
+    assert count_tokens(out) <= 1200
+    assert report["jd_tokens_after"] > 600  # most of the budget is used, not a sliver
+
+
+def test_tiny_budget_truncates_instead_of_emptying():
+    out = compact_job_ad("Senior engineer building Python services for logistics teams", token_budget=3)
+    assert out and count_tokens(out) <= 3
+
+
+def test_domain_words_are_not_boilerplate():
+    ad = "You will design APIs for dental practice management. Wellness data stays private."
+    assert compact_job_ad(ad, token_budget=1200) == ad
+    ad_over = " ".join([ad, "We are an equal opportunity employer."] + [f"Own feature {i} in Python." for i in range(400)])
+    out = compact_job_ad(ad_over, keywords=["python", "apis"], token_budget=200)
+    assert "equal opportunity" not in out
+
+
+def test_boilerplate_kept_when_under_budget():
+    ad = "Build Python APIs. We are an equal opportunity employer."
+    assert compact_job_ad(ad, token_budget=1200) == ad
+
+
+def test_ad_within_budget_is_returned_verbatim():
+    from core.prompt import build_prompt
+
+    ad = "Data Engineer\n\n• Python • Airflow\n• Spark  and SQL\n\nWe build pipelines. We build pipelines."
+    report = {}
+    assert compact_job_ad(ad, keywords=["python"], token_budget=1200, report=report) is ad
+    assert report["jd_tokens_after"] == report["jd_tokens_before"] and report["duplicates_removed"] == 0
+    prompt = build_prompt(ad, "Data Engineer", [], [], "Professional", "300", False, "Alex", "", "", "")
+    assert "JOB AD (verbatim):" in prompt and ad in prompt
+
+    long_ad = ad + "\n" + " ".join(f"Own feature {i} in Python." for i in range(400))
+    prompt = build_prompt(long_ad, "Data Engineer", [], [], "Professional", "300", False, "Alex", "", "", "",
+                          jd_token_budget=200, keywords=["python"])
+    assert "JOB AD (condensed):" in prompt
+
+
+def test_kept_sentences_keep_their_bullets_and_line_breaks():
+    ad = "\n".join(
+        ["Platform Engineer", "", "Requirements:"]
+        + [f"• Must know Python and Kafka for service {i}." for i in range(5)]
+        + ["● Experience with Kubernetes is required."]
+        + [f"Team lunch number {i} is on Fridays." for i in range(300)]
+        + ["We are an equal opportunity employer."]
+    )
+    out = compact_job_ad(ad, keywords=["python", "kafka", "kubernetes"], token_budget=150)
+    assert count_tokens(out) <= 150
+    lines = out.split("\n")
+    assert "• Must know Python and Kafka for service 0." in lines
+    assert "● Experience with Kubernetes is required." in lines
+    assert "equal opportunity" not in out
@@ -0,0 +1,158 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.fetcher import BulkFetcher, HTTPCache, check_public_url
+
+PAGE = b"<html><body><h1>Data Engineer</h1><p>Build pipelines in Python.</p></body></html>"
+TEXT = "Data Engineer Build pipelines in Python."
+LAST_MODIFIED = "Wed, 01 Oct 2025 10:00:00 GMT"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def do_GET(self):
+        self.server.log_request_headers(self.path, dict(self.headers))
+        path = self.path.split("?")[0]
+        if path == "/slow":
+            with self.server.lock:
+                self.server.in_flight += 1
+                self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            time.sleep(0.15)
+            with self.server.lock:
+                self.server.in_flight -= 1
+            return self._send(200, {})
+        if path == "/redirect":
+            return self._send(302, {"Location": "/fresh"})
+        if path == "/fresh":
+            return self._send(200, {"ETag": '"f1"', "Cache-Control": "max-age=60"})
+        if path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._send(304, {"ETag": '"v1"'})
+            return self._send(200, {"ETag": '"v1"', "Cache-Control": "no-cache"})
+        if path == "/last-modified":
+            if self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                return self._send(304, {})
+            return self._send(200, {"Last-Modified": LAST_MODIFIED})
+        self._send(404, {})
+
+    def _send(self, status, headers):
+        body = PAGE if status == 200 else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = self.max_in_flight = 0
+
+    def log_request_headers(self, path, headers):
+        with self.lock:
+            self.requests.append((path, headers))
+
+    def hits(self, path):
+        return [h for p, h in self.requests if p.split("?")[0] == path]
+
+
+@pytest.fixture
+def server():
+    srv = _Server()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return BulkFetcher(HTTPCache(str(tmp_path / "http.sqlite3")), max_workers=8, per_host=2)
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_fresh_hit_skips_the_network(server, fetcher):
+    url = _url(server, "/fresh")
+    assert fetcher.fetch(url) == TEXT
+    stats = {}
+    assert fetcher.fetch(url, stats) == TEXT
+    assert stats["cache"] == "fresh"
+    assert len(server.hits("/fresh")) == 1
+    assert fetcher.stats()["fresh_hits"] == 1
+
+
+@pytest.mark.parametrize("path, header, value", [
+    ("/etag", "If-None-Match", '"v1"'),
+    ("/last-modified", "If-Modified-Since", LAST_MODIFIED),
+])
+def test_revalidation_returns_cached_text_and_touches(server, fetcher, path, header, value):
+    url = _url(server, path)
+    assert fetcher.fetch(url) == TEXT
+    first_fetched = fetcher.cache.get(url)[3]
+    time.sleep(0.01)
+
+    stats = {}
+    assert fetcher.fetch(url, stats) == TEXT
+    assert stats["cache"] == "revalidated"
+    hits = server.hits(path)
+    assert len(hits) == 2
+    assert header not in hits[0] and hits[1][header] == value
+    assert fetcher.cache.get(url)[3] > first_fetched  # touch() moved the fetched time
+    assert fetcher.stats()["not_modified"] == 1
+
+
+def test_per_host_concurrency_cap(server, fetcher):
+    urls = [_url(server, f"/slow?i={i}") for i in range(6)]
+    assert fetcher.fetch_many(urls) == [TEXT] * 6
+    assert server.max_in_flight == 2
+    assert fetcher.stats()["downloads"] == 6
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/", "http://localhost:8080/", "http://10.0.0.5/", "http://192.168.1.1/",
+    "http://169.254.169.254/latest/meta-data/", "http://[::1]/", "http://[::ffff:127.0.0.1]/",
+    "http://0.0.0.0/", "ftp://example.com/",
+])
+def test_non_public_urls_are_refused(url):
+    with pytest.raises(ValueError):
+        check_public_url(url)
+
+
+def test_public_only_fetch_never_reaches_a_private_address(server, fetcher):
+    url = _url(server, "/fresh")
+    assert fetcher.fetch(url) == TEXT  # cached now
+    stats = {}
+    assert fetcher.fetch(url, stats, public_only=True) == ""  # not even from the cache
+    assert "non-public" in stats["blocked"]
+    assert len(server.hits("/fresh")) == 1 and fetcher.stats()["blocked"] == 1
+
+
+def test_public_only_checks_every_redirect(server, fetcher, monkeypatch):
+    import utils.fetcher
+
+    def only_redirect_is_public(url):
+        if "/redirect" not in url:
+            raise ValueError("non-public address")
+
+    monkeypatch.setattr(utils.fetcher, "check_public_url", only_redirect_is_public)
+    assert fetcher.fetch(_url(server, "/redirect")) == TEXT  # followed normally
+    assert fetcher.fetch(_url(server, "/redirect?again"), public_only=True) == ""
+    assert len(server.hits("/redirect")) == 2 and len(server.hits("/fresh")) == 1
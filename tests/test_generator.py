@@ -0,0 +1,112 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+import core.generator as generator
+import services.llm as llm
+from core.generator import run_variants
+from services.backends import MOCK_LETTER, Backend, LLMError
+
+PROMPT = "Write a cover letter."
+_keys = itertools.count()
+
+
+class FakeBackend(Backend):
+    """Numbers its letters by call. `choices` caps an n-choice reply; calls in `fail` raise;
+    single calls sleep `slow` seconds less each time, so later calls finish first."""
+
+    def __init__(self, choices=None, fail=(), slow=0.0):
+        self.name = self.key = f"fake:{next(_keys)}"  # own breaker and single-choice memory per test
+        self.choices = choices
+        self.fail = set(fail)
+        self.slow = slow
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def complete(self, messages, model, n=1, temperature=0.5, timeout=None):
+        with self._lock:
+            self.calls.append(n)
+            call = len(self.calls)
+        if call in self.fail:
+            raise LLMError(f"HTTP 500 on call {call}", 500)
+        if n > 1:
+            if self.choices is None:
+                raise LLMError("HTTP 500 on the n-choice call", 500)
+            return [f"choice {i}" for i in range(min(n, self.choices))], {}
+        time.sleep(max(0.0, self.slow * (5 - call)))
+        return [f"letter {call}"], {}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """Install a FakeBackend and record which letter each variant slot received."""
+    slots = {}
+
+    def install(**kwargs):
+        backend = FakeBackend(**kwargs)
+        monkeypatch.setattr(llm, "get_backend", lambda: backend)
+        monkeypatch.setattr(generator, "_variant_keys", lambda prompt, model, n: [f"slot {i}" for i in range(n)])
+        monkeypatch.setattr(generator, "_store", lambda key, letter: slots.__setitem__(int(key.split()[1]), letter))
+        backend.slots = slots
+        return backend
+
+    return install
+
+
+def test_mock_backend_fills_every_variant_from_one_request():
+    report = {}
+    assert run_variants(PROMPT, "gpt-4o-mini", 3, fresh=True, report=report) == [MOCK_LETTER] * 3
+    assert report["requests"] == 1 and report["choices_per_request"] == 3 and report["round_trips_saved"] == 2
+
+
+def test_variants_keep_slot_order_after_the_parallel_fallback(fake):
+    backend = fake(choices=2, slow=0.05)
+    report = {}
+    letters = run_variants(PROMPT, "model-a", 5, fresh=True, report=report)
+    # slots 0-1 come from the n-choice reply, 2-4 from single calls that finish in reverse order
+    assert letters[:2] == ["choice 0", "choice 1"]
+    assert letters == [backend.slots[i] for i in range(5)]
+    assert sorted(letters[2:]) == ["letter 2", "letter 3", "letter 4"]
+    assert backend.calls == [5, 1, 1, 1]
+    assert report["requests"] == 4 and report["choices_per_request"] == 2
+    assert not llm.supports_multi_choice("model-a")  # the endpoint ignored n
+
+
+def test_failed_variants_are_dropped_and_the_rest_kept_in_order(fake):
+    backend = fake(fail={3})  # the n-choice call fails, then the second single call
+    letters = run_variants(PROMPT, "model-b", 4, fresh=True)
+    assert len(letters) == 3
+    assert letters == [backend.slots[i] for i in sorted(backend.slots)]
+    assert len(backend.slots) == 3 and "letter 3" not in letters
+
+
+def test_raises_only_when_every_variant_fails(fake):
+    fake(fail={1, 2, 3, 4})
+    with pytest.raises(LLMError):
+        run_variants(PROMPT, "model-c", 3, fresh=True)
+
+    backend = fake(fail={1, 2, 3})  # one single call left standing
+    assert run_variants(PROMPT, "model-d", 3, fresh=True) == ["letter 4"]
+    assert list(backend.slots.values()) == ["letter 4"]
+    assert run_variants(PROMPT, "model-d", 0) == []
+
+
+def test_score_letters_puts_the_best_covering_letter_first():
+    from core.generator import score_letters
+
+    job_ad = "Python engineer for Kubernetes and Kafka. Python, Kubernetes, Kafka, Terraform."
+    weak = "I like Python. Python is great. Python everywhere."
+    strong = "I run Python services on Kubernetes, stream with Kafka and provision with Terraform."
+    middle = "Python on Kubernetes."
+    letters, keywords, matches = score_letters(job_ad, [weak, middle, strong])
+    assert letters == [strong, middle, weak]
+    assert keywords[:2] == ["kubernetes", "python"]  # tech hints first
+    matched = dict(matches)  # matches describe the best letter
+    assert matched["kafka"] and matched["terraform"] and not matched["engineer"]
+
+    tied = "Python on Kubernetes!"
+    assert score_letters(job_ad, [middle, tied])[0] == [middle, tied]  # ties keep their order
+    letters, _, matches = score_letters(job_ad, [])
+    assert letters == [] and not any(found for _, found in matches)
@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+import core.batch
+from services.history import History
+
+JD = ("Senior Data Engineer in Berlin. You will build batch and streaming pipelines in Python and SQL, "
+      "run them on Airflow and Spark, and own data quality for the analytics platform.")
+LETTER = "Dear Hiring Team,\n\nI build Python pipelines on Airflow and Spark.\n\nSincerely,\nAlex Doe"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return History(str(tmp_path / "history.sqlite3"))
+
+
+def test_reads_are_scoped_to_the_owner(store):
+    store.record("ui:alice", JD, [LETTER], role="Data Engineer")
+    assert [s["letters"][0]["letter"] for s in store.similar("ui:alice", JD)] == [LETTER]
+    assert [h["letter"] for h in store.search("ui:alice", "airflow")] == [LETTER]
+    assert store.stats("ui:alice") == {"job_ads": 1, "letters": 1}
+
+    assert store.similar("ui:bob", JD) == []
+    assert store.search("ui:bob", "airflow") == []
+    assert store.stats("ui:bob") == {"job_ads": 0, "letters": 0}
+
+    store.record("ui:bob", JD, ["Another letter about Spark."])
+    assert store.stats() == {"job_ads": 2, "letters": 2}
+    assert [h["letter"] for h in store.search("ui:bob", "spark")] == ["Another letter about Spark."]
+
+
+def test_record_span_counts_letters(store):
+    from utils.trace import collect_spans
+
+    with collect_spans() as spans:
+        store.record("ui:alice", JD, ["l1", "l2"])
+    assert [s["letters"] for s in spans if s["span"] == "history_record"] == [2]
+
+
+def test_unscoped_tables_from_before_owners_are_dropped(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE generations (id INTEGER PRIMARY KEY, prompt TEXT, letter TEXT)")
+    db.execute("INSERT INTO generations (prompt, letter) VALUES ('alex@example.com', 'old')")
+    db.commit()
+    db.close()
+
+    store = History(path)
+    assert store.stats() == {"job_ads": 0, "letters": 0}
+    db = store._conn()
+    assert "owner" in [row[1] for row in db.execute("PRAGMA table_info(jds)")]
+    assert "prompt" not in [row[1] for row in db.execute("PRAGMA table_info(generations)")]
+
+
+class _Backend:
+    def __init__(self, name):
+        self.name = name
+
+
+@pytest.mark.parametrize("backend, stored", [("openai", 1), ("mock", 0)])
+def test_remember_redacts_contacts_and_skips_mock_output(store, monkeypatch, backend, stored):
+    monkeypatch.setattr(core.batch, "HISTORY_ENABLED", True)
+    monkeypatch.setattr(core.batch, "history", store)
+    monkeypatch.setattr(core.batch, "get_backend", lambda: _Backend(backend))
+    kwargs = {"job_ad": JD, "role_title": "Data Engineer", "model_choice": "gpt-4o-mini"}
+
+    core.batch.remember("batch", kwargs, [LETTER + "\nalex@example.com | +49 170 1234567"], [], None)
+    assert store.stats("batch")["letters"] == stored
+    if stored:
+        letter = store.search("batch", "airflow")[0]["letter"]
+        assert "alex@example.com" not in letter and "1234567" not in letter
+        assert "[email]" in letter and "[phone]" in letter
+
+
+def test_history_endpoints_need_a_token(monkeypatch):
+    import api
+    from fastapi.testclient import TestClient
+
+    client = TestClient(api.app)
+    monkeypatch.setattr(api, "API_TOKEN", "")
+    assert client.get("/history/search", params={"q": "python"}).status_code == 403
+    assert client.post("/history/similar", json={"jd_text": JD}).status_code == 403
+
+    monkeypatch.setattr(api, "API_TOKEN", "secret")
+    monkeypatch.setattr(api, "HISTORY_ENABLED", True)
+    store = History(":memory:")
+    monkeypatch.setattr(api, "history", store)
+    store.record("api:s1", JD, [LETTER])
+    store.record("ui:0123abcd", JD, ["Letter from the UI, generated through the API: Airflow."])
+    headers = {"Authorization": "Bearer secret", "X-Session-Id": "s1"}
+    assert [h["letter"] for h in client.get("/history/search", params={"q": "airflow"}, headers=headers).json()] \
+        == [LETTER]
+    # the UI sends its own owner as the session, so jobs it submits and its History tab agree
+    headers["X-Session-Id"] = "ui:0123abcd"
+    assert len(client.get("/history/search", params={"q": "airflow"}, headers=headers).json()) == 1
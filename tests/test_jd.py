@@ -0,0 +1,30 @@
+from utils.jd import html_to_text
+
+JOB = "<h1>Backend Engineer</h1><p>You will build Python APIs.</p>"
+
+
+def test_content_containers_are_never_skipped():
+    for page in (
+        f'<html><body class="page-template has-sidebar">{JOB}</body></html>',
+        f'<html><body class="modal-open">{JOB}</body></html>',
+        f'<body><div id="main-menu-offset">{JOB}</div></body>',
+        f'<body><div class="social-impact-team">{JOB}</div></body>',
+        f'<body><main class="footer">{JOB}</main></body>',
+    ):
+        assert "You will build Python APIs." in html_to_text(page), page
+
+
+def test_boilerplate_blocks_are_skipped():
+    page = (
+        '<body><div id="onetrust-consent-sdk">Accept all cookies</div>'
+        '<div class="cookie-banner">We use cookies</div>'
+        '<nav>Home Jobs</nav><div class="site_footer">Copyright</div>'
+        f'<div class="content">{JOB}</div><div class="social-share">Share on X</div></body>'
+    )
+    text = html_to_text(page)
+    assert text == "Backend Engineer You will build Python APIs."
+
+
+def test_falls_back_to_unfiltered_text():
+    page = f'<body><div class="sidebar">{JOB}</div></body>'
+    assert html_to_text(page) == "Backend Engineer You will build Python APIs."
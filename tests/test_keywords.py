@@ -0,0 +1,79 @@
+import pytest
+
+from utils.keywords import extract_keywords, extract_keywords_batch, jd_match_table, match_matrix, rank_by_coverage
+
+JD = ("We build Python services on AWS with Docker and Kubernetes, ship through CI/CD, "
+      "and automate back-office work with Power\nAutomate. .NET and ASP.NET experience is a plus.")
+
+
+@pytest.mark.parametrize("text, hint", [
+    ("Our digital platform team", "git"),
+    ("Cloud storage and data pipelines", "rag"),
+    ("A legitimate opportunity", "git"),
+    ("Fragrant coffee every morning", "rag"),
+    ("Rich media agents-of-change", "agent"),
+    ("Reagent handling in the lab", "agent"),
+])
+def test_hints_are_word_bounded(text, hint):
+    assert hint not in extract_keywords(text)
+
+
+def test_hints_found_as_whole_words():
+    kws = extract_keywords(JD + " Git, RAG and an agent.")
+    for hint in ("python", "aws", "docker", "kubernetes", "ci/cd", "power automate", ".net", "git", "rag", "agent"):
+        assert hint in kws
+    assert kws.index("python") < kws.index("services")  # hints rank before plain words
+
+
+def test_pattern_hints_are_counted_per_occurrence():
+    kws = extract_keywords("k8s and K8s, step functions. Power automate; docker.", top_k=3)
+    assert kws == ["k8s", "docker", "power automate"]
+
+
+def test_batch_matches_single_calls():
+    texts = [JD, "Digital storage for agents.", JD, "", "step\nfunctions k8s", "power\x00automate"]
+    assert extract_keywords_batch(texts) == [extract_keywords(t) for t in texts]
+    assert extract_keywords_batch(iter(texts), top_k=3) == [extract_keywords(t, 3) for t in texts]
+    assert extract_keywords_batch([]) == []
+
+
+def test_batch_hints_do_not_span_texts():
+    assert "power automate" not in extract_keywords_batch(["Power", "automate everything"])[0]
+
+
+def test_match_table_is_word_bounded():
+    table = dict(jd_match_table(["git", "rag", "power automate"], "Digital storage with Power  Automate."))
+    assert table == {"git": False, "rag": False, "power automate": True}
+
+
+def test_match_matrix_counts_word_bounded_occurrences():
+    letters = ["Python, python and PYTHON on Power Automate.", "Digital storage; no git here.", ""]
+    matrix = match_matrix(["Python", "power automate", "git", "rag", ".net", ""], letters)
+    assert matrix == [
+        [3, 0, 0],
+        [1, 0, 0],
+        [0, 1, 0],
+        [0, 0, 0],
+        [0, 0, 0],
+        [0, 0, 0],
+    ]
+    assert match_matrix(["python"], []) == [[]]
+    assert match_matrix([], letters) == []
+
+
+def test_match_matrix_agrees_with_one_letter_at_a_time():
+    keywords = ["python", "ci/cd", "k8s", "asp.net", "step functions"]
+    letters = ["Shipped ASP.NET apps via CI/CD.", "Ran k8s and Step\nFunctions from Python.", "Python."]
+    matrix = match_matrix(keywords, letters)
+    for v, letter in enumerate(letters):
+        assert [row[v] for row in matrix] == [row[0] for row in match_matrix(keywords, [letter])]
+
+
+def test_rank_by_coverage_prefers_coverage_then_mentions_then_order():
+    matrix = [
+        [1, 5, 0, 1],
+        [1, 0, 1, 1],
+        [0, 0, 1, 0],
+    ]  # coverage 2, 1, 2, 2; mentions 2, 5, 2, 2
+    assert rank_by_coverage(matrix) == [0, 2, 3, 1]
+    assert rank_by_coverage([]) == []
@@ -0,0 +1,19 @@
+import pytest
+
+from services.backends import LLMError
+from services.llm import _rejects_n
+
+
+@pytest.mark.parametrize("message, rejects", [
+    ("HTTP 400 from http://127.0.0.1/v1/chat/completions: n is not supported", True),
+    ("BadRequestError: {'message': \"Invalid 'n': integer above maximum value.\", 'param': 'n'}", True),
+    ("HTTP 400 from http://127.0.0.1: Only one completion choice is supported (param: n)", True),
+    ("BadRequestError: {'message': \"This model's maximum context length is 128000 tokens.\", "
+     "'param': 'messages'}", False),
+    ("BadRequestError: {'message': \"Unsupported value: 'temperature' does not support 0.5.\", "
+     "'param': 'temperature'}", False),
+    ("HTTP 400 from http://127.0.0.1: invalid json in request", False),
+])
+def test_only_a_400_about_n_disables_multi_choice(message, rejects):
+    assert _rejects_n(LLMError(message, 400)) is rejects
+    assert not _rejects_n(LLMError(message, 500))
@@ -0,0 +1,69 @@
+import itertools
+
+from utils import memo as memo_module
+from utils.memo import Memo, memo_stats, memoize
+
+_names = itertools.count()
+
+
+def _memoized(fn, **kwargs):
+    calls = []
+
+    def counted(*args, **kw):
+        calls.append((args, kw))
+        return fn(*args, **kw)
+
+    return memoize(f"test-{next(_names)}", **kwargs)(counted), calls
+
+
+def test_hits_and_misses_are_counted():
+    square, calls = _memoized(lambda x: x * x)
+    assert [square(2), square(2), square(3), square(2)] == [4, 4, 9, 4]
+    assert len(calls) == 2
+    stats = square.memo.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"], stats["size"]) == (2, 2, 0.5, 2)
+    assert memo_stats()[square.memo.name] == stats
+
+    square.memo.clear()
+    assert square.memo.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0, "maxsize": 128}
+
+
+def test_least_recently_used_entry_is_evicted():
+    ident, calls = _memoized(lambda x: x, maxsize=2)
+    ident("a"), ident("b")
+    ident("a")  # "a" is now the most recent, so "b" goes first
+    ident("c")
+    assert ident.memo.stats()["size"] == 2
+    ident("a")
+    assert len(calls) == 3
+    ident("b")
+    assert len(calls) == 4  # "b" had been evicted
+
+
+def test_unhashable_arguments_get_stable_keys():
+    total, calls = _memoized(lambda items, weights=None, tags=None: sum(items))
+    assert total([1, 2, 3], weights={"b": 2, "a": 1}, tags={"x", "y"}) == 6
+    assert total([1, 2, 3], weights={"a": 1, "b": 2}, tags={"y", "x"}) == 6  # dict/set order doesn't matter
+    assert total((1, 2, 3), weights={"a": 1, "b": 2}, tags={"x", "y"}) == 6  # a list keys like its tuple
+    assert len(calls) == 1
+    assert total([3], weights={"a": [1, {"c": 2}]}) == 3
+    assert total([3], weights={"a": [1, {"c": 3}]}) == 3  # nested values are part of the key
+    assert len(calls) == 3
+
+
+def test_falsy_results_can_be_retried():
+    fetch, calls = _memoized(lambda url: "", cache_empty=False)
+    fetch("https://example.com"), fetch("https://example.com")
+    assert len(calls) == 2 and fetch.memo.stats()["size"] == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(memo_module.time, "monotonic", lambda: now[0])
+    memo = Memo("ttl", ttl=10)
+    memo.put("k", "v")
+    now[0] += 9
+    assert memo.get("k") == "v"
+    now[0] += 2
+    assert memo.get("k") is memo_module._MISSING
+    assert (memo.hits, memo.misses) == (1, 1)
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+from utils.project_index import TOP_PROJECTS, ProjectIndex, select_projects
+
+JD = ("Senior Data Engineer: build Kafka streaming pipelines and Airflow DAGs in Python, "
+      "model data in Postgres. Kafka experience is a must.")
+
+
+def _portfolio():
+    filler = [{"title": f"Side project {i}", "tech": ["HTML", "CSS"], "desc": "A small static website."}
+              for i in range(8)]
+    relevant = [
+        {"title": "Kafka event bus", "tech": ["Kafka", "Java"], "desc": "Streaming orders between services."},
+        {"title": "Analytics warehouse", "tech": ["Python", "Airflow", "Postgres"], "desc": "Nightly DAGs."},
+        {"title": "Chat bot", "tech": ["Node.js"], "desc": "Answers questions; events land in Kafka."},
+    ]
+    return filler[:3] + relevant[:1] + filler[3:6] + relevant[1:] + filler[6:]
+
+
+def test_relevant_projects_come_first_within_the_limit():
+    projects = _portfolio()
+    picks = select_projects(projects, JD)
+    assert TOP_PROJECTS == 5 and len(picks) == TOP_PROJECTS
+    titles = [p["project"]["title"] for p in picks]
+    assert set(titles[:3]) == {"Kafka event bus", "Analytics warehouse", "Chat bot"}
+    assert titles.index("Kafka event bus") < titles.index("Chat bot")  # title/tech outweigh the description
+    by_title = {p["project"]["title"]: p for p in picks}
+    assert by_title["Kafka event bus"]["matched"][0] == "kafka"
+    assert {"python", "airflow", "postgres"} <= set(by_title["Analytics warehouse"]["matched"])
+    assert picks[2]["score"] > picks[3]["score"] == 0
+    assert titles[3:] == ["Side project 0", "Side project 1"]  # non-matches fill up in original order
+    assert "no JD keyword match" in picks[4]["why"]
+
+
+def test_explicit_limits():
+    projects = _portfolio()
+    assert len(select_projects(projects, JD, k=2)) == 2
+    assert len(select_projects(projects, JD, k=0)) == len(projects)
+    assert select_projects([], JD) == []
+    index = ProjectIndex(projects)
+    assert index.select_many([JD, JD], k=3) == [select_projects(projects, JD, k=3)] * 2
+
+
+def test_limit_comes_from_prompt_top_projects():
+    code = ("from tests.test_project_index import JD, _portfolio\n"
+            "from utils.project_index import select_projects\n"
+            "print(len(select_projects(_portfolio(), JD)))")
+    env = dict(os.environ, PROMPT_TOP_PROJECTS="2")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "2"
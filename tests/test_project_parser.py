@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils import project_parser
+from utils.project_parser import convert_projects_for_prompt, iter_jsonl, parse_projects, sniff_format
+
+
+@pytest.fixture(params=["orjson", "json"])
+def loads(request, monkeypatch):
+    """Run a test once with orjson (when installed) and once with the stdlib parser."""
+    if request.param == "orjson":
+        orjson = pytest.importorskip("orjson")
+        monkeypatch.setattr(project_parser, "_loads", orjson.loads)
+    else:
+        monkeypatch.setattr(project_parser, "_loads", json.loads)
+    return request.param
+
+
+@pytest.mark.parametrize("text, fmt", [
+    ('[{"title": "A"}]', "json"),
+    ('\n\n  [\n  {"title": "A"}\n]', "json"),
+    ('{\n  "title": "A"\n}', "json"),  # one pretty-printed object
+    ('{"title": "A"}\n{"title": "B"}', "jsonl"),
+    ('{"title": "A"}', "jsonl"),
+    ("1. Chat bot – answers questions", "text"),
+    ("not a list at all", "text"),
+    ("", None),
+    ("   \n\t", None),
+    (None, None),
+])
+def test_sniff_format(text, fmt):
+    assert sniff_format(text) == fmt
+
+
+def test_json_list_and_single_object(loads):
+    projects, errors = parse_projects('[{"title": "A", "tech": ["Python"]}, 3, {"title": "B"}]')
+    assert [p["title"] for p in projects] == ["A", "B"]
+    assert errors == ["item 2: expected an object, got int"]
+
+    assert parse_projects('{\n  "title": "Solo"\n}') == ([{"title": "Solo"}], [])
+
+
+def test_broken_json_reports_the_line(loads):
+    projects, errors = parse_projects('[\n  {"title": "A"},\n  {"title": }\n]')
+    assert projects == []
+    assert len(errors) == 1 and errors[0].startswith("line 3: ")
+
+
+def test_jsonl_reports_each_bad_line_and_keeps_the_rest(loads):
+    text = '{"title": "A"}\n\n{"title": \n["not", "an", "object"]\n{"title": "B"}\n'
+    projects, errors = parse_projects(text)
+    assert [p["title"] for p in projects] == ["A", "B"]
+    assert [e.split(":")[0] for e in errors] == ["line 3", "line 4"]
+    assert errors[1] == "line 4: expected an object, got list"
+
+
+def test_jsonl_streams_from_a_file_of_bytes(loads):
+    lines = io.BytesIO(b'{"title": "A"}\n{"title": "B"}\n')
+    assert [p["title"] for p in iter_jsonl(lines)] == ["A", "B"]
+
+
+def test_text_lines_with_numbers_and_bullets():
+    text = "1. Chat bot – answers questions\n\n2) ETL - nightly loads\n• Portfolio site – static\nsome note\n"
+    projects, errors = parse_projects(text)
+    assert projects == [
+        {"title": "Chat bot", "desc": "answers questions"},
+        {"title": "ETL", "desc": "nightly loads"},
+        {"title": "Portfolio site", "desc": "static"},
+    ]
+    assert errors == ["line 5: expected '1. Title – description'"]
+
+
+def test_blank_input_is_no_projects_and_no_errors():
+    assert parse_projects("  \n") == ([], [])
+
+
+def test_convert_projects_for_prompt():
+    converted = convert_projects_for_prompt([
+        {"title": "A", "tech": ["Python", "SQL"], "desc": "d"},
+        {"title": "B", "tech": "Go"},
+        {},
+    ])
+    assert converted == [
+        {"name": "A", "tech_stack": "Python, SQL", "impact": "d"},
+        {"name": "B", "tech_stack": "Go", "impact": ""},
+        {"name": "", "tech_stack": "", "impact": ""},
+    ]
+
+
+def test_falls_back_to_the_stdlib_without_orjson():
+    code = ("import sys; sys.modules['orjson'] = None\n"
+            "from utils.project_parser import JSON_BACKEND, parse_projects\n"
+            "print(JSON_BACKEND, parse_projects('{\"title\": \"A\"}\\n{\"title\": }')[1])")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.startswith("json ['line 2: ")
@@ -0,0 +1,116 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import ratelimit
+from services.ratelimit import BATCH, INTERACTIVE, FairScheduler, llm_session
+
+
+class Clock:
+    """Fake monotonic clock for the scheduler's buckets and deadlines; waiters are woken by advance()."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _until(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out waiting for the scheduler"
+        time.sleep(0.002)
+
+
+class Harness:
+    """A scheduler granting one request per fake second, and helpers to queue requests from threads."""
+
+    def __init__(self, clock: Clock):
+        self.clock = clock
+        self.scheduler = FairScheduler(60, 6_000_000)
+        assert self.scheduler.acquire()  # spend the one-request burst: everything after this queues
+        self.granted = []
+        self.results = {}
+        self.positions = {}
+        self._lock = threading.Lock()
+
+    def request(self, label, session, priority=INTERACTIVE, timeout=None):
+        depth = self.scheduler.queue_depth()
+
+        def run():
+            with llm_session(session, priority):
+                ok = self.scheduler.acquire(timeout=timeout, on_wait=self.positions.setdefault(label, []).append)
+            with self._lock:
+                self.results[label] = ok
+                if ok:
+                    self.granted.append(label)
+
+        threading.Thread(target=run, daemon=True).start()
+        _until(lambda: self.scheduler.queue_depth() > depth)  # queued in the order of the calls
+
+    def advance(self, seconds=1.0, expect=None):
+        done = len(self.results)
+        self.clock.now += seconds
+        with self.scheduler._cond:
+            self.scheduler._cond.notify_all()
+        _until(lambda: len(self.results) >= (expect if expect is not None else done + 1))
+
+    def drain(self):
+        while self.scheduler.queue_depth():
+            self.advance()
+
+
+@pytest.fixture
+def harness(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=clock))
+    monkeypatch.setattr(ratelimit, "BURST_SECONDS", 1)
+    return Harness(clock)
+
+
+def test_interactive_requests_go_before_batch(harness):
+    harness.request("batch 1", "batch-run", BATCH)
+    harness.request("batch 2", "batch-run", BATCH)
+    harness.request("ui 1", "alice")
+    harness.drain()
+    assert harness.granted == ["ui 1", "batch 1", "batch 2"]
+
+
+def test_sessions_take_turns_and_each_is_fifo(harness):
+    for i in (1, 2, 3):
+        harness.request(f"a{i}", "alice")
+    for i in (1, 2):
+        harness.request(f"b{i}", "bob")
+    harness.request("c1", "carol")
+    harness.drain()
+    assert harness.granted == ["a1", "b1", "c1", "a2", "b2", "a3"]
+    assert harness.scheduler.stats()["granted"] == 7
+
+
+def test_position_in_line_follows_round_robin(harness):
+    harness.request("a1", "alice")
+    harness.request("a2", "alice")
+    harness.request("b1", "bob")
+    assert harness.positions["b1"][0] == 2  # one turn for alice, then bob
+    assert harness.positions["a2"][0] == 2
+    harness.advance()
+    assert harness.granted == ["a1"]
+    _until(lambda: harness.positions["a2"][-1] == 2 and harness.positions["b1"][-1] == 1)
+    harness.drain()
+    assert harness.granted == ["a1", "b1", "a2"]
+
+
+def test_expired_request_leaves_the_queue(harness):
+    harness.request("a1", "alice")
+    harness.request("b1", "bob", timeout=5)
+    harness.request("c1", "carol")
+    harness.advance(6, expect=2)  # a1 is served; b1's deadline has passed by the time it is at the head
+    assert harness.results["b1"] is False
+    assert harness.granted == ["a1"]
+    assert harness.scheduler.stats()["timed_out"] == 1
+    assert harness.scheduler.queue_depth() == 1
+    harness.drain()
+    assert harness.granted == ["a1", "c1"]
@@ -0,0 +1,40 @@
+import random
+
+from core.generator import StreamRedactor, redact, redact_stream
+
+SAMPLES = [
+    "Reach me at jane.doe+jobs@example.co.uk or +64 21 555 1234 any time.",
+    "Call 021-555-1234, 021 555 1234 or (09) 555 1234; mail a@b.io, x_y@mail-host.org.",
+    "Phone:+1 415 555 0100.Email:first.last@sub.domain.com!Thanks",
+    "No contact details in this line, just 2024 and 42.",
+    "Edge: a@b.c is too short, but bob@site.dev counts; 1234567 is short, 12345678 9 is not.",
+]
+
+
+def _random_chunks(text, rng):
+    chunks, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 8)
+        chunks.append(text[i:i + n])
+        i += n
+    return chunks
+
+
+def test_stream_matches_redact_for_random_chunking():
+    rng = random.Random(1234)
+    for _ in range(300):
+        text = " ".join(rng.sample(SAMPLES, rng.randint(1, len(SAMPLES))))
+        streamed = "".join(redact_stream(_random_chunks(text, rng), True))
+        assert streamed == redact(text, True), text
+
+
+def test_one_character_chunks():
+    for text in SAMPLES:
+        redactor = StreamRedactor(True)
+        out = "".join(redactor.feed(c) for c in text) + redactor.flush()
+        assert out == redact(text, True)
+
+
+def test_disabled_passes_chunks_through():
+    chunks = ["mail me: a", "@example.com"]
+    assert list(redact_stream(chunks, False)) == chunks
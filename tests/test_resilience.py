@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from core.generator import run_variants
+from services import resilience
+from services.backends import CircuitOpenError, DeadlineExceeded, HTTPBackend, LLMError
+from services.llm import generate_letters, supports_multi_choice
+from services.stub_server import StubConfig, StubServer, make_handler
+
+MESSAGES = [{"role": "user", "content": "Write a cover letter."}]
+
+
+class Stub:
+    def __init__(self, **config):
+        self.config = StubConfig(**config)
+        self.server = StubServer(("127.0.0.1", 0), make_handler(self.config))
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self.backend = HTTPBackend(self.url)
+
+    def stats(self):
+        with urllib.request.urlopen(self.url.rsplit("/v1", 1)[0] + "/stats") as resp:
+            return json.load(resp)
+
+    def complete(self, timeout=None, n=1):
+        return resilience.call(lambda t: self.backend.complete(MESSAGES, "stub", n, 0.5, t),
+                               self.backend.key, timeout)
+
+
+@pytest.fixture
+def stub():
+    """Factory for stub servers on free ports; each has its own backend key, so its own breaker."""
+    servers = []
+
+    def start(**config):
+        s = Stub(**config)
+        threading.Thread(target=s.server.serve_forever, daemon=True).start()
+        servers.append(s.server)
+        return s
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(resilience, "MAX_RETRIES", 2)
+
+
+def test_transient_errors_are_retried_up_to_max_retries(stub):
+    s = stub(error_rate=1.0, error_status=(503,))
+    with pytest.raises(LLMError) as info:
+        s.complete()
+    assert info.value.status_code == 503
+    assert s.stats()["requests"] == 1 + resilience.MAX_RETRIES
+
+
+def test_client_errors_are_not_retried(stub):
+    s = stub(error_rate=1.0, error_status=(400,))
+    with pytest.raises(LLMError) as info:
+        s.complete()
+    assert info.value.status_code == 400 and not info.value.retryable
+    assert s.stats()["requests"] == 1
+
+
+def test_success_after_a_transient_error(stub):
+    s = stub(error_rate=0.5, error_status=(503,), seed=3)
+    texts, _ = s.complete()
+    assert texts and texts[0]
+    stats = s.stats()
+    assert stats["requests"] == stats["errors"] + 1
+
+
+def test_deadline_covers_a_slow_attempt(stub):
+    s = stub(latency="fixed:1.0")
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        s.complete(timeout=0.3)
+    assert time.monotonic() - start < 0.8
+    assert s.stats()["requests"] == 1  # no retry once the deadline is spent
+
+
+def test_retry_after_beyond_the_deadline_gives_up_at_once(stub):
+    s = stub(error_rate=1.0, error_status=(429,), retry_after=2.0)
+    start = time.monotonic()
+    with pytest.raises(LLMError) as info:
+        s.complete(timeout=1.0)
+    assert info.value.status_code == 429
+    assert time.monotonic() - start < 0.5
+    assert s.stats()["requests"] == 1
+
+
+def test_breaker_opens_and_half_open_trial_closes_it(stub, monkeypatch):
+    monkeypatch.setattr(resilience, "MAX_RETRIES", 0)
+    s = stub(error_rate=1.0, error_status=(503,))
+    breaker = resilience.CircuitBreaker(s.backend.key, threshold=2, reset_after=0.2)
+    monkeypatch.setitem(resilience._breakers, s.backend.key, breaker)
+
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            s.complete()
+    assert breaker.state == "open" and breaker.times_opened == 1
+    with pytest.raises(CircuitOpenError):
+        s.complete()
+    assert s.stats()["requests"] == 2  # refused without a request
+
+    time.sleep(0.25)
+    assert breaker.state == "half_open"
+    with pytest.raises(LLMError):
+        s.complete()  # the failed trial re-opens the circuit
+    assert breaker.state == "open" and breaker.times_opened == 2
+    assert s.stats()["requests"] == 3
+
+    time.sleep(0.25)
+    s.config.error_rate = 0.0
+    texts, _ = s.complete()
+    assert texts and breaker.state == "closed" and breaker.failures == 0
+
+
+def test_single_choice_fallback(stub, monkeypatch):
+    s = stub(reject_n=True)
+    monkeypatch.setenv("LLM_BACKEND", "http")
+    monkeypatch.setenv("OPENAI_BASE_URL", s.url)
+    assert supports_multi_choice("stub")
+
+    report = {}
+    letters = run_variants("Write a cover letter.", "stub", 3, timeout=5, fresh=True, report=report)
+    assert len(letters) == 3
+    assert report["requests"] == 4 and report["choices_per_request"] == 0
+    assert not supports_multi_choice("stub")
+
+    run_variants("Write a cover letter.", "stub", 3, timeout=5, fresh=True, report=report)
+    assert report["requests"] == 3  # no second n-choice attempt
+    assert s.stats()["requests"] == 7
+
+
+def test_unrelated_400_keeps_multi_choice(stub, monkeypatch):
+    s = stub(error_rate=1.0, error_status=(400,))
+    monkeypatch.setenv("LLM_BACKEND", "http")
+    monkeypatch.setenv("OPENAI_BASE_URL", s.url)
+    with pytest.raises(LLMError):
+        generate_letters("Write a cover letter.", 3, model_choice="stub")
+    assert supports_multi_choice("stub")
+
+
+def _half_open(monkeypatch, key):
+    breaker = resilience.CircuitBreaker(key, threshold=1, reset_after=0.05)
+    monkeypatch.setitem(resilience._breakers, key, breaker)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_closing_a_stream_during_the_half_open_trial_releases_it(monkeypatch):
+    breaker = _half_open(monkeypatch, "test:closed-stream")
+    chunks = resilience.stream(lambda t: iter(["a", "b", "c"]), "test:closed-stream")
+    assert next(chunks) == "a"
+    assert breaker.trial_running
+    chunks.close()  # GeneratorExit inside the trial
+    assert not breaker.trial_running
+    assert list(resilience.stream(lambda t: iter(["x"]), "test:closed-stream")) == ["x"]
+    assert breaker.state == "closed"
+
+
+def test_retry_inside_the_half_open_trial_keeps_the_trial(monkeypatch):
+    breaker = _half_open(monkeypatch, "test:trial-retry")
+    calls = []
+
+    def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise LLMError("HTTP 503", 503, retryable=True)
+        return "ok"
+
+    assert resilience.call(flaky, "test:trial-retry") == "ok"
+    assert len(calls) == 2 and breaker.state == "closed"
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from core.summarize import candidate_sentences, letter_parts, rank_sentences, summarize
+
+LETTER = """Alex Doe
+Berlin | alex@example.com
+
+Dear Hiring Team,
+
+I am applying for the Data Engineer role on your analytics platform team.
+At Acme I built batch pipelines in Python and Airflow that load sales data every night.
+I also moved our streaming jobs to Kafka and cut end-to-end latency from hours to minutes.
+Outside work I enjoy hiking in the mountains with my two dogs on weekends.
+My pipelines in Python and Airflow now feed every analytics dashboard the company uses.
+Thank you for your time and consideration.
+
+Sincerely,
+Alex Doe"""
+
+
+def test_letter_parts_split_greeting_body_and_signer():
+    greeting, body, signer = letter_parts(LETTER)
+    assert greeting == "Dear Hiring Team,"
+    assert signer == "Alex Doe"
+    assert body.startswith("I am applying") and body.endswith("consideration.")
+    assert "alex@example.com" not in body and "Sincerely" not in body
+
+
+def test_candidates_skip_short_sentences_and_courtesies():
+    body = letter_parts(LETTER)[1] + "\nThanks a lot."
+    sentences = candidate_sentences(body)
+    assert len(sentences) == 5
+    assert not any("Thank" in s for s in sentences)
+
+
+def test_keywords_multiply_scores_by_the_keywords_mentioned():
+    sentences = candidate_sentences(letter_parts(LETTER)[1])
+    [plain] = rank_sentences([sentences])
+    [weighted] = rank_sentences([sentences], ["python", "airflow", "kafka"])
+    mentions = np.array([0, 2, 1, 0, 2])
+    assert np.allclose(weighted, plain * (1 + mentions))
+    assert weighted[2] > weighted[3] and plain[2] == pytest.approx(plain[3])  # Kafka vs. hiking
+
+    assert summarize([LETTER], max_sentences=1)[0][1] == [sentences[4]]
+    assert summarize([LETTER], ["acme"], max_sentences=1)[0][1] == [sentences[1]]
+
+
+def test_summary_respects_sentence_and_word_limits_in_letter_order():
+    greeting, summary, signer = summarize([LETTER], ["python", "airflow"], max_sentences=2)[0]
+    assert (greeting, signer) == ("Dear Hiring Team,", "Alex Doe")
+    assert len(summary) == 2
+    sentences = candidate_sentences(letter_parts(LETTER)[1])
+    positions = [sentences.index(s) for s in summary]
+    assert positions == sorted(positions)
+
+    for max_words in (20, 35, 60):
+        summary = summarize([LETTER], max_sentences=5, max_words=max_words)[0][1]
+        assert sum(len(s.split()) for s in summary) <= max_words
+    # the best sentence is kept even when it alone is over the word budget
+    assert len(summarize([LETTER], max_words=3)[0][1]) == 1
+
+
+@pytest.mark.parametrize("letter, expected", [
+    ("", ("", [], "")),
+    ("Dear Sam,\n\nThanks.\n\nBest,\nAlex", ("Dear Sam,", [], "Alex")),
+    ("I build reliable data pipelines in Python.", ("", ["I build reliable data pipelines in Python."], "")),
+])
+def test_degenerate_letters(letter, expected):
+    assert summarize([letter], ["python"]) == [expected]
+
+
+def test_letters_are_ranked_independently_in_one_batch():
+    other = LETTER.replace("Kafka", "Flink").replace("hiking", "sailing")
+    assert summarize([LETTER, "", other], ["python"]) == \
+        [summarize([LETTER], ["python"])[0], ("", [], ""), summarize([other], ["python"])[0]]
+    assert summarize([]) == []
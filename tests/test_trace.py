@@ -0,0 +1,20 @@
+import socket
+import urllib.request
+
+import utils.trace as trace
+
+
+def test_metrics_server_binds_loopback_by_default(monkeypatch):
+    monkeypatch.setattr(trace, "_server", None)
+    monkeypatch.setattr(trace, "_enabled", trace._enabled)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = trace.start_metrics_server(port)
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            assert b"coverletter_span_duration_seconds" in resp.read()
+    finally:
+        server.shutdown()
+        server.server_close()
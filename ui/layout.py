@@ -1,23 +1,55 @@
 # ui/layout.py
+import hashlib
+import secrets
+import time
+import uuid
+
 import streamlit as st
-from utils.project_parser import parse_projects_input
+from utils.keywords import match_matrix
+from utils.project_index import select_projects
+from utils.project_parser import convert_projects_for_prompt, parse_projects
+
+from services.api_client import api_enabled, follow_job, submit_job
+from utils.memo import memo_stats, memoize
+from utils.trace import span
 
 # Optional imports with graceful fallbacks
 try:
-    from utils.jd import clean_text
+    from utils.jd import clean_text, fetch_url_text
 except Exception:
     def clean_text(x): return x or ""
+    def fetch_url_text(url): return ""
 
 try:
-    from core.generator import generate_variants, make_email_version
+    from core.generator import Queued, make_email_versions, score_letters, stream_variants
+    from services.cache import response_cache
+    from services.llm import pool_stats
+    from services.ratelimit import INTERACTIVE, llm_scheduler, llm_session
+    from services.resilience import resilience_stats
     _HAS_GENERATOR = True
 except Exception:
     _HAS_GENERATOR = False
-    def make_email_version(text):  # simple fallback
-        return text[:500] + "..." if len(text) > 500 else text
+    def make_email_versions(letters, *args):  # simple fallback
+        return [text[:500] + "..." if len(text) > 500 else text for text in letters]
+
+try:
+    from core.batch import remember
+    from services.history import HISTORY_ENABLED, HISTORY_USER, history
+    _HAS_HISTORY = True
+except Exception:
+    _HAS_HISTORY = False
+    HISTORY_USER = ""
 
 from core.prompt import build_prompt
 
+# Streamlit reruns this script on every widget change; these memos make a
+# rerun with unchanged inputs skip the work (see the "Debug: caches" expander).
+_parse_projects = memoize("parse_projects", maxsize=32)(parse_projects)
+_clean_text = memoize("clean_text", maxsize=32)(clean_text)
+_fetch_url_text = memoize("fetch_url_text", maxsize=32, ttl=600, cache_empty=False)(fetch_url_text)
+if _HAS_HISTORY:
+    _similar_letters = memoize("history_similar", maxsize=8, ttl=30, cache_empty=False)(history.similar)
+
 
 # -------------------------------
 # Sidebar Inputs
@@ -33,6 +65,13 @@ def sidebar_inputs():
     target_role = st.sidebar.text_input("Role", placeholder="Software Engineer Intern")
     company = st.sidebar.text_input("Company", placeholder="Harmoney")
     jd_text = st.sidebar.text_area("Job description / JD text", height=160)
+    jd_url = st.sidebar.text_input("Job ad URL (optional, used when JD text is empty)")
+    if (jd_url or "").strip() and not (jd_text or "").strip():
+        jd_text = _fetch_url_text(jd_url.strip())
+        if jd_text:
+            st.sidebar.caption(f"Fetched {len(jd_text):,} characters from the URL.")
+        else:
+            st.sidebar.warning("Could not fetch text from that URL; paste the JD instead.")
 
     # Projects (flexible)
     st.sidebar.header("Projects")
@@ -51,9 +90,15 @@ def sidebar_inputs():
         ),
         height=200,
     )
-    parsed_projects = parse_projects_input(projects_raw)
+    parsed_projects, project_errors = _parse_projects(projects_raw)
+    if project_errors:
+        st.sidebar.warning(f"{len(project_errors)} project line(s) could not be parsed; see the preview.")
 
     with st.sidebar.expander("Preview parsed projects"):
+        for error in project_errors[:20]:
+            st.caption(error)
+        if len(project_errors) > 20:
+            st.caption(f"... and {len(project_errors) - 20} more")
         if parsed_projects:
             st.json(parsed_projects)
         else:
@@ -89,6 +134,11 @@ def sidebar_inputs():
     )
     # privacy mode to avoid external API calls (forces fallback path)
     privacy = st.sidebar.checkbox("Privacy mode (no external API)", value=False)
+    # bypass the response cache and always call the model
+    fresh = st.sidebar.checkbox("Force fresh generation (skip cache)", value=False)
+    show_timings = st.sidebar.checkbox("Show timings", value=False, key="show_timings")
+    # run generation on the API service (API_URL) instead of this script thread
+    use_api = api_enabled() and st.sidebar.checkbox("Generate via API service", value=True)
 
     tone = st.sidebar.selectbox("Tone", ["Professional", "Warm", "Direct"], index=0)
     extra_notes = st.sidebar.text_area(
@@ -115,27 +165,113 @@ def sidebar_inputs():
         "variants": int(variants),
         "model_choice": model_choice,
         "privacy": bool(privacy),
+        "fresh": bool(fresh),
+        "show_timings": bool(show_timings),
+        "use_api": bool(use_api),
     }
 
 
-# -------------------------------
-# Project Conversion
-# -------------------------------
-def _convert_projects_for_prompt(projects):
-    """ Map UI projects -> prompt.py expected schema """
-    out = []
-    for p in projects or []:
-        out.append({
-            "name": p.get("title", ""),
-            "tech_stack": ", ".join(p.get("tech", [])) if isinstance(p.get("tech"), list) else (p.get("tech") or ""),
-            "impact": p.get("desc", ""),
+def debug_panel():
+    with st.sidebar.expander("Debug: caches"):
+        st.caption("Per-input memos (hits skip the work on reruns)")
+        st.json(memo_stats())
+        if _HAS_GENERATOR:
+            st.caption("LLM response cache")
+            st.json(response_cache.stats())
+            st.caption("LLM connection pools (connections opened vs. reused)")
+            st.json(pool_stats())
+            st.caption("LLM endpoints (circuit breaker, latency, hedging)")
+            st.json(resilience_stats())
+            st.caption("Shared LLM queue (all sessions)")
+            st.json(llm_scheduler.stats())
+
+
+def timings_panel(spans):
+    with st.expander("Timings", expanded=True):
+        if not spans:
+            st.caption("No traced work this run (unchanged inputs are served from memos).")
+            return
+        st.table({
+            "stage": [s["span"] for s in spans],
+            "ms": [s["ms"] for s in spans],
+            "details": [", ".join(f"{k}={v}" for k, v in s.items() if k not in ("span", "ms")) for s in spans],
         })
-    return out
+
+
+def _similar_history(job_ad):
+    """Your earlier letters for near-identical job ads (services.history), most similar first."""
+    if not (_HAS_HISTORY and HISTORY_ENABLED and job_ad.strip()):
+        return []
+    return _similar_letters(_history_owner(), job_ad)
+
+
+def _offer_history(similar):
+    """Show letters from a near-identical earlier ad; returns them if the user reuses them."""
+    best = similar[0]
+    latest = [g for g in best["letters"] if g["created"] == best["letters"][0]["created"]]
+    with st.expander(f"Letters for a near-identical job ad ({best['similarity']:.0%} similar, "
+                     f"{len(best['letters'])} stored)", expanded=True):
+        st.caption("Reusing them skips the model call. " + best["jd_text"][:200] + "...")
+        for g in latest:
+            st.text(g["letter"][:400] + ("..." if len(g["letter"]) > 400 else ""))
+        if st.button("Reuse these letters", use_container_width=True):
+            return [g["letter"] for g in latest]
+    return None
+
+
+def history_panel():
+    st.subheader("History")
+    if not (_HAS_HISTORY and HISTORY_ENABLED):
+        st.caption("History is off; set HISTORY=1 to keep your letters.")
+        return
+    stats = history.stats(_history_owner())
+    st.caption(f"{stats['letters']} letters for {stats['job_ads']} job ads stored locally for you.")
+    query = st.text_input("Search letters, roles and job ads", key="history_query")
+    for hit in history.search(_history_owner(), query) if query.strip() else []:
+        label = f"{hit['role'] or 'Letter'} — {time.strftime('%Y-%m-%d %H:%M', time.localtime(hit['created']))}"
+        with st.expander(label):
+            st.write(hit["letter"])
+
+
+def _session_id():
+    """Stable id of this browser session, used for fair queueing of LLM calls."""
+    if "llm_session_id" not in st.session_state:
+        st.session_state["llm_session_id"] = uuid.uuid4().hex[:12]
+    return st.session_state["llm_session_id"]
+
+
+def _history_owner():
+    """Owner of this user's history rows: the same across reloads and sessions, private to the user.
+
+    HISTORY_USER (a single-user install) wins, then the signed-in user when
+    Streamlit authentication is configured; otherwise a random key kept in
+    the page URL (?history_key=...), so a bookmarked page finds its history
+    again. Only a hash of the identity is stored.
+    """
+    identity = HISTORY_USER and f"user:{HISTORY_USER}"
+    if not identity:
+        try:
+            if st.user.get("is_logged_in"):
+                identity = f"login:{st.user.get('email') or st.user.get('sub')}"
+        except Exception:  # no authentication configured
+            pass
+    if not identity:
+        key = st.query_params.get("history_key")
+        if not key:
+            key = st.query_params["history_key"] = secrets.token_urlsafe(16)
+        identity = f"key:{key}"
+    return "ui:" + hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]
+
+
+def _pick_projects(state, job_ad):
+    """The projects most relevant to the job ad (top PROMPT_TOP_PROJECTS), best first."""
+    return select_projects(state.get("projects", []), job_ad)
 
 
 # Simple fallback letter generator
 def _simple_generate_letter(state):
-    projects_for_prompt = _convert_projects_for_prompt(state.get("projects", []))
+    picks = _pick_projects(state, _clean_text(state.get("jd_text", "")))
+    projects_for_prompt = convert_projects_for_prompt([p["project"] for p in picks])
     contact_line = " | ".join([v for v in [state.get("email"), state.get("phone")] if v])
 
     # Thread the "mode" preference into extra_notes so prompt sees it
@@ -144,7 +280,7 @@ def _simple_generate_letter(state):
         extra = (extra + f"\nMode preference: {state['mode']}").strip()
 
     prompt_text = build_prompt(
-        job_ad=clean_text(state.get("jd_text", "")),
+        job_ad=_clean_text(state.get("jd_text", "")),
         role_title=state.get("target_role", ""),
         skills=[],  # extend if you add a skills UI
         projects=projects_for_prompt,
@@ -161,44 +297,125 @@ def _simple_generate_letter(state):
     return prompt_text
 
 
+def _job_record(state):
+    """The UI state as a core.batch job record, for the API service."""
+    return {
+        "jd_text": state["jd_text"],
+        "role": state["target_role"],
+        "profile": {
+            "name": state["full_name"], "email": state["email"], "phone": state["phone"],
+            "city": state["location"], "projects": state.get("projects", []),
+        },
+        "options": {
+            "tone": state["tone"], "length_hint": state["length_hint"], "variants": state["variants"],
+            "model": state["model_choice"], "privacy": state["privacy"],
+            "include_header": state["include_header"], "mode": state["mode"],
+            "extra_notes": state["extra_notes"], "fresh": state.get("fresh", False),
+        },
+    }
+
+
+def _remote_variants(state, prompt_report):
+    """Submit the generation to the API service and relay its events as stream_variants does."""
+    # the history owner doubles as the API session, so letters made there show up in this history
+    job = submit_job(_job_record(state), session_id=_history_owner())
+    events = follow_job(job["id"])
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as done:
+            prompt_report.update(done.value["result"].get("prompt_report") or {})
+            return
+        if event["type"] == "chunk":
+            yield event["variant"], event["text"]
+        elif event["type"] == "queued":
+            yield event["variant"], Queued(event["position"])
+        elif event["type"] == "failed":
+            yield event["variant"], None
+
+
+def _render_stream(events, placeholder):
+    """Collect (variant, chunk) events, showing the first live variant as tokens arrive."""
+    parts = {}
+    for i, chunk in events:
+        if chunk is None:  # variant failed; drop its partial text
+            parts.pop(i, None)
+            continue
+        if isinstance(chunk, Queued):
+            if not parts:
+                placeholder.info(f"Waiting for the model: position {chunk.position} in the queue")
+            continue
+        parts[i] = parts.get(i, "") + chunk
+        if i == min(parts):
+            placeholder.write(parts[i])
+    return [parts[i].strip() for i in sorted(parts)]
+
+
 # Main Tabs
 def main_tabs(state):
-    tab1, tab2, tab3, tab4 = st.tabs(["Draft", "JD Match", "Variants", "Email"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Draft", "JD Match", "Variants", "Email", "History"])
 
-    if st.button("Generate Letter", type="primary", use_container_width=True):
+    similar = _similar_history(_clean_text(state.get("jd_text", "")))
+    reuse = _offer_history(similar) if similar else None
+
+    if st.button("Generate Letter", type="primary", use_container_width=True) or reuse:
         if not (state.get("jd_text") or "").strip():
             st.error("Please provide the job ad text.")
             st.stop()
 
+        with tab1:
+            st.subheader("Cover Letter")
+            draft = st.empty()
+
         with st.spinner("Generating..."):
             letters, keywords, matches = [], [], []
+            prompt_report = {}
+            picks = _pick_projects(state, _clean_text(state["jd_text"]))
 
+            if reuse and _HAS_GENERATOR:
+                letters, keywords, matches = score_letters(_clean_text(state["jd_text"]), reuse)
             # If privacy is ON, force simple path (no external API)
-            if state.get("privacy", False):
+            elif state.get("privacy", False):
                 letters = [_simple_generate_letter(state)]
             else:
                 if _HAS_GENERATOR:
                     try:
-                        projects_for_prompt = _convert_projects_for_prompt(state.get("projects", []))
+                        projects_for_prompt = convert_projects_for_prompt([p["project"] for p in picks])
                         contact_line = " | ".join([v for v in [state.get("email"), state.get("phone")] if v])
+                        job_ad = _clean_text(state["jd_text"])
+                        prompt_report = {}
 
-                        letters, keywords, matches = generate_variants(
-                            job_ad=clean_text(state["jd_text"]),
-                            role_title=state["target_role"],
-                            skills=[],  # optional
-                            projects=projects_for_prompt,
-                            tone=state["tone"],
-                            length_hint=str(state["length_hint"]),
-                            include_header=bool(state["include_header"]),
-                            candidate_name=state["full_name"],
-                            contact_line=contact_line,
-                            city=state["location"],
-                            extra_notes=(state["extra_notes"] + f"\nMode preference: {state['mode']}").strip(),
-                            # passthrough / optional args:
-                            model_choice=state["model_choice"],
-                            variants=state["variants"],
-                            privacy=state["privacy"],  # some generators may use this too
-                        )
+                        if state.get("use_api"):
+                            events = _remote_variants(state, prompt_report)
+                        else:
+                            events = stream_variants(
+                                job_ad=job_ad,
+                                role_title=state["target_role"],
+                                skills=[],  # optional
+                                projects=projects_for_prompt,
+                                tone=state["tone"],
+                                length_hint=str(state["length_hint"]),
+                                include_header=bool(state["include_header"]),
+                                candidate_name=state["full_name"],
+                                contact_line=contact_line,
+                                city=state["location"],
+                                extra_notes=(state["extra_notes"] + f"\nMode preference: {state['mode']}").strip(),
+                                # passthrough / optional args:
+                                model_choice=state["model_choice"],
+                                variants=state["variants"],
+                                privacy=state["privacy"],  # some generators may use this too
+                                fresh=state.get("fresh", False),
+                                prompt_report=prompt_report,
+                            )
+                        with llm_session(_session_id(), INTERACTIVE), span("stream_and_render") as attrs:
+                            letters = _render_stream(events, draft)
+                            attrs["variants"] = len(letters)
+                        letters, keywords, matches = score_letters(job_ad, letters)
+                        if _HAS_HISTORY and HISTORY_ENABLED and not state.get("use_api"):
+                            # the API service records its own generations
+                            remember(_history_owner(), {"job_ad": job_ad, "role_title": state["target_role"],
+                                                        "model_choice": state["model_choice"]},
+                                     letters, keywords, matches)
                     except TypeError:
                         # If signatures don't match, fall back gracefully
                         letters = [_simple_generate_letter(state)]
@@ -208,14 +425,32 @@ def main_tabs(state):
                     letters = [_simple_generate_letter(state)]
 
         with tab1:
-            st.subheader("Cover Letter")
-            st.write(letters[0])
+            draft.write(letters[0])
+            if prompt_report.get("prompt_tokens_after"):
+                st.caption(
+                    f"Prompt: {prompt_report['prompt_tokens_before']:,} → {prompt_report['prompt_tokens_after']:,} tokens "
+                    f"(job ad {prompt_report['jd_tokens_before']:,} → {prompt_report['jd_tokens_after']:,}, "
+                    f"{prompt_report['tokenizer']})"
+                )
+            if prompt_report.get("round_trips_saved"):
+                st.caption(
+                    f"{prompt_report['choices_per_request']} variants from one request: "
+                    f"{prompt_report['round_trips_saved']} round trips and "
+                    f"~{prompt_report['input_tokens_saved']:,} input tokens saved "
+                    f"({prompt_report['generation_s']:.1f}s total)"
+                )
+            if picks:
+                with st.expander(f"Projects used ({len(picks)} of {len(state.get('projects', []))})"):
+                    for p in picks:
+                        st.markdown(f"- {p['why']}")
             st.download_button("Download .txt", letters[0], "cover_letter.txt")
             st.download_button("Download .md", letters[0], "cover_letter.md")
 
         with tab2:
             st.subheader("JD Match")
             if matches:
+                if len(letters) > 1:
+                    st.caption("Showing the variant that covers the most JD keywords.")
                 st.table({"keyword": [k for k, _ in matches], "present": [p for _, p in matches]})
             else:
                 st.caption("No keyword matches available.")
@@ -223,18 +458,29 @@ def main_tabs(state):
         with tab3:
             st.subheader("Variants")
             if len(letters) > 1:
+                # letters are ranked by JD keyword coverage, best first
+                matrix = match_matrix(keywords, letters)
                 for i, lt in enumerate(letters):
-                    st.markdown(f"**Variant {i+1}**")
+                    covered = sum(1 for row in matrix if row[i])
+                    st.markdown(f"**Variant {i+1}** — covers {covered}/{len(keywords)} JD keywords")
                     st.write(lt)
                     st.download_button(f"Download Variant {i+1}", lt, f"variant_{i+1}.txt")
             else:
                 st.caption("Only one version generated.")
+            if _HAS_GENERATOR:
+                cache = response_cache.stats()
+                st.caption(f"Response cache: {cache['memory_hits'] + cache['disk_hits']} hits, "
+                           f"{cache['misses']} misses")
 
         with tab4:
             st.subheader("Email Version (concise)")
-            email_ver = make_email_version(letters[0])
-            st.code(email_ver)
-            st.download_button("Download email.txt", email_ver, "email.txt")
+            # the letter's key sentences, picked locally (no extra model call), for every variant at once
+            emails = make_email_versions(letters, keywords, state["target_role"], state["full_name"])
+            st.code(emails[0])
+            st.download_button("Download email.txt", emails[0], "email.txt")
+            for i, email_ver in enumerate(emails[1:], 2):
+                with st.expander(f"Variant {i}"):
+                    st.code(email_ver)
 
     else:
         st.info("Fill out the sidebar, then click **Generate Letter**.")
@@ -246,4 +492,7 @@ def main_tabs(state):
                 "variants": state.get("variants"),
                 "model_choice": state.get("model_choice"),
                 "privacy": state.get("privacy"),
-            })
\ No newline at end of file
+            })
+
+    with tab5:
+        history_panel()
\ No newline at end of file
@@ -0,0 +1,242 @@
+
+import ipaddress
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except Exception:
+    requests = None
+
+from utils.jd import MAX_CHARS, decoded_chunks, extract_text
+
+HTTP_CACHE_PATH = os.getenv("JD_HTTP_CACHE_PATH", os.path.join(".cache", "jd_http.sqlite3"))
+MAX_WORKERS = int(os.getenv("JD_FETCH_WORKERS", "8"))
+PER_HOST = int(os.getenv("JD_FETCH_PER_HOST", "2"))
+USER_AGENT = "Mozilla/5.0"
+MAX_REDIRECTS = 5
+
+
+def check_public_url(url: str) -> None:
+    """Raise ValueError unless `url` is http(s) and every address its host resolves to is public.
+
+    Used for URLs from API callers, so a token holder can't make the server
+    fetch loopback, private-network, link-local (cloud metadata) or other
+    non-global addresses.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("not an http(s) URL")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as exc:
+        raise ValueError(f"cannot resolve {parts.hostname}") from exc
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global:
+            raise ValueError(f"{parts.hostname} resolves to non-public address {address}")
+
+
+class HTTPCache:
+    """On-disk cache of extracted posting text plus the validators needed to revalidate it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY, text TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+                " fetched REAL NOT NULL, max_age REAL)"
+            )
+            self._db = db
+        return self._db
+
+    def get(self, url: str) -> Optional[Tuple[str, Optional[str], Optional[str], float, Optional[float]]]:
+        with self._lock:
+            return self._conn().execute(
+                "SELECT text, etag, last_modified, fetched, max_age FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str],
+            max_age: Optional[float]) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO pages (url, text, etag, last_modified, fetched, max_age)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, text, etag, last_modified, time.time(), max_age),
+            )
+            db.commit()
+
+    def touch(self, url: str) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute("UPDATE pages SET fetched = ? WHERE url = ?", (time.time(), url))
+            db.commit()
+
+
+def _max_age(headers) -> Optional[float]:
+    """Freshness lifetime from Cache-Control; None means revalidate on every use."""
+    directives = [d.strip().lower() for d in headers.get("Cache-Control", "").split(",")]
+    if "no-store" in directives or "no-cache" in directives:
+        return None
+    for d in directives:
+        if d.startswith("max-age="):
+            try:
+                return float(d.split("=", 1)[1])
+            except ValueError:
+                return None
+    return None
+
+
+class BulkFetcher:
+    """Fetches many job postings over one pooled session.
+
+    Concurrency is capped overall (`max_workers`) and per host (`per_host`).
+    Extracted text is cached on disk; cached pages are served directly while
+    fresh (Cache-Control max-age) and otherwise revalidated with a conditional
+    GET (If-None-Match / If-Modified-Since), so an unchanged posting costs a
+    304 with no body.
+    """
+
+    def __init__(self, cache: Optional[HTTPCache] = None, max_workers: int = MAX_WORKERS,
+                 per_host: int = PER_HOST, timeout: float = 15, session=None):
+        self.cache = cache if cache is not None else HTTPCache(HTTP_CACHE_PATH)
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.session = session if session is not None else self._new_session()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "fresh_hits": 0, "not_modified": 0, "downloads": 0, "errors": 0,
+                       "blocked": 0}
+
+    def _new_session(self):
+        if not requests:
+            return None
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        return session
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _get(self, url: str, headers: Dict[str, str], timeout: float, public_only: bool):
+        """GET `url` (streamed); with `public_only` every redirect hop is checked before it is followed."""
+        if not public_only:
+            return self.session.get(url, timeout=timeout, headers=headers, stream=True)
+        for _ in range(MAX_REDIRECTS + 1):
+            check_public_url(url)
+            resp = self.session.get(url, timeout=timeout, headers=headers, stream=True, allow_redirects=False)
+            if not resp.is_redirect:
+                return resp
+            url = urljoin(url, resp.headers["Location"])
+            resp.close()
+        raise ValueError("too many redirects")
+
+    def fetch(self, url: str, stats: Optional[Dict[str, object]] = None,
+              timeout: Optional[float] = None, public_only: bool = False) -> str:
+        """Visible text of `url` (best effort: "" on any error).
+
+        `public_only` refuses URLs (and redirects) to non-public addresses,
+        including from the cache; `stats["blocked"]` then says why.
+        """
+        stats = {} if stats is None else stats
+        if self.session is None:
+            return ""
+        if public_only:
+            try:
+                check_public_url(url)
+            except ValueError as exc:
+                self._count("blocked")
+                stats["blocked"] = str(exc)
+                return ""
+        cached = self.cache.get(url)
+        if cached is not None:
+            text, etag, last_modified, fetched, max_age = cached
+            if max_age is not None and time.time() - fetched < max_age:
+                self._count("fresh_hits")
+                stats["cache"] = "fresh"
+                return text
+        headers = {}
+        if cached is not None:
+            if cached[1]:
+                headers["If-None-Match"] = cached[1]
+            if cached[2]:
+                headers["If-Modified-Since"] = cached[2]
+        try:
+            with self._slot(url):
+                self._count("requests")
+                with self._get(url, headers, timeout or self.timeout, public_only) as resp:
+                    if resp.status_code == 304 and cached is not None:
+                        self.cache.touch(url)
+                        self._count("not_modified")
+                        stats["cache"] = "revalidated"
+                        return cached[0]
+                    resp.raise_for_status()
+                    text = extract_text(decoded_chunks(resp, stats), MAX_CHARS, stats)
+                    validators = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+                    max_age = _max_age(resp.headers)
+        except Exception:
+            self._count("errors")
+            return ""
+        self._count("downloads")
+        stats["cache"] = "miss"
+        if text and (validators[0] or validators[1] or max_age):
+            self.cache.put(url, text, validators[0], validators[1], max_age)
+        return text
+
+    def fetch_many(self, urls: List[str]) -> List[str]:
+        """Fetch all `urls` concurrently; texts are returned in input order."""
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)), thread_name_prefix="fetch") as pool:
+            return list(pool.map(self.fetch, urls))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+_default: Optional[BulkFetcher] = None
+_default_lock = threading.Lock()
+
+
+def default_fetcher() -> BulkFetcher:
+    """Process-wide fetcher shared by the UI, batch runs and fetch_url_text."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = BulkFetcher()
+        return _default
+
+
+def fetch_many(urls: List[str]) -> List[str]:
+    return default_fetcher().fetch_many(urls)
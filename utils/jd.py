@@ -1,30 +1,164 @@
 
+import codecs
 import re
-from typing import Optional
-
-try:
-    import requests
-    from bs4 import BeautifulSoup
-except Exception:
-    requests = None
-    BeautifulSoup = None
-
-
-def fetch_url_text(url: str, timeout: int = 15) -> str:
-    """Fetch visible text from a job posting URL (best effort)."""
-    if not requests or not BeautifulSoup:
-        return ""
-    try:
-        resp = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        for tag in soup(["script", "style", "noscript"]):
-            tag.extract()
-        text = " ".join(t.get_text(separator=" ", strip=True) for t in soup.find_all())
-        text = re.sub(r"\s+", " ", text).strip()
-        return text[:25000]
-    except Exception:
-        return ""
+import time
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Dict, Iterable, Optional
+
+from utils.trace import traced
+
+MAX_CHARS = 25000
+CHUNK_SIZE = 16 * 1024
+
+# Elements whose content is never part of the posting text.
+_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "footer", "aside", "form", "button", "select",
+}
+_SKIP_ROLES = {"navigation", "banner", "contentinfo", "complementary", "dialog", "search"}
+# Containers of the posting itself: never skipped, whatever their class or id says.
+_CONTENT_TAGS = {"html", "body", "main", "article"}
+# Matched against each whole id/class token, e.g. "cookie-banner", "site_footer",
+# "onetrust-consent-sdk"; "has-sidebar", "modal-open" or "main-menu-offset" don't match.
+_BOILERPLATE_RE = re.compile(
+    r"(?:site[-_]|main[-_]|global[-_])?"
+    r"(?:cookies?|consent|gdpr|nav|navbar|navigation|menu|footer|breadcrumbs?|newsletter|"
+    r"social[-_](?:share|links|icons|media)|share[-_](?:buttons|links|bar)|sidebar|modal|popup)"
+    r"(?:[-_](?:banner|bar|container|wrapper|wrap|notice|dialog|overlay|sdk|links|list|menu|nav|inner))?"
+    r"|onetrust[-_][\w-]*",
+    re.I,
+)
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+}
+
+
+class _TextExtractor(HTMLParser):
+    """Single pass over the HTML: each text node is visited once, boilerplate subtrees are skipped."""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.unfiltered = []  # every text node up to max_chars, used if filtering leaves nothing
+        self._unfiltered_size = 0
+        self.done = False
+        self._stack = []
+        self._open = Counter()  # open tag counts, so stray close tags are O(1) to detect
+        self._skip_depth = None  # stack depth of the boilerplate element being skipped
+
+    def _is_boilerplate(self, tag: str, attrs) -> bool:
+        if tag in _CONTENT_TAGS:
+            return False
+        if tag in _SKIP_TAGS:
+            return True
+        for name, value in attrs:
+            if not value:
+                if name == "hidden":
+                    return True
+                continue
+            if name in ("id", "class") and any(_BOILERPLATE_RE.fullmatch(t) for t in value.split()):
+                return True
+            if name == "role" and value.lower() in _SKIP_ROLES:
+                return True
+            if name == "aria-hidden" and value.lower() == "true":
+                return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            return
+        self._stack.append(tag)
+        self._open[tag] += 1
+        if self._skip_depth is None and self._is_boilerplate(tag, attrs):
+            self._skip_depth = len(self._stack)
+
+    def handle_endtag(self, tag):
+        if not self._open[tag]:
+            return  # stray close tag
+        while self._stack:
+            top = self._stack.pop()
+            self._open[top] -= 1
+            if top == tag:
+                break
+        if self._skip_depth is not None and len(self._stack) < self._skip_depth:
+            self._skip_depth = None
+
+    def handle_data(self, data):
+        if self.done:
+            return
+        text = " ".join(data.split())
+        if text and self._unfiltered_size < self.max_chars:
+            self.unfiltered.append(text)
+            self._unfiltered_size += len(text) + 1
+        if text and self._skip_depth is None:
+            self.parts.append(text)
+            self.size += len(text) + 1
+            if self.size >= self.max_chars:
+                self.done = True
+
+    def text(self) -> str:
+        # a page whose every block looked like boilerplate is still better read whole than lost
+        return " ".join(self.parts or self.unfiltered)[:self.max_chars]
+
+
+def extract_text(chunks: Iterable[str], max_chars: int = MAX_CHARS,
+                 stats: Optional[Dict[str, object]] = None) -> str:
+    """Visible text of an HTML document fed as string chunks.
+
+    Stops consuming `chunks` once `max_chars` of text is collected. When a
+    `stats` dict is given it is filled with input consumed and parse time.
+    """
+    start = time.perf_counter()
+    parser = _TextExtractor(max_chars)
+    consumed = 0
+    for chunk in chunks:
+        consumed += len(chunk)
+        parser.feed(chunk)
+        if parser.done:
+            break
+    if not parser.done:
+        parser.close()
+    text = parser.text()
+    if stats is not None:
+        stats.update({
+            "chars_processed": consumed,
+            "parse_ms": round((time.perf_counter() - start) * 1000, 2),
+            "chars": len(text),
+            "truncated": parser.done,
+        })
+    return text
+
+
+def html_to_text(html: str, max_chars: int = MAX_CHARS, stats: Optional[Dict[str, object]] = None) -> str:
+    chunks = (html[i:i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE))
+    return extract_text(chunks, max_chars, stats)
+
+
+def decoded_chunks(resp, stats: Dict[str, object]) -> Iterable[str]:
+    # requests assumes ISO-8859-1 for text/* without a charset; real pages are almost always UTF-8.
+    declared = "charset" in resp.headers.get("Content-Type", "").lower()
+    decoder = codecs.getincrementaldecoder(resp.encoding if declared and resp.encoding else "utf-8")(errors="replace")
+    stats["bytes_received"] = 0
+    for raw in resp.iter_content(CHUNK_SIZE):
+        stats["bytes_received"] += len(raw)
+        yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+
+@traced("fetch_url_text", lambda text, *a, **k: {"chars": len(text)})
+def fetch_url_text(url: str, timeout: int = 15, stats: Optional[Dict[str, object]] = None,
+                   public_only: bool = False) -> str:
+    """Fetch visible text from a job posting URL (best effort).
+
+    Goes through the shared pooled, HTTP-cached fetcher (utils.fetcher).
+    `public_only` refuses non-public addresses (for URLs from API callers).
+    """
+    from utils.fetcher import default_fetcher  # utils.fetcher imports this module
+    return default_fetcher().fetch(url, stats=stats, timeout=timeout, public_only=public_only)
 
 
 def clean_text(t: Optional[str]) -> str:
@@ -1,6 +1,13 @@
 
+import heapq
 import re
-from typing import List, Tuple, Set
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple, Set
+
+from utils.trace import traced
 
 STOPWORDS: Set[str] = set("""a an the and or with for from to into on in of by at as is are was were be been being
 this that these those i you he she it we they my our your their but if then so than too very just
@@ -8,37 +15,211 @@ not no nor over under out up down off more most less least only also again still
 per via while during about against without within until across because due such etc across""".split())
 
 TECH_HINTS: Set[str] = {
-    "python","java",".net","c#","c++","react","next.js","nestjs","node","typescript","javascript","sql",
+    "python","java",".net","c#","c++","react","next.js","nestjs","node","node.js","typescript","javascript","sql",
     "aws","azure","gcp","docker","kubernetes","fastapi","django","flask","spring","mongo","mongodb","postgres",
     "git","ci/cd","k8s","llm","rag","agent","agentic","uipath","power automate","step functions","ipaas"
 }
 
+# A token starts with a letter (or ".net"-style dot) and never ends in "." or "-",
+# so "Python." and "python" count as the same word.
+TOKEN_RE = re.compile(r"\.?[a-z](?:[a-z\.\#\+\-]*[a-z\#\+])?")
+
+# Byte table for the fast tokenizer: keep [a-z.#+-], everything else separates tokens.
+_KEEP = set(b"abcdefghijklmnopqrstuvwxyz.#+-")
+_SPLIT_TABLE = bytes(b if b in _KEEP else 0x20 for b in range(256))
+# Batches join their texts with NUL, which this table keeps so the joined text can be cut apart again.
+_BATCH_SEP = " \x00 "
+_BATCH_TABLE = b"\x00" + _SPLIT_TABLE[1:]
+
+
+def normalize_token(tok: str) -> str:
+    tok = tok.rstrip(".-").lstrip("-")
+    if tok.startswith(".") and not tok[1:2].isalpha():
+        tok = tok.lstrip(".")
+    return tok
+
+
+# Raw token -> normalized word ("" when dropped). Job-ad vocabulary is small and
+# repetitive, so after warm-up almost every token is a single dict lookup.
+_NORMALIZED: Dict[bytes, str] = {}
+_NORMALIZED_MAX = 200_000
+
+
+def _count(tokens: List[bytes]) -> Dict[str, int]:
+    """Counts of the normalized, non-stopword words among raw `tokens`, in first-seen order."""
+    raw = Counter(tokens)
+    freq: Dict[str, int] = {}
+    for tok, n in raw.items():
+        word = _NORMALIZED.get(tok)
+        if word is None:
+            word = normalize_token(tok.decode("ascii"))
+            if len(word) < 2 or word in STOPWORDS:
+                word = ""
+            if len(_NORMALIZED) < _NORMALIZED_MAX:
+                _NORMALIZED[tok] = word
+        if word:
+            freq[word] = freq.get(word, 0) + n
+    return freq
+
+
+def _token_counts(txt: str) -> Dict[str, int]:
+    """Counts of normalized, non-stopword tokens of lowercased `txt`, in first-seen order.
+
+    Splitting and counting happen in C (bytes.translate + split + Counter);
+    only the distinct tokens are looked at in Python.
+    """
+    return _count(txt.encode("ascii", "replace").translate(_SPLIT_TABLE).split())
+
+
+def token_counts(text: str) -> Dict[str, int]:
+    """Counts of the normalized, non-stopword words of `text`, in first-seen order.
+
+    The tokenizer behind extract_keywords and match_matrix, for callers that
+    index or compare text with the same notion of a word.
+    """
+    return _token_counts(text.lower())
+
+
+def _hint_pattern(hint: str) -> str:
+    first, *rest = hint.split()
+    # Word boundaries only where the hint itself starts/ends with a letter or digit,
+    # so ".net" still matches in "asp.net" but "git" no longer matches in "digital".
+    # The start check is a lookbehind placed *after* the first word so the pattern
+    # begins with a literal, which lets the regex engine scan for it quickly.
+    head = re.escape(first)
+    if hint[0].isalnum():
+        head += r"(?<![a-z0-9]" + re.escape(first) + ")"
+    body = "".join(r"\s+" + re.escape(part) for part in rest)
+    tail = r"(?![a-z0-9])" if hint[-1].isalnum() else ""
+    return head + body + tail
+
+
+def _compile_hints(hints: Iterable[str]):
+    """Split hints into plain tokens (a set intersection with the token counts)
+    and one alternation of word-bounded patterns for the rest (multi-word,
+    digits, slashes, leading dot), so each text is scanned once however many
+    hints there are. The pattern is None when every hint is a plain token.
+    """
+    token_hints, other = set(), []
+    for hint in hints:
+        if hint[0].isalpha() and TOKEN_RE.fullmatch(hint):
+            token_hints.add(hint)
+        else:
+            other.append(hint)
+    other.sort(key=lambda h: (-len(h), h))  # longest first, so a hint wins over its own prefix
+    pattern = re.compile("|".join(_hint_pattern(h) for h in other)) if other else None
+    return frozenset(token_hints), pattern
+
+
+# Built once at import; rebuild with _compile_hints if TECH_HINTS is changed at runtime.
+_TOKEN_HINTS, _HINT_RE = _compile_hints(TECH_HINTS)
+
 
+def _hint_counts(freq: Dict[str, int], matches: Iterable[str]) -> Dict[str, int]:
+    counts = {h: freq[h] for h in _TOKEN_HINTS.intersection(freq)}
+    for match in matches:
+        hint = " ".join(match.split())  # "power\nautomate" is the hint "power automate"
+        counts[hint] = counts.get(hint, 0) + 1
+    return counts
+
+
+def _rank(hint_counts: Dict[str, int], freq: Dict[str, int], top_k: int) -> List[str]:
+    included = [h for h, _ in sorted(hint_counts.items(), key=lambda x: (-x[1], x[0]))]
+    if len(included) >= top_k:
+        return included[:top_k]
+
+    seen = set(included)
+    for w, _ in heapq.nlargest(top_k + len(included), freq.items(), key=itemgetter(1)):
+        if w not in seen:
+            included.append(w)
+            if len(included) >= top_k:
+                break
+    return included
+
+
+@traced("extract_keywords", lambda kws, jd_text, *a, **k: {"jd_chars": len(jd_text), "keywords": len(kws)})
 def extract_keywords(jd_text: str, top_k: int = 20) -> List[str]:
-    """Very simple keyword extraction mixing tech hints and frequency."""
+    """Keyword extraction mixing tech hints and frequency.
+
+    Tech hints found in the text come first (most frequent first), then the
+    most frequent remaining tokens, up to `top_k` in total.
+    """
     txt = jd_text.lower()
-    tokens = re.findall(r"[a-zA-Z\.\#\+\-]+", txt)
-    freq = {}
-    for tok in tokens:
-        if tok in STOPWORDS or len(tok) < 2:
-            continue
-        freq[tok] = freq.get(tok, 0) + 1
-
-    included = []
-    for hint in TECH_HINTS:
-        if hint in txt:
-            included.append(hint)
-
-    top = sorted(freq.items(), key=lambda x: x[1], reverse=True)
-    for w, _ in top:
-        if w not in included:
-            included.append(w)
-        if len(included) >= top_k:
-            break
-    return included[:top_k]
+    freq = _token_counts(txt)
+    matches = _HINT_RE.findall(txt) if _HINT_RE is not None else ()
+    return _rank(_hint_counts(freq, matches), freq, top_k)
+
+
+@traced("extract_keywords_batch", lambda out, *a, **k: {"jds": len(out)})
+def extract_keywords_batch(jd_texts: Iterable[str], top_k: int = 20) -> List[List[str]]:
+    """extract_keywords over many JDs; identical texts are only processed once.
+
+    The distinct texts are joined and lowercased, tokenized and scanned for
+    pattern hints in one pass each; only counting and ranking are per text.
+    """
+    jd_texts = list(jd_texts)
+    distinct = list(dict.fromkeys(jd_texts))
+    if not distinct:
+        return []
+    lows = [t.lower().replace("\x00", "\x01") for t in distinct]  # NUL is reserved for the separator
+    joined = _BATCH_SEP.join(lows)
+
+    matches: List[List[str]] = [[] for _ in lows]
+    if _HINT_RE is not None:
+        starts, pos = [], 0
+        for low in lows:
+            starts.append(pos)
+            pos += len(low) + len(_BATCH_SEP)
+        for m in _HINT_RE.finditer(joined):
+            matches[bisect_right(starts, m.start()) - 1].append(m.group())
+
+    parts = joined.encode("ascii", "replace").translate(_BATCH_TABLE).split(_BATCH_SEP.encode())
+    done = {}
+    for text, part, found in zip(distinct, parts, matches):
+        freq = _count(part.split())
+        done[text] = _rank(_hint_counts(freq, found), freq, top_k)
+    return [list(done[text]) for text in jd_texts]
+
+
+@lru_cache(maxsize=1024)
+def _keyword_matcher(keyword: str):
+    """None for plain single-token keywords (looked up in token counts), else a word-bounded regex."""
+    if keyword[0].isalpha() and TOKEN_RE.fullmatch(keyword) and normalize_token(keyword) == keyword:
+        return None
+    return re.compile(_hint_pattern(keyword))
+
+
+@traced("match_matrix", lambda m, keywords, letters: {"keywords": len(keywords), "letters": len(letters),
+                                                    "letter_chars": sum(len(x) for x in letters)})
+def match_matrix(keywords: List[str], letters: List[str]) -> List[List[int]]:
+    """counts[k][v] = word-bounded occurrences of keywords[k] in letters[v].
+
+    Each letter is lowercased and tokenized once; single-token keywords are
+    dict lookups, only multi-word/special keywords run a regex.
+    """
+    kws = [kw.lower().strip() for kw in keywords]
+    matchers = [_keyword_matcher(kw) if kw else None for kw in kws]
+    columns = []
+    for letter in letters:
+        low = letter.lower()
+        counts = _token_counts(low)
+        columns.append([
+            (len(m.findall(low)) if m is not None else counts.get(kw, 0)) if kw else 0
+            for kw, m in zip(kws, matchers)
+        ])
+    return [list(row) for row in zip(*columns)] if columns else [[] for _ in kws]
+
+
+def rank_by_coverage(matrix: List[List[int]]) -> List[int]:
+    """Variant indices, best first: most keywords present, then most mentions, then original order."""
+    n_variants = len(matrix[0]) if matrix else 0
+    covered = [sum(1 for row in matrix if row[v]) for v in range(n_variants)]
+    mentions = [sum(row[v] for row in matrix) for v in range(n_variants)]
+    return sorted(range(n_variants), key=lambda v: (-covered[v], -mentions[v], v))
 
 
+@traced("jd_match_table", lambda t, keywords, letter: {"keywords": len(keywords), "letter_chars": len(letter)})
 def jd_match_table(keywords: List[str], letter: str) -> List[Tuple[str, bool]]:
-    """Check presence of each keyword in the letter text."""
-    L = letter.lower()
-    return [(kw, kw.lower() in L) for kw in keywords]
+    """Check presence of each keyword in the letter text (word-bounded)."""
+    matrix = match_matrix(keywords, [letter])
+    return [(kw, row[0] > 0) for kw, row in zip(keywords, matrix)]
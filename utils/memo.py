@@ -0,0 +1,96 @@
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+_MISSING = object()
+_registry: Dict[str, "Memo"] = {}
+
+
+def _freeze(value):
+    """Hashable stand-in for lists/dicts/sets so they can be part of a cache key."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+class Memo:
+    """Bounded LRU of call results keyed by the (frozen) arguments, with optional TTL."""
+
+    def __init__(self, name: str, maxsize: int = 128, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[object, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+def memoize(name: str, maxsize: int = 128, ttl: Optional[float] = None,
+            cache_empty: bool = True) -> Callable:
+    """Process-wide memo for pure functions of their arguments.
+
+    Survives Streamlit reruns (module state) and is shared by all sessions.
+    Results are returned as-is, so callers must treat them as read-only.
+    With `cache_empty=False`, falsy results (e.g. a failed fetch) are retried.
+    """
+    memo = _registry.setdefault(name, Memo(name, maxsize, ttl))
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (_freeze(args), _freeze(kwargs))
+            value = memo.get(key)
+            if value is _MISSING:
+                value = fn(*args, **kwargs)
+                if value or cache_empty:
+                    memo.put(key, value)
+            return value
+        wrapper.memo = memo
+        return wrapper
+
+    return decorator
+
+
+def memo_stats() -> Dict[str, Dict[str, object]]:
+    return {name: memo.stats() for name, memo in sorted(_registry.items())}
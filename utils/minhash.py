@@ -0,0 +1,66 @@
+import hashlib
+import re
+import zlib
+from typing import List
+
+import numpy as np
+
+# 128 permutations in 16 bands of 8 rows: pairs above ~0.7 Jaccard share a
+# band with high probability, pairs below ~0.5 rarely do.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3  # words per shingle
+
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20240501)  # fixed: signatures are stored and compared across runs
+# a < 2**31 and shingle hashes < 2**32 keep a*x + b below 2**64, so uint64 math is exact.
+_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, k: int = SHINGLE) -> np.ndarray:
+    """Distinct 32-bit hashes of the k-word shingles of `text` (lowercased)."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(w.encode()) for w in words), dtype=np.uint64, count=len(words))
+    if len(words) < k:
+        k = len(words)
+    combined = np.zeros(len(words) - k + 1, dtype=np.uint64)
+    for offset in range(k):
+        # wrapping multiply-add, then keep 32 bits: order-sensitive mix of k word hashes
+        combined = combined * np.uint64(0x9E3779B1) + hashes[offset:len(words) - k + 1 + offset]
+    return np.unique(combined & np.uint64(0xFFFFFFFF))
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint64 values) of the text's shingle set."""
+    x = shingles(text)
+    if not len(x):
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def band_keys(sig: np.ndarray) -> List[int]:
+    """One signed 64-bit LSH bucket per band (band index mixed in), for an SQLite index."""
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(chunk, digest_size=8, person=band.to_bytes(2, "little") * 8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def to_blob(sig: np.ndarray) -> bytes:
+    return sig.astype("<u8").tobytes()
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<u8").astype(np.uint64)
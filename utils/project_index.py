@@ -0,0 +1,119 @@
+
+import heapq
+import math
+import os
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from utils.keywords import extract_keywords, extract_keywords_batch, token_counts
+from utils.memo import memoize
+
+# Projects kept in the prompt; 0 keeps them all (still ordered by relevance).
+TOP_PROJECTS = int(os.getenv("PROMPT_TOP_PROJECTS", "5"))
+
+# BM25 parameters, and how much a term in each field counts (BM25F-style:
+# a keyword in the title or tech list says more than one in the description).
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = (("title", 3.0), ("tech", 2.0), ("desc", 1.0))
+
+# Shares the generator's memo (same registry name), so the JD is tokenized once.
+_extract_keywords = memoize("extract_keywords", maxsize=64)(extract_keywords)
+
+
+def _field_text(project: Dict, field: str) -> str:
+    value = project.get(field) or ""
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    return str(value)
+
+
+def _terms(keyword: str) -> List[str]:
+    """Index terms of a keyword, tokenized the same way as the projects."""
+    return list(token_counts(keyword))
+
+
+class ProjectIndex:
+    """BM25 inverted index over projects (title, tech, desc).
+
+    Each posting already holds the term's final BM25 weight for that project,
+    so scoring a JD is only a sum over the postings of its keywords.
+    """
+
+    def __init__(self, projects: Sequence[Dict]):
+        self.projects = list(projects)
+        term_freqs: List[Dict[str, float]] = []
+        lengths: List[float] = []
+        for p in self.projects:
+            tf: Dict[str, float] = {}
+            for field, weight in FIELD_WEIGHTS:
+                for term, n in token_counts(_field_text(p, field)).items():
+                    tf[term] = tf.get(term, 0.0) + n * weight
+            term_freqs.append(tf)
+            lengths.append(sum(tf.values()))
+
+        n_docs = len(self.projects)
+        avg_len = (sum(lengths) / n_docs) if n_docs else 0.0
+        df: Dict[str, int] = {}
+        for tf in term_freqs:
+            for term in tf:
+                df[term] = df.get(term, 0) + 1
+
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc, tf in enumerate(term_freqs):
+            norm = K1 * (1 - B + B * lengths[doc] / avg_len) if avg_len else K1
+            for term, f in tf.items():
+                idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+                self.postings.setdefault(term, []).append((doc, idf * f * (K1 + 1) / (f + norm)))
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    def score(self, keywords: Iterable[str]) -> List[Dict[str, float]]:
+        """Per project, the score contributed by each matching keyword."""
+        contrib: List[Dict[str, float]] = [{} for _ in self.projects]
+        seen = set()
+        for kw in keywords:
+            for term in _terms(kw):
+                if term in seen:
+                    continue  # e.g. "node" from both "node" and "node js"
+                seen.add(term)
+                for doc, w in self.postings.get(term, ()):
+                    contrib[doc][kw] = contrib[doc].get(kw, 0.0) + w
+        return contrib
+
+    def select(self, keywords: Sequence[str], k: int = TOP_PROJECTS) -> List[Dict]:
+        """The `k` best projects for the JD keywords, best first.
+
+        Each pick is {"index", "project", "score", "matched", "why"}; ties (and
+        projects matching nothing) keep their original order.
+        """
+        contrib = self.score(keywords)
+        totals = [sum(c.values()) for c in contrib]
+        k = len(self.projects) if k <= 0 else k
+        order = heapq.nsmallest(k, range(len(self.projects)), key=lambda i: (-totals[i], i))
+        picks = []
+        for i in order:
+            matched = [kw for kw, _ in sorted(contrib[i].items(), key=lambda x: -x[1])]
+            title = _field_text(self.projects[i], "title") or f"Project {i + 1}"
+            why = (f"{title}: matches {', '.join(matched)} (score {totals[i]:.2f})"
+                   if matched else f"{title}: no JD keyword match, kept to fill the top {k}")
+            picks.append({"index": i, "project": self.projects[i], "score": round(totals[i], 3),
+                          "matched": matched, "why": why})
+        return picks
+
+    def select_many(self, jd_texts: Iterable[str], k: int = TOP_PROJECTS) -> List[List[Dict]]:
+        """select() for many JDs against this one portfolio."""
+        return [self.select(kws, k) for kws in extract_keywords_batch(jd_texts, top_k=20)]
+
+
+@memoize("project_index", maxsize=8)
+def build_index(projects: Sequence[Dict]) -> ProjectIndex:
+    """ProjectIndex for a projects list, built once per distinct list."""
+    return ProjectIndex(projects)
+
+
+def select_projects(projects: Sequence[Dict], jd_text: str, k: int = TOP_PROJECTS) -> List[Dict]:
+    """Top-k picks of `projects` for a job ad (see ProjectIndex.select)."""
+    if not projects:
+        return []
+    return build_index(projects).select(_extract_keywords(jd_text, top_k=20), k)
@@ -1,37 +1,137 @@
+import io
 import json
 import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-def parse_projects_input(text):
-    # Try list of dict
+from utils.trace import traced
+
+# orjson is optional: several times faster on large JSON / JSON Lines input.
+try:
+    import orjson
+    _loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except Exception:
+    orjson = None
+    _loads = json.loads
+    JSON_BACKEND = "json"
+
+# "1. Title – description", "2) ...", or a "-", "*" or "•" bullet.
+_LINE_RE = re.compile(r"^(?:\d+[.)]|[-*•])\s*(.*?)\s*[–-]\s*(.*)")
+_NON_BLANK_RE = re.compile(r"\S")
+
+
+def sniff_format(text: str) -> Optional[str]:
+    """Which parser `text` needs, from its first non-blank line; None when blank.
+
+    "[" starts a JSON array, a line that is a whole "{...}" starts JSON Lines
+    (a "{" line that isn't closed is a single pretty-printed object), and
+    anything else is one project per line of text.
+    """
+    match = _NON_BLANK_RE.search(text or "")
+    if match is None:
+        return None
+    start = match.start()
+    if text[start] == "[":
+        return "json"
+    if text[start] == "{":
+        end = text.find("\n", start)
+        first_line = text[start:end if end != -1 else len(text)].rstrip()
+        return "jsonl" if first_line.endswith("}") else "json"
+    return "text"
+
+
+def _decode_error(exc: ValueError) -> str:
+    return getattr(exc, "msg", None) or str(exc)
+
+
+def _parse_json(text: str, errors: List[str]) -> List[Dict]:
     try:
-        parsed = json.loads(text)
-        if isinstance(parsed, list) and all(isinstance(p, dict) for p in parsed):
-            return parsed
-    except:
-        pass
-
-    # Try JSON lines
-    lines = text.strip().splitlines()
-    jsonl_parsed = []
-    for line in lines:
-        try:
-            obj = json.loads(line)
-            if isinstance(obj, dict):
-                jsonl_parsed.append(obj)
-        except:
-            pass
-    if jsonl_parsed:
-        return jsonl_parsed
-
-    # Try natural language lines
+        parsed = _loads(text)
+    except ValueError as exc:  # json.JSONDecodeError and orjson.JSONDecodeError
+        line = getattr(exc, "lineno", None)
+        errors.append(f"line {line}: {_decode_error(exc)}" if line else _decode_error(exc))
+        return []
+    if isinstance(parsed, dict):
+        return [parsed]
+    if not isinstance(parsed, list):
+        errors.append("expected a list of project objects")
+        return []
     projects = []
-    pattern = re.compile(r"^\d+\.\s*(.*?)\s*[–-]\s*(.*)")
-    for line in lines:
-        match = pattern.match(line.strip())
+    for i, item in enumerate(parsed):
+        if isinstance(item, dict):
+            projects.append(item)
+        else:
+            errors.append(f"item {i + 1}: expected an object, got {type(item).__name__}")
+    return projects
+
+
+def iter_jsonl(lines: Iterable[Union[str, bytes]], errors: Optional[List[str]] = None) -> Iterator[Dict]:
+    """Projects from JSON Lines, one line at a time.
+
+    `lines` can be a file object, so multi-megabyte files are never held in
+    memory. Blank lines are skipped; bad lines are described in `errors`.
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = _loads(line)
+        except ValueError as exc:
+            if errors is not None:
+                errors.append(f"line {number}: {_decode_error(exc)}")
+            continue
+        if isinstance(obj, dict):
+            yield obj
+        elif errors is not None:
+            errors.append(f"line {number}: expected an object, got {type(obj).__name__}")
+
+
+def iter_text_lines(lines: Iterable[str], errors: Optional[List[str]] = None) -> Iterator[Dict]:
+    """Projects from "1. Title – description" (or bulleted) lines."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        match = _LINE_RE.match(line)
         if match:
             title, desc = match.groups()
-            projects.append({"title": title.strip(), "desc": desc.strip()})
-    if projects:
-        return projects
+            yield {"title": title.strip(), "desc": desc.strip()}
+        elif errors is not None:
+            errors.append(f"line {number}: expected '1. Title – description'")
+
+
+@traced("parse_projects_input", lambda out, text: {"input_chars": len(text or ""), "projects": len(out[0]),
+                                                    "errors": len(out[1])})
+def parse_projects(text: str) -> Tuple[List[Dict], List[str]]:
+    """(projects, errors) for a JSON list, JSON Lines or one-project-per-line text.
+
+    The format is sniffed once (see sniff_format) and only that parser runs,
+    so parse time is linear in the input. Lines that can't be parsed are
+    reported in `errors` rather than silently dropped.
+    """
+    errors: List[str] = []
+    fmt = sniff_format(text)
+    if fmt == "json":
+        return _parse_json(text, errors), errors
+    if fmt == "jsonl":
+        return list(iter_jsonl(io.StringIO(text), errors)), errors
+    if fmt == "text":
+        return list(iter_text_lines(io.StringIO(text), errors)), errors
+    return [], errors
+
+
+def parse_projects_input(text):
+    """Parsed projects only (see parse_projects for the errors)."""
+    return parse_projects(text)[0]
+
 
-    return []
\ No newline at end of file
+def convert_projects_for_prompt(projects):
+    """ Map parsed projects (title/tech/desc) -> prompt.py expected schema """
+    out = []
+    for p in projects or []:
+        out.append({
+            "name": p.get("title", ""),
+            "tech_stack": ", ".join(p.get("tech", [])) if isinstance(p.get("tech"), list) else (p.get("tech") or ""),
+            "impact": p.get("desc", ""),
+        })
+    return out
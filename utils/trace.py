@@ -0,0 +1,275 @@
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Off by default: a traced call then costs one flag check and a ContextVar lookup.
+TRACE_ENABLED = os.getenv("TRACE", "0") == "1"
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"  # one JSON log line per span
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # serve /metrics when set
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # unauthenticated: widen only for a trusted scraper
+
+# Prometheus-style upper bounds (seconds) for span durations.
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_enabled = TRACE_ENABLED
+_collector: ContextVar[Optional[List[Dict[str, object]]]] = ContextVar("trace_collector", default=None)
+
+
+def enable(flag: bool = True) -> None:
+    """Turn process-wide recording on or off (collect_spans works either way)."""
+    global _enabled
+    _enabled = flag
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum/count, as in the Prometheus data model."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        out, total = [], 0
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+
+_lock = threading.Lock()
+_durations: Dict[str, Histogram] = {}
+_attr_sums: Dict[str, Dict[str, float]] = {}
+_errors: Dict[str, int] = {}
+_collectors: Dict[str, Callable[[], Dict[str, object]]] = {}
+
+
+def record(name: str, seconds: float, attrs: Dict[str, object], error: Optional[str] = None) -> None:
+    """Add one finished span to the histograms, the active collector and the JSON log."""
+    with _lock:
+        _durations.setdefault(name, Histogram()).observe(seconds)
+        sums = _attr_sums.setdefault(name, {})
+        for key, value in attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                sums[key] = sums.get(key, 0.0) + value
+        if error:
+            _errors[name] = _errors.get(name, 0) + 1
+    entry = {"span": name, "ms": round(seconds * 1000, 3), **attrs}
+    if error:
+        entry["error"] = error
+    spans = _collector.get()
+    if spans is not None:
+        with _lock:
+            spans.append(entry)
+    if TRACE_LOG:
+        log.info(json.dumps(entry, default=str))
+
+
+def _active() -> bool:
+    return _enabled or _collector.get() is not None
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict[str, object]]:
+    """Time a block; the yielded dict can be filled with attributes (sizes, counts)."""
+    if not _active():
+        yield attrs
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        record(name, time.perf_counter() - start, attrs, error)
+
+
+def traced(name: str, measure: Optional[Callable[..., Dict[str, object]]] = None):
+    """Decorator recording a span per call.
+
+    `measure(result, *args, **kwargs)` returns the span attributes (token
+    counts, payload sizes); it only runs while tracing is active. Generator
+    functions are timed until exhausted, with chunk and character counts.
+    """
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                if not _active():
+                    yield from fn(*args, **kwargs)
+                    return
+                start = time.perf_counter()
+                attrs: Dict[str, object] = {"chunks": 0, "output_chars": 0}
+                error = None
+                try:
+                    for item in fn(*args, **kwargs):
+                        if attrs["chunks"] == 0:
+                            attrs["first_chunk_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                        text = item[-1] if isinstance(item, tuple) else item
+                        attrs["chunks"] += 1
+                        attrs["output_chars"] += len(text) if isinstance(text, str) else 0
+                        yield item
+                except BaseException as exc:
+                    error = type(exc).__name__
+                    raise
+                finally:
+                    record(name, time.perf_counter() - start, attrs, error)
+            return gen_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _active():
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as exc:
+                record(name, time.perf_counter() - start, {}, type(exc).__name__)
+                raise
+            seconds = time.perf_counter() - start
+            attrs = {}
+            if measure is not None:
+                try:
+                    attrs = measure(result, *args, **kwargs)
+                except Exception:
+                    attrs = {}
+            record(name, seconds, attrs)
+            return result
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def collect_spans() -> Iterator[List[Dict[str, object]]]:
+    """Collect the spans finished in this context (and threads started with a copy of it)."""
+    spans: List[Dict[str, object]] = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+def register_collector(prefix: str, fn: Callable[[], Dict[str, object]]) -> None:
+    """Export the numeric values of `fn()` as gauges named <prefix>_<key>."""
+    _collectors[prefix] = fn
+
+
+def snapshot() -> Dict[str, Dict[str, object]]:
+    """Per-span count, total/mean seconds, error count and attribute sums."""
+    with _lock:
+        return {
+            name: {
+                "count": h.count,
+                "total_s": round(h.sum, 6),
+                "mean_ms": round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                "errors": _errors.get(name, 0),
+                **{f"{k}_sum": v for k, v in _attr_sums.get(name, {}).items()},
+            }
+            for name, h in sorted(_durations.items())
+        }
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(value: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in value)
+
+
+def prometheus_text() -> str:
+    """All span histograms, attribute sums and registered gauges in Prometheus text format."""
+    lines = [
+        "# HELP coverletter_span_duration_seconds Wall time of traced stages.",
+        "# TYPE coverletter_span_duration_seconds histogram",
+    ]
+    with _lock:
+        durations = {name: (h.buckets, h.cumulative(), h.count, h.sum) for name, h in _durations.items()}
+        attr_sums = {name: dict(sums) for name, sums in _attr_sums.items()}
+        errors = dict(_errors)
+    for name, (buckets, cumulative, count, total) in sorted(durations.items()):
+        label = f'span="{_label(name)}"'
+        for bound, n in zip(buckets, cumulative):
+            lines.append(f'coverletter_span_duration_seconds_bucket{{{label},le="{bound}"}} {n}')
+        lines.append(f'coverletter_span_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+        lines.append(f"coverletter_span_duration_seconds_sum{{{label}}} {total}")
+        lines.append(f"coverletter_span_duration_seconds_count{{{label}}} {count}")
+    lines += ["# TYPE coverletter_span_errors_total counter"]
+    lines += [f'coverletter_span_errors_total{{span="{_label(n)}"}} {v}' for n, v in sorted(errors.items())]
+    lines += ["# TYPE coverletter_span_attribute_total counter"]
+    for name, sums in sorted(attr_sums.items()):
+        for key, value in sorted(sums.items()):
+            lines.append(f'coverletter_span_attribute_total{{span="{_label(name)}",attr="{_label(key)}"}} {value}')
+    for prefix, fn in sorted(_collectors.items()):
+        try:
+            values = fn()
+        except Exception:
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric = _metric_name(f"coverletter_{prefix}_{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, ctype = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, ctype = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics (Prometheus) and /metrics.json once per process; no-op when port is 0.
+
+    Starting it also turns tracing on, since an empty endpoint is of no use.
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            enable(True)
+        return _server